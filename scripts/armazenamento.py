@@ -0,0 +1,287 @@
+import json
+import os
+import glob
+import fnmatch
+import uuid
+from typing import Any, Dict, Iterable, List
+
+# ============================================================
+# ESCRITA SEGURA
+# ============================================================
+# Todas as escritas passam por um ficheiro temporário na mesma pasta,
+# fsync e os.replace: uma execução interrompida deixa o ficheiro antigo
+# intacto (nunca um JSON cortado). Se o conteúdo for igual ao que já está
+# no disco o ficheiro não é tocado (sem diffs nem commits desnecessários).
+
+# ===== ESTADO PARTILHADO ENTRE ETAPAS =====
+# Em modo diferido (pipeline num só processo) os ficheiros lidos ficam em
+# memória e as escritas só vão para o disco em descarregar().
+_escrita_diferida = False
+_cache: Dict[str, Any] = {}
+_pendentes: Dict[str, tuple] = {}
+# Diários JSON Lines: chave -> {"caminho", "novos": [registos], "truncar": bool}
+_diarios: Dict[str, dict] = {}
+
+# ===== BASE DE DADOS SQLITE (opcional) =====
+# Com TOL_BD definido, cada ficheiro gravado é também copiado para
+# base_dados, onde indice_apostas e historico_verificacoes fazem as
+# consultas (ver scripts/base_dados.py). Os JSON continuam a ser a fonte:
+# um ficheiro apagado não volta a ser lido da base de dados.
+_base_dados = None
+
+
+def base_dados_ativa():
+    """Módulo base_dados se TOL_BD estiver definido, senão None."""
+    global _base_dados
+    if _base_dados is None:
+        import base_dados
+        _base_dados = base_dados if base_dados.ATIVO else False
+    return _base_dados or None
+
+
+def _chave(caminho: str) -> str:
+    return os.path.normpath(caminho)
+
+
+def ativar_escrita_diferida():
+    """Passa a partilhar os JSON em memória e adia as escritas até descarregar()."""
+    global _escrita_diferida
+    _escrita_diferida = True
+
+
+def existe(caminho: str) -> bool:
+    return _chave(caminho) in _cache or os.path.exists(caminho)
+
+
+def pendente(caminho: str) -> bool:
+    """True se o ficheiro tiver escritas em memória ainda não gravadas (modo diferido)."""
+    chave = _chave(caminho)
+    diario = _diarios.get(chave)
+    return chave in _pendentes or bool(diario and (diario["novos"] or diario["truncar"]))
+
+
+def ler_json(caminho: str, padrao: Any = None) -> Any:
+    """
+    Lê um ficheiro JSON. Em modo diferido devolve a versão em memória
+    (incluindo escritas pendentes de etapas anteriores).
+    Devolve `padrao` se o ficheiro não existir.
+    """
+    chave = _chave(caminho)
+    if chave in _cache:
+        return _cache[chave]
+
+    if not os.path.exists(caminho):
+        return padrao
+    with open(caminho, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+
+    if _escrita_diferida:
+        _cache[chave] = dados
+    return dados
+
+
+def escrever_json(caminho: str, dados: Any, indent: int = 2, ensure_ascii: bool = False) -> bool:
+    """
+    Escreve um ficheiro JSON (ou agenda a escrita, em modo diferido).
+    Devolve False se o conteúdo já era igual ao do disco.
+    """
+    chave = _chave(caminho)
+    if _escrita_diferida:
+        _cache[chave] = dados
+        _pendentes[chave] = (caminho, indent, ensure_ascii)
+        return True
+
+    return _gravar(caminho, dados, indent, ensure_ascii)
+
+
+def escrever_texto(caminho: str, texto: str, ignorar_se_igual: bool = True) -> bool:
+    """Escreve um ficheiro de texto (UTF-8) de forma atómica."""
+    return _gravar_atomico(caminho, texto.encode("utf-8"), ignorar_se_igual)
+
+
+def conteudo_json(dados: Any, indent: int = 2, ensure_ascii: bool = False) -> bytes:
+    """Bytes exatos que escrever_json grava para `dados`."""
+    return json.dumps(dados, indent=indent, ensure_ascii=ensure_ascii).encode("utf-8")
+
+
+def _gravar(caminho: str, dados: Any, indent: int, ensure_ascii: bool) -> bool:
+    gravado = _gravar_atomico(caminho, conteudo_json(dados, indent, ensure_ascii))
+    bd = base_dados_ativa()
+    if gravado and bd:
+        bd.espelhar_json(caminho, dados, indent, ensure_ascii)
+    return gravado
+
+
+def _igual_ao_disco(caminho: str, conteudo: bytes) -> bool:
+    try:
+        if os.path.getsize(caminho) != len(conteudo):
+            return False
+        with open(caminho, "rb") as f:
+            return f.read() == conteudo
+    except OSError:
+        return False
+
+
+def _gravar_atomico(caminho: str, conteudo: bytes, ignorar_se_igual: bool = True) -> bool:
+    """Ficheiro temporário + fsync + os.replace. Devolve False se não foi preciso gravar."""
+    if ignorar_se_igual and _igual_ao_disco(caminho, conteudo):
+        return False
+
+    pasta = os.path.dirname(caminho) or "."
+    os.makedirs(pasta, exist_ok=True)
+    temporario = os.path.join(pasta, f".{os.path.basename(caminho)}.{uuid.uuid4().hex}.tmp")
+
+    # os.open com 0o666 respeita a umask (o ficheiro final fica com as permissões habituais)
+    fd = os.open(temporario, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        try:
+            os.remove(temporario)
+        except OSError:
+            pass
+        raise
+
+    # Garante que a renomeação também fica no disco (sem efeito em Windows)
+    try:
+        fd_pasta = os.open(pasta, os.O_RDONLY)
+    except OSError:
+        return True
+    try:
+        os.fsync(fd_pasta)
+    except OSError:
+        pass
+    finally:
+        os.close(fd_pasta)
+    return True
+
+
+def listar(padrao: str) -> List[str]:
+    """glob() que inclui ficheiros ainda só pendentes em memória."""
+    ficheiros = {_chave(c): c for c in glob.glob(padrao)}
+    padrao_norm = _chave(padrao)
+    for chave, (caminho, _, _) in _pendentes.items():
+        if fnmatch.fnmatch(chave, padrao_norm):
+            ficheiros.setdefault(chave, caminho)
+    return sorted(ficheiros.values())
+
+
+# ============================================================
+# DIÁRIOS JSON LINES (um registo por linha, só se acrescenta)
+# ============================================================
+
+def _estado_diario(caminho: str) -> dict:
+    return _diarios.setdefault(_chave(caminho), {"caminho": caminho, "novos": [], "truncar": False})
+
+
+def ler_jsonl(caminho: str) -> List[Any]:
+    """
+    Lê todos os registos de um ficheiro JSON Lines (incluindo os ainda
+    pendentes em modo diferido). Linhas incompletas são ignoradas.
+    """
+    estado = _diarios.get(_chave(caminho))
+    registos = []
+    if not (estado and estado["truncar"]) and os.path.exists(caminho):
+        with open(caminho, "r", encoding="utf-8") as f:
+            for linha in f:
+                linha = linha.strip()
+                if not linha:
+                    continue
+                try:
+                    registos.append(json.loads(linha))
+                except json.JSONDecodeError:
+                    # Ex.: última linha cortada por uma execução interrompida
+                    continue
+    if estado:
+        registos.extend(estado["novos"])
+    return registos
+
+
+def acrescentar_jsonl(caminho: str, registos: List[Any]):
+    """Acrescenta registos no fim do ficheiro (ou agenda, em modo diferido)."""
+    if not registos:
+        return
+    if _escrita_diferida:
+        _estado_diario(caminho)["novos"].extend(registos)
+        return
+    _gravar_jsonl(caminho, registos, "a")
+
+
+def limpar_jsonl(caminho: str):
+    """Esvazia o ficheiro (ex.: depois de compactado noutro ficheiro)."""
+    if _escrita_diferida:
+        estado = _estado_diario(caminho)
+        estado["novos"] = []
+        estado["truncar"] = True
+        return
+    if os.path.exists(caminho):
+        _gravar_jsonl(caminho, [], "w")
+
+
+def _gravar_jsonl(caminho: str, registos: List[Any], modo: str) -> bool:
+    linhas = "".join(
+        json.dumps(registo, ensure_ascii=False, separators=(",", ":")) + "\n"
+        for registo in registos
+    ).encode("utf-8")
+
+    bd = base_dados_ativa()
+    if modo == "w":
+        gravado = _gravar_atomico(caminho, linhas)
+        if gravado and bd:
+            bd.espelhar_jsonl(caminho, registos, "w")
+        return gravado
+
+    # Acrescentar: se a última linha ficou cortada (execução interrompida),
+    # começa numa linha nova para não estragar o registo seguinte
+    pasta = os.path.dirname(caminho)
+    if pasta:
+        os.makedirs(pasta, exist_ok=True)
+    with open(caminho, "a+b") as f:
+        if f.tell() > 0:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                linhas = b"\n" + linhas
+        f.write(linhas)
+        f.flush()
+        os.fsync(f.fileno())
+    if bd:
+        bd.espelhar_jsonl(caminho, registos, "a")
+    return True
+
+
+def descarregar(ultimos: Iterable[str] = ()) -> int:
+    """
+    Grava no disco todas as escritas pendentes (cada ficheiro uma única vez).
+    Os caminhos em `ultimos` são gravados depois de todos os outros, diários
+    incluídos (ex.: marcas ou registos que dão como feito o trabalho
+    guardado nos restantes).
+    Devolve quantos ficheiros mudaram de facto.
+    """
+    gravados = 0
+    no_fim = {_chave(caminho) for caminho in ultimos}
+
+    def gravar_json(chaves):
+        nonlocal gravados
+        for chave in chaves:
+            caminho, indent, ensure_ascii = _pendentes.pop(chave)
+            if _gravar(caminho, _cache[chave], indent, ensure_ascii):
+                gravados += 1
+
+    gravar_json([chave for chave in _pendentes if chave not in no_fim])
+    # Os diários vão depois dos JSON: se a execução parar a meio, no pior
+    # caso um registo fica no diário e no JSON compactado (reaplicar é idempotente)
+    for chave, estado in list(_diarios.items()):
+        if estado["truncar"]:
+            if os.path.exists(estado["caminho"]) or estado["novos"]:
+                if _gravar_jsonl(estado["caminho"], estado["novos"], "w"):
+                    gravados += 1
+        elif estado["novos"]:
+            _gravar_jsonl(estado["caminho"], estado["novos"], "a")
+            gravados += 1
+        del _diarios[chave]
+    gravar_json([chave for chave in _pendentes if chave in no_fim])
+    return gravados
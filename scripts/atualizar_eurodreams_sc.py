@@ -1,3 +1,4 @@
+import io
 import json
 import os
 import re
@@ -9,6 +10,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import datetime
 
+import armazenamento
+
 JOGO = "eurodreams"
 
 def escrever_log(mensagem, origem):
@@ -31,8 +34,7 @@ def ler_json(json_path, ano):
         return {str(ano): []}
 
 def gravar_json(json_path, dados):
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(dados, f, indent=2, ensure_ascii=False)
+    armazenamento.escrever_json(json_path, dados)
 
 def extrair_eurodreams_sc():
     url = "https://www.jogossantacasa.pt/web/ResultsBoard/EuroDreams"
@@ -117,22 +119,23 @@ def atualizar_resultados():
     txt_path = os.path.join(pasta_dados, f"{JOGO}_{ano}.txt")
     json_path = os.path.join(pasta_dados, f"{JOGO}_{ano}.json")
 
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write(f"Concurso: {resultado['concurso']}\n")
-        f.write(f"Data: {resultado['data']}\n")
-        f.write(f"Chave: {resultado['chave_ordenada']}\n")
-        f.write(f"Ordem de saída: {resultado['chave_saida']}\n")
-        f.write(f"Números: {' '.join(resultado['numeros'])}\n")  # 🔥 ADICIONADO
-        f.write(f"Dream: {resultado['dream']}\n")                # 🔥 ADICIONADO
-        f.write("-" * 40 + "\n")
-
-        f.write("Prémios:\n")
-        for p in resultado["premios"]:
-            f.write(
-                f"{p['premio']} - {p['descricao']} | "
-                f"PT: {p['vencedores_pt']} | EU: {p['vencedores_eu']} | Valor: {p['valor']}\n"
-            )
-        f.write("-" * 40 + "\n")
+    txt = io.StringIO()
+    txt.write(f"Concurso: {resultado['concurso']}\n")
+    txt.write(f"Data: {resultado['data']}\n")
+    txt.write(f"Chave: {resultado['chave_ordenada']}\n")
+    txt.write(f"Ordem de saída: {resultado['chave_saida']}\n")
+    txt.write(f"Números: {' '.join(resultado['numeros'])}\n")  # 🔥 ADICIONADO
+    txt.write(f"Dream: {resultado['dream']}\n")                # 🔥 ADICIONADO
+    txt.write("-" * 40 + "\n")
+
+    txt.write("Prémios:\n")
+    for p in resultado["premios"]:
+        txt.write(
+            f"{p['premio']} - {p['descricao']} | "
+            f"PT: {p['vencedores_pt']} | EU: {p['vencedores_eu']} | Valor: {p['valor']}\n"
+        )
+    txt.write("-" * 40 + "\n")
+    armazenamento.escrever_texto(txt_path, txt.getvalue())
 
     dados = ler_json(json_path, ano)
     lista = dados[str(ano)]
@@ -166,6 +169,5 @@ if __name__ == "__main__":
         lista = dados.get(str(ano), [])
         if lista:
             mais_recente = lista[-1]
-            with open(os.path.join(pasta_dados, f"{JOGO}_atual.json"), "w", encoding="utf-8") as f_out:
-                json.dump(mais_recente, f_out, indent=2, ensure_ascii=False)
+            armazenamento.escrever_json(os.path.join(pasta_dados, f"{JOGO}_atual.json"), mais_recente)
             print(f"✅ {JOGO}_atual.json atualizado com o concurso {mais_recente['concurso']}")
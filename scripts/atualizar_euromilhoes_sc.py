@@ -1,3 +1,4 @@
+import io
 import json
 import os
 import re
@@ -9,6 +10,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import datetime
 
+import armazenamento
+
 JOGO = "euromilhoes"
 
 def escrever_log(mensagem, origem):
@@ -31,8 +34,7 @@ def ler_json(json_path, ano):
         return {str(ano): []}
 
 def gravar_json(json_path, dados):
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(dados, f, indent=2, ensure_ascii=False)
+    armazenamento.escrever_json(json_path, dados)
 
 def extrair_euromilhoes_sc():
     url = "https://www.jogossantacasa.pt/web/SCCartazResult/euroMilhoes"
@@ -117,20 +119,21 @@ def atualizar_resultados():
     json_path = os.path.join(pasta_dados, f"{JOGO}_{ano}.json")
 
     # Guardar TXT anual
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write(f"Concurso: {resultado['concurso']}\n")
-        f.write(f"Data: {resultado['data']}\n")
-        f.write(f"Chave: {resultado['chave_ordenada']}\n")
-        f.write(f"Ordem de saída: {resultado['chave_saida']}\n")
-        f.write("-" * 40 + "\n")
-
-        f.write("Prémios:\n")
-        for p in resultado["premios"]:
-            f.write(
-                f"{p['premio']} - {p['descricao']} | "
-                f"PT: {p['vencedores_pt']} | EU: {p['vencedores_eu']} | Valor: {p['valor']}\n"
-            )
-        f.write("-" * 40 + "\n")
+    txt = io.StringIO()
+    txt.write(f"Concurso: {resultado['concurso']}\n")
+    txt.write(f"Data: {resultado['data']}\n")
+    txt.write(f"Chave: {resultado['chave_ordenada']}\n")
+    txt.write(f"Ordem de saída: {resultado['chave_saida']}\n")
+    txt.write("-" * 40 + "\n")
+
+    txt.write("Prémios:\n")
+    for p in resultado["premios"]:
+        txt.write(
+            f"{p['premio']} - {p['descricao']} | "
+            f"PT: {p['vencedores_pt']} | EU: {p['vencedores_eu']} | Valor: {p['valor']}\n"
+        )
+    txt.write("-" * 40 + "\n")
+    armazenamento.escrever_texto(txt_path, txt.getvalue())
 
     # JSON incremental - COM LÓGICA DE ATUALIZAÇÃO
     dados = ler_json(json_path, ano)
@@ -195,5 +198,4 @@ if __name__ == "__main__":
         lista = dados.get(str(ano), [])
         if lista:
             mais_recente = lista[-1]
-            with open(os.path.join(pasta_dados, f"{JOGO}_atual.json"), "w", encoding="utf-8") as f_out:
-                json.dump(mais_recente, f_out, indent=2, ensure_ascii=False)
+            armazenamento.escrever_json(os.path.join(pasta_dados, f"{JOGO}_atual.json"), mais_recente)
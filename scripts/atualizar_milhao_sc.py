@@ -1,3 +1,4 @@
+import io
 import json
 import os
 import re
@@ -9,6 +10,8 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import datetime
 
+import armazenamento
+
 JOGO = "milhao"
 
 def escrever_log(mensagem, origem):
@@ -31,8 +34,7 @@ def ler_json(json_path, ano):
         return {str(ano): []}
 
 def gravar_json(json_path, dados):
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(dados, f, indent=2, ensure_ascii=False)
+    armazenamento.escrever_json(json_path, dados)
 
 def extrair_m1lhao_sc():
     url = "https://www.jogossantacasa.pt/web/SCCartazResult/m1lhao"
@@ -113,17 +115,18 @@ def atualizar_resultados():
     json_path = os.path.join(pasta_dados, f"{JOGO}_{ano}.json")
 
     # Guardar TXT anual
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write(f"Concurso: {resultado['concurso']}\n")
-        f.write(f"Data: {resultado['data']}\n")
-        f.write(f"Código vencedor: {resultado['codigo']}\n")
-        f.write(f"Vencedores: {resultado['vencedores']}\n")
-        f.write("-" * 40 + "\n")
-
-        f.write("Estatísticas:\n")
-        for e in resultado["estatisticas"]:
-            f.write(f"{e['nome']}: {e['valor']}\n")
-        f.write("-" * 40 + "\n")
+    txt = io.StringIO()
+    txt.write(f"Concurso: {resultado['concurso']}\n")
+    txt.write(f"Data: {resultado['data']}\n")
+    txt.write(f"Código vencedor: {resultado['codigo']}\n")
+    txt.write(f"Vencedores: {resultado['vencedores']}\n")
+    txt.write("-" * 40 + "\n")
+
+    txt.write("Estatísticas:\n")
+    for e in resultado["estatisticas"]:
+        txt.write(f"{e['nome']}: {e['valor']}\n")
+    txt.write("-" * 40 + "\n")
+    armazenamento.escrever_texto(txt_path, txt.getvalue())
 
     # JSON incremental
     dados = ler_json(json_path, ano)
@@ -161,5 +164,4 @@ if __name__ == "__main__":
         lista = dados.get(str(ano), [])
         if lista:
             mais_recente = lista[-1]
-            with open(os.path.join(pasta_dados, f"{JOGO}_atual.json"), "w", encoding="utf-8") as f_out:
-                json.dump(mais_recente, f_out, indent=2, ensure_ascii=False)
+            armazenamento.escrever_json(os.path.join(pasta_dados, f"{JOGO}_atual.json"), mais_recente)
@@ -1,3 +1,4 @@
+import io
 import json
 import os
 import re
@@ -5,6 +6,8 @@ import datetime
 import requests
 from bs4 import BeautifulSoup
 
+import armazenamento
+
 # ===== CONFIGURAÇÃO =====
 JOGO = "totoloto"
 URL_SANTACASA = "https://www.jogossantacasa.pt/web/SCCartazResult/totolotoNew"
@@ -29,8 +32,7 @@ def ler_json(json_path, ano):
         return {str(ano): []}
 
 def gravar_json(json_path, dados):
-    with open(json_path, "w", encoding="utf-8") as f:
-        json.dump(dados, f, indent=2, ensure_ascii=False)
+    armazenamento.escrever_json(json_path, dados)
 
 # ===== MÉTODO 1: REQUESTS + BEAUTIFULSOUP =====
 def extrair_totoloto_http():
@@ -188,16 +190,17 @@ def atualizar_resultados():
     json_path = os.path.join(pasta_dados, f"totoloto_sc_{ano}.json")
     txt_path = os.path.join(pasta_dados, f"totoloto_sc_{ano}.txt")
 
-    with open(txt_path, "w", encoding="utf-8") as f:
-        f.write(f"Concurso: {resultado['concurso']}\n")
-        f.write(f"Data: {resultado['data']}\n")
-        f.write(f"Números: {' '.join(map(str, resultado['numeros']))}\n")
-        f.write(f"Especial: {resultado['especial']}\n")
-        f.write("-" * 40 + "\n")
-        f.write("Prémios:\n")
-        for p in resultado["premios"]:
-            f.write(f"{p['premio']} - {p['descricao']} | Vencedores: {p['vencedores']} | Valor: {p['valor']}\n")
-        f.write("-" * 40 + "\n")
+    txt = io.StringIO()
+    txt.write(f"Concurso: {resultado['concurso']}\n")
+    txt.write(f"Data: {resultado['data']}\n")
+    txt.write(f"Números: {' '.join(map(str, resultado['numeros']))}\n")
+    txt.write(f"Especial: {resultado['especial']}\n")
+    txt.write("-" * 40 + "\n")
+    txt.write("Prémios:\n")
+    for p in resultado["premios"]:
+        txt.write(f"{p['premio']} - {p['descricao']} | Vencedores: {p['vencedores']} | Valor: {p['valor']}\n")
+    txt.write("-" * 40 + "\n")
+    armazenamento.escrever_texto(txt_path, txt.getvalue())
 
     dados = ler_json(json_path, ano)
     lista = dados[str(ano)]
@@ -243,5 +246,4 @@ if __name__ == "__main__":
         lista = dados.get(str(ano), [])
         if lista:
             mais_recente = lista[-1]
-            with open(os.path.join(pasta_dados, "totoloto_sc_atual.json"), "w", encoding="utf-8") as f_out:
-                json.dump(mais_recente, f_out, indent=2, ensure_ascii=False)
+            armazenamento.escrever_json(os.path.join(pasta_dados, "totoloto_sc_atual.json"), mais_recente)
@@ -0,0 +1,637 @@
+"""
+Base de dados SQLite opcional, com os JSON de apostas/, dados/ e
+resultados/ em tabelas indexadas.
+
+Com a variável TOL_BD=<ficheiro .db>, cada ficheiro gravado através de
+armazenamento (escrever_json, diários .jsonl, descarregar) é também
+gravado na base de dados: boletins e linhas de aposta, sorteios e
+prémios, verificações e notificações (os restantes JSON, ex.:
+estatísticas ou registo do OCR, ficam como documentos). Numa lista só
+são reescritas as linhas a partir da primeira diferença.
+
+As procuras que percorriam ficheiros inteiros passam a ser consultas aos
+índices: duplicados de boletins no OCR (indice_apostas, por referência e
+assinatura) e upsert do histórico de verificações (historico_verificacoes,
+por referência/aposta/concurso). Antes de cada consulta, sincronizar()
+volta a importar o ficheiro se o tamanho ou o mtime não forem os da
+última cópia (alterado pela PWA, por git pull...). Os JSON continuam a
+ser gravados (são o que a PWA lê) e um ficheiro apagado não é lido da
+base de dados. Os sorteios continuam em memória (indice_sorteios): os
+ficheiros anuais são pequenos e os verificadores precisam das listas
+completas.
+
+`exportar` regenera os JSON (o formato lido pela PWA em docs/) a partir
+da base de dados de forma determinística (mesma ordem, mesma indentação,
+bytes iguais aos que os scripts gravam).
+
+    TOL_BD=tol.db python scripts/base_dados.py importar
+    TOL_BD=tol.db python scripts/base_dados.py exportar [pasta]
+"""
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+from typing import Any, List, Optional
+
+import armazenamento
+import indice_apostas
+import indice_sorteios
+import premios
+
+# ===== CONFIGURACAO =====
+# Sem TOL_BD tudo continua só em JSON (comportamento de sempre)
+CAMINHO_BD = os.getenv("TOL_BD", "")
+ATIVO = bool(CAMINHO_BD)
+# Pastas cujos JSON são espelhados
+PASTAS = ("apostas", "dados", "resultados")
+JOGOS_APOSTAS = ("euromilhoes", "totoloto", "eurodreams", "milhao")
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS ficheiros (
+    caminho TEXT PRIMARY KEY,
+    tabela TEXT NOT NULL,
+    formato TEXT NOT NULL,            -- json | jsonl
+    raiz TEXT NOT NULL,               -- lista | objeto | ["2026", ...] (listas por ano)
+    indent INTEGER,
+    ensure_ascii INTEGER NOT NULL DEFAULT 0,
+    tamanho INTEGER,                  -- tamanho e mtime do ficheiro na última cópia
+    mtime_ns INTEGER                  -- (ver sincronizar)
+);
+
+CREATE TABLE IF NOT EXISTS boletins (
+    id INTEGER PRIMARY KEY,
+    ficheiro TEXT NOT NULL,
+    posicao INTEGER NOT NULL,
+    jogo TEXT,
+    referencia_unica TEXT,
+    data_sorteio TEXT,
+    concurso TEXT,
+    valor_total REAL,
+    imagem_origem TEXT,
+    hash_imagem TEXT,
+    confirmado INTEGER,
+    assinatura TEXT,                  -- indice_apostas.assinatura (duplicados por conteúdo)
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS boletins_ficheiro ON boletins (ficheiro, posicao);
+CREATE INDEX IF NOT EXISTS boletins_referencia ON boletins (referencia_unica);
+CREATE INDEX IF NOT EXISTS boletins_sorteio ON boletins (jogo, data_sorteio);
+CREATE INDEX IF NOT EXISTS boletins_imagem ON boletins (hash_imagem);
+
+CREATE TABLE IF NOT EXISTS linhas_aposta (
+    boletim_id INTEGER NOT NULL REFERENCES boletins (id) ON DELETE CASCADE,
+    indice INTEGER,
+    numeros TEXT,
+    estrelas TEXT,
+    dream TEXT,
+    numero_da_sorte TEXT,
+    codigo TEXT
+);
+CREATE INDEX IF NOT EXISTS linhas_boletim ON linhas_aposta (boletim_id);
+CREATE INDEX IF NOT EXISTS linhas_codigo ON linhas_aposta (codigo);
+
+CREATE TABLE IF NOT EXISTS sorteios (
+    id INTEGER PRIMARY KEY,
+    ficheiro TEXT NOT NULL,
+    posicao INTEGER NOT NULL,
+    grupo TEXT,
+    jogo TEXT,
+    concurso TEXT,
+    data TEXT,                        -- YYYY-MM-DD
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sorteios_ficheiro ON sorteios (ficheiro, posicao);
+CREATE INDEX IF NOT EXISTS sorteios_data ON sorteios (jogo, data);
+CREATE INDEX IF NOT EXISTS sorteios_concurso ON sorteios (jogo, concurso);
+
+CREATE TABLE IF NOT EXISTS premios (
+    sorteio_id INTEGER NOT NULL REFERENCES sorteios (id) ON DELETE CASCADE,
+    posicao INTEGER NOT NULL,
+    premio TEXT,
+    descricao TEXT,
+    valor TEXT,
+    valor_centimos INTEGER,
+    vencedores TEXT
+);
+CREATE INDEX IF NOT EXISTS premios_sorteio ON premios (sorteio_id);
+
+CREATE TABLE IF NOT EXISTS verificacoes (
+    id INTEGER PRIMARY KEY,
+    ficheiro TEXT NOT NULL,
+    posicao INTEGER NOT NULL,
+    jogo TEXT,
+    referencia TEXT,
+    indice_aposta INTEGER,
+    concurso_sorteio TEXT,
+    data_sorteio TEXT,
+    ganhou INTEGER,
+    valor_centimos INTEGER,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS verificacoes_ficheiro ON verificacoes (ficheiro, posicao);
+CREATE INDEX IF NOT EXISTS verificacoes_chave ON verificacoes (referencia, indice_aposta, concurso_sorteio);
+CREATE INDEX IF NOT EXISTS verificacoes_ganhou ON verificacoes (jogo, ganhou);
+
+CREATE TABLE IF NOT EXISTS notificacoes (
+    id INTEGER PRIMARY KEY,
+    ficheiro TEXT NOT NULL,
+    posicao INTEGER NOT NULL,
+    id_notificacao TEXT,
+    jogo TEXT,
+    data TEXT,
+    lido INTEGER,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notificacoes_ficheiro ON notificacoes (ficheiro, posicao);
+CREATE INDEX IF NOT EXISTS notificacoes_id ON notificacoes (id_notificacao);
+CREATE INDEX IF NOT EXISTS notificacoes_jogo ON notificacoes (jogo, lido);
+
+CREATE TABLE IF NOT EXISTS documentos (
+    ficheiro TEXT PRIMARY KEY,
+    dados TEXT NOT NULL
+);
+"""
+
+# Colunas acrescentadas depois da primeira versão do esquema (bases de
+# dados antigas são migradas em ligar(); os índices vêm depois da migração)
+COLUNAS_NOVAS = (
+    ("ficheiros", "tamanho", "INTEGER"),
+    ("ficheiros", "mtime_ns", "INTEGER"),
+    ("boletins", "assinatura", "TEXT"),
+)
+INDICES_NOVOS = """
+CREATE INDEX IF NOT EXISTS boletins_assinatura ON boletins (assinatura);
+"""
+
+TABELAS_LINHAS = ("boletins", "sorteios", "verificacoes", "notificacoes")
+_JOGO_POR_PREFIXO = {prefixo: jogo for jogo, prefixo in indice_sorteios.PREFIXOS_JOGOS.items()}
+
+_ligacao = None
+_pid_ligacao = None
+_lock = threading.RLock()
+
+
+# ============================================================
+# LIGACAO E CLASSIFICACAO DOS FICHEIROS
+# ============================================================
+
+def ligar() -> sqlite3.Connection:
+    """Ligação partilhada (criada com o esquema na primeira utilização)."""
+    global _ligacao, _pid_ligacao
+    with _lock:
+        # Uma ligação SQLite não pode passar para um processo filho (fork)
+        if _ligacao is None or _pid_ligacao != os.getpid():
+            _pid_ligacao = os.getpid()
+            pasta = os.path.dirname(CAMINHO_BD)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            _ligacao = sqlite3.connect(CAMINHO_BD, check_same_thread=False)
+            _ligacao.execute("PRAGMA foreign_keys = ON")
+            _ligacao.execute("PRAGMA journal_mode = WAL")
+            _ligacao.executescript(ESQUEMA)
+            _migrar(_ligacao)
+            _ligacao.executescript(INDICES_NOVOS)
+        return _ligacao
+
+
+def _migrar(bd: sqlite3.Connection):
+    """
+    Acrescenta as COLUNAS_NOVAS em falta. Ficam vazias nas linhas antigas:
+    tamanho/mtime a NULL fazem sincronizar() reimportar cada ficheiro e a
+    assinatura é calculada aqui.
+    """
+    with bd:
+        for tabela, coluna, tipo in COLUNAS_NOVAS:
+            colunas = {linha[1] for linha in bd.execute(f"PRAGMA table_info({tabela})")}
+            if coluna not in colunas:
+                bd.execute(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo}")
+        sem_assinatura = bd.execute("SELECT id, dados FROM boletins WHERE assinatura IS NULL").fetchall()
+        bd.executemany("UPDATE boletins SET assinatura = ? WHERE id = ?",
+                       [(indice_apostas.assinatura(_campos(json.loads(dados))), id_boletim)
+                        for id_boletim, dados in sem_assinatura])
+
+
+def _relativo(caminho: str) -> str:
+    """Caminho relativo à raiz do repositório, com "/" (chave dos ficheiros)."""
+    return os.path.normpath(caminho).replace(os.sep, "/")
+
+
+def tabela_do_ficheiro(caminho: str) -> Optional[str]:
+    """Tabela onde o ficheiro é espelhado (None se estiver fora de PASTAS)."""
+    relativo = _relativo(caminho)
+    partes = relativo.split("/")
+    if len(partes) != 2 or partes[0] not in PASTAS or not relativo.endswith((".json", ".jsonl")):
+        return None
+    pasta, nome = partes[0], os.path.splitext(partes[1])[0]
+
+    if pasta == "apostas":
+        return "boletins" if nome in JOGOS_APOSTAS else "documentos"
+    if pasta == "dados":
+        return "sorteios"
+    if nome.endswith(("_verificacoes", "_recentes")):
+        return "verificacoes"
+    if nome.startswith("notificacoes_"):
+        return "notificacoes"
+    return "documentos"
+
+
+def _jogo(caminho: str) -> str:
+    """"dados/totoloto_sc_2026.json" -> "totoloto", "resultados/milhao_recentes.json" -> "milhao"."""
+    nome = os.path.splitext(os.path.basename(caminho))[0]
+    nome = re.sub(r"_(\d{4}|atual|verificacoes|recentes)$", "", nome)
+    return _JOGO_POR_PREFIXO.get(nome, nome)
+
+
+def _data_iso(data: Any) -> Optional[str]:
+    if not isinstance(data, str):
+        return None
+    if re.match(r"^\d{2}/\d{2}/\d{4}$", data):
+        dia, mes, ano = data.split("/")
+        return f"{ano}-{mes}-{dia}"
+    return data[:10]
+
+
+def _texto(valor: Any) -> Optional[str]:
+    if valor is None:
+        return None
+    return json.dumps(valor, ensure_ascii=False) if isinstance(valor, (list, dict)) else str(valor)
+
+
+# ============================================================
+# ESPELHO DAS ESCRITAS (chamado por armazenamento)
+# ============================================================
+
+def _decompor(dados: Any):
+    """(raiz, [(grupo, item)]) - listas, objetos com listas por ano ou objetos simples."""
+    if isinstance(dados, list):
+        return "lista", [(None, item) for item in dados]
+    if isinstance(dados, dict) and dados and all(isinstance(v, list) for v in dados.values()):
+        return json.dumps(list(dados), ensure_ascii=False), [(g, item) for g, lista in dados.items() for item in lista]
+    return "objeto", [(None, dados)]
+
+
+def _campos(item: Any) -> dict:
+    return item if isinstance(item, dict) else {}
+
+
+def _inserir_linha(bd, tabela: str, ficheiro: str, posicao: int, grupo: Optional[str], item: Any):
+    campos = _campos(item)
+    dados = json.dumps(item, ensure_ascii=False)
+
+    if tabela == "boletins":
+        cursor = bd.execute(
+            "INSERT INTO boletins (ficheiro, posicao, jogo, referencia_unica, data_sorteio, concurso, valor_total,"
+            " imagem_origem, hash_imagem, confirmado, assinatura, dados) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (ficheiro, posicao, _jogo(ficheiro), campos.get("referencia_unica"), campos.get("data_sorteio"),
+             _texto(campos.get("concurso")), premios.valor_em_centimos(campos.get("valor_total")) / 100,
+             campos.get("imagem_origem"), campos.get("hash_imagem"),
+             None if campos.get("confirmado") is None else int(bool(campos.get("confirmado"))),
+             indice_apostas.assinatura(campos), dados))
+        bd.executemany(
+            "INSERT INTO linhas_aposta (boletim_id, indice, numeros, estrelas, dream, numero_da_sorte, codigo)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(cursor.lastrowid, aposta.get("indice"), _texto(aposta.get("numeros")), _texto(aposta.get("estrelas")),
+              _texto(aposta.get("dream")), _texto(aposta.get("numero_da_sorte")),
+              re.sub(r"\s+", "", aposta["codigo"]).upper() if isinstance(aposta.get("codigo"), str) else None)
+             for aposta in campos.get("apostas") or [] if isinstance(aposta, dict)])
+
+    elif tabela == "sorteios":
+        cursor = bd.execute(
+            "INSERT INTO sorteios (ficheiro, posicao, grupo, jogo, concurso, data, dados) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (ficheiro, posicao, grupo, _jogo(ficheiro), campos.get("concurso"), _data_iso(campos.get("data")), dados))
+        bd.executemany(
+            "INSERT INTO premios (sorteio_id, posicao, premio, descricao, valor, valor_centimos, vencedores)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(cursor.lastrowid, i, p.get("premio"), p.get("descricao"), p.get("valor"),
+              premios.valor_em_centimos(p.get("valor")), p.get("vencedores", p.get("vencedores_pt")))
+             for i, p in enumerate(campos.get("premios") or []) if isinstance(p, dict)])
+
+    elif tabela == "verificacoes":
+        boletim = campos.get("boletim") or {}
+        premio = campos.get("premio") or {}
+        bd.execute(
+            "INSERT INTO verificacoes (ficheiro, posicao, jogo, referencia, indice_aposta, concurso_sorteio,"
+            " data_sorteio, ganhou, valor_centimos, dados) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (ficheiro, posicao, _jogo(ficheiro), boletim.get("referencia"), (campos.get("aposta") or {}).get("indice"),
+             boletim.get("concurso_sorteio"), boletim.get("data_sorteio"), int(bool(campos.get("ganhou"))),
+             premio.get("valor_centimos", premios.valor_em_centimos(premio.get("valor"))), dados))
+
+    elif tabela == "notificacoes":
+        bd.execute(
+            "INSERT INTO notificacoes (ficheiro, posicao, id_notificacao, jogo, data, lido, dados)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (ficheiro, posicao, _texto(campos.get("id")), campos.get("jogo"), campos.get("data"),
+             int(bool(campos.get("lido"))), dados))
+
+
+def _apagar(bd, ficheiro: str):
+    for tabela in TABELAS_LINHAS:
+        bd.execute(f"DELETE FROM {tabela} WHERE ficheiro = ?", (ficheiro,))
+    bd.execute("DELETE FROM documentos WHERE ficheiro = ?", (ficheiro,))
+    bd.execute("DELETE FROM ficheiros WHERE caminho = ?", (ficheiro,))
+
+
+def _registar_estado(bd, caminho: str, ficheiro: str):
+    """Tamanho e mtime do ficheiro tal como ficou copiado (ver sincronizar)."""
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return
+    bd.execute("UPDATE ficheiros SET tamanho = ?, mtime_ns = ? WHERE caminho = ?",
+               (estado.st_size, estado.st_mtime_ns, ficheiro))
+
+
+def espelhar_json(caminho: str, dados: Any, indent: Optional[int] = 2, ensure_ascii: bool = False):
+    """
+    Copia para a base de dados o conteúdo de um ficheiro JSON acabado de
+    gravar. Nas listas só são reescritas as linhas a partir da primeira
+    diferença (um ficheiro a que só se acrescentaram boletins ou sorteios
+    custa apenas as linhas novas).
+    """
+    tabela = tabela_do_ficheiro(caminho)
+    if tabela is None:
+        return
+    ficheiro = _relativo(caminho)
+    with _lock:
+        bd = ligar()
+        with bd:
+            if tabela == "documentos":
+                _apagar(bd, ficheiro)
+                raiz = "objeto"
+                bd.execute("INSERT INTO documentos (ficheiro, dados) VALUES (?, ?)",
+                           (ficheiro, json.dumps(dados, ensure_ascii=False)))
+            else:
+                raiz, linhas = _decompor(dados)
+                coluna_grupo = "grupo" if tabela == "sorteios" else "NULL"
+                existentes = bd.execute(f"SELECT {coluna_grupo}, dados FROM {tabela} WHERE ficheiro = ?"
+                                        " ORDER BY posicao", (ficheiro,)).fetchall()
+                inicio = 0
+                for (grupo_antigo, dados_antigos), (grupo, item) in zip(existentes, linhas):
+                    if grupo_antigo != (grupo if tabela == "sorteios" else None) or \
+                            dados_antigos != json.dumps(item, ensure_ascii=False):
+                        break
+                    inicio += 1
+                bd.execute(f"DELETE FROM {tabela} WHERE ficheiro = ? AND posicao >= ?", (ficheiro, inicio))
+                for posicao, (grupo, item) in enumerate(linhas[inicio:], inicio):
+                    _inserir_linha(bd, tabela, ficheiro, posicao, grupo, item)
+            bd.execute("INSERT OR REPLACE INTO ficheiros (caminho, tabela, formato, raiz, indent, ensure_ascii)"
+                       " VALUES (?, ?, 'json', ?, ?, ?)", (ficheiro, tabela, raiz, indent, int(ensure_ascii)))
+            _registar_estado(bd, caminho, ficheiro)
+
+
+def espelhar_jsonl(caminho: str, registos: List[Any], modo: str):
+    """Diário JSON Lines: "w" substitui os registos, "a" acrescenta-os no fim."""
+    tabela = tabela_do_ficheiro(caminho)
+    if tabela is None or tabela == "documentos":
+        return
+    ficheiro = _relativo(caminho)
+    with _lock:
+        bd = ligar()
+        with bd:
+            if modo == "w":
+                _apagar(bd, ficheiro)
+            bd.execute("INSERT OR IGNORE INTO ficheiros (caminho, tabela, formato, raiz, indent, ensure_ascii)"
+                       " VALUES (?, ?, 'jsonl', 'lista', NULL, 0)", (ficheiro, tabela))
+            inicio = bd.execute(f"SELECT COALESCE(MAX(posicao) + 1, 0) FROM {tabela} WHERE ficheiro = ?",
+                                (ficheiro,)).fetchone()[0]
+            for posicao, registo in enumerate(registos, inicio):
+                _inserir_linha(bd, tabela, ficheiro, posicao, None, registo)
+            _registar_estado(bd, caminho, ficheiro)
+
+
+def sincronizar(caminho: str) -> bool:
+    """
+    Garante que a base de dados tem o conteúdo atual do ficheiro, que pode
+    ter mudado por outra via (ex.: validação na PWA, git pull, base de dados
+    nova): se o tamanho ou o mtime não forem os da última cópia, o ficheiro
+    volta a ser importado. Devolve False se o ficheiro não existir.
+    """
+    if tabela_do_ficheiro(caminho) is None:
+        return False
+    ficheiro = _relativo(caminho)
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        with _lock:
+            bd = ligar()
+            with bd:
+                _apagar(bd, ficheiro)
+        return False
+    with _lock:
+        copia = ligar().execute("SELECT tamanho, mtime_ns FROM ficheiros WHERE caminho = ?", (ficheiro,)).fetchone()
+    if copia != (estado.st_size, estado.st_mtime_ns):
+        return _importar_ficheiro(caminho)
+    return True
+
+
+# ============================================================
+# LEITURA E EXPORTACAO
+# ============================================================
+
+def ler(caminho: str) -> Any:
+    """Conteúdo do ficheiro reconstruído da base de dados (None se não existir)."""
+    if tabela_do_ficheiro(caminho) is None:
+        return None
+    ficheiro = _relativo(caminho)
+    with _lock:
+        bd = ligar()
+        linha = bd.execute("SELECT tabela, raiz FROM ficheiros WHERE caminho = ?", (ficheiro,)).fetchone()
+        if linha is None:
+            return None
+        tabela, raiz = linha
+        if tabela == "documentos":
+            return json.loads(bd.execute("SELECT dados FROM documentos WHERE ficheiro = ?", (ficheiro,)).fetchone()[0])
+        coluna_grupo = "grupo" if tabela == "sorteios" else "NULL"
+        linhas = bd.execute(f"SELECT {coluna_grupo}, dados FROM {tabela} WHERE ficheiro = ? ORDER BY posicao",
+                            (ficheiro,)).fetchall()
+
+    if raiz == "lista":
+        return [json.loads(dados) for _, dados in linhas]
+    if raiz == "objeto":
+        return json.loads(linhas[0][1]) if linhas else {}
+    grupos = {grupo: [] for grupo in json.loads(raiz)}
+    for grupo, dados in linhas:
+        grupos.setdefault(grupo, []).append(json.loads(dados))
+    return grupos
+
+
+def exportar(pasta_destino: str = ".") -> int:
+    """
+    Regenera todos os ficheiros espelhados (em `pasta_destino`, mantendo os
+    caminhos relativos). Devolve quantos mudaram.
+    """
+    with _lock:
+        ficheiros = ligar().execute(
+            "SELECT caminho, formato, indent, ensure_ascii FROM ficheiros ORDER BY caminho").fetchall()
+
+    alterados = 0
+    for caminho, formato, indent, ensure_ascii in ficheiros:
+        dados = ler(caminho)
+        destino = os.path.join(pasta_destino, caminho)
+        if formato == "jsonl":
+            texto = "".join(json.dumps(r, ensure_ascii=False, separators=(",", ":")) + "\n" for r in dados)
+        else:
+            texto = armazenamento.conteudo_json(dados, indent, bool(ensure_ascii)).decode("utf-8")
+        # escrever_texto não volta a espelhar na base de dados
+        if armazenamento.escrever_texto(destino, texto):
+            alterados += 1
+            if os.path.abspath(destino) == os.path.abspath(caminho):
+                with _lock:
+                    bd = ligar()
+                    with bd:
+                        _registar_estado(bd, destino, caminho)
+    return alterados
+
+
+def _formato_do_ficheiro(texto: str):
+    """(indent, ensure_ascii) com que um JSON existente foi gravado."""
+    linhas = texto.split("\n", 2)
+    indent = None
+    if len(linhas) > 1:
+        indent = len(linhas[1]) - len(linhas[1].lstrip(" ")) or None
+    ensure_ascii = texto.isascii() and "\\u" in texto
+    return indent, ensure_ascii
+
+
+def _importar_ficheiro(caminho: str) -> bool:
+    if caminho.endswith(".jsonl"):
+        espelhar_jsonl(caminho, armazenamento.ler_jsonl(caminho), "w")
+        return True
+    with open(caminho, "r", encoding="utf-8") as f:
+        texto = f.read()
+    try:
+        dados = json.loads(texto)
+    except json.JSONDecodeError:
+        print(f"⚠️ JSON inválido, ignorado: {caminho}")
+        return False
+    indent, ensure_ascii = _formato_do_ficheiro(texto)
+    espelhar_json(caminho, dados, indent, ensure_ascii)
+    return True
+
+
+def importar() -> int:
+    """Carrega na base de dados todos os JSON/JSONL das PASTAS. Devolve quantos ficheiros."""
+    importados = 0
+    for pasta in PASTAS:
+        for caminho in armazenamento.listar(os.path.join(pasta, "*.json*")):
+            if tabela_do_ficheiro(caminho) is not None and _importar_ficheiro(caminho):
+                importados += 1
+    return importados
+
+
+# ============================================================
+# CONSULTAS INDEXADAS
+# ============================================================
+# Usadas pelos scripts com TOL_BD (depois de sincronizar() o ficheiro):
+# duplicados de boletins (indice_apostas) e upsert do histórico de
+# verificações (historico_verificacoes).
+
+def existe_boletim(caminho: str, referencia: Optional[str] = None, assinatura: Optional[str] = None) -> bool:
+    """True se o ficheiro de apostas já tiver um boletim com a referência (ou a assinatura)."""
+    coluna, valor = ("referencia_unica", referencia) if referencia else ("assinatura", assinatura)
+    with _lock:
+        return ligar().execute(f"SELECT 1 FROM boletins WHERE {coluna} = ? AND ficheiro = ? LIMIT 1",
+                               (valor, _relativo(caminho))).fetchone() is not None
+
+
+def verificacoes_por_chave(caminhos: List[str], chaves: List[tuple]) -> dict:
+    """
+    {(referencia, indice, concurso): entrada atual} nos ficheiros dados (o
+    JSON compactado e o diário, por esta ordem): fica a última entrada de
+    cada chave, como em historico_verificacoes.indexar.
+    """
+    ficheiros = [_relativo(caminho) for caminho in caminhos]
+    marcadores = ", ".join("?" for _ in ficheiros)
+    ordem = " ".join(f"WHEN ? THEN {i}" for i in range(len(ficheiros)))
+    encontradas = {}
+    with _lock:
+        bd = ligar()
+        for chave in set(chaves):
+            linhas = bd.execute(
+                f"SELECT dados FROM verificacoes WHERE referencia IS ? AND indice_aposta IS ?"
+                f" AND concurso_sorteio IS ? AND ficheiro IN ({marcadores})"
+                f" ORDER BY CASE ficheiro {ordem} END, posicao", (*chave, *ficheiros, *ficheiros)).fetchall()
+            if linhas:
+                encontradas[chave] = json.loads(linhas[-1][0])
+    return encontradas
+
+
+def total_verificacoes(caminhos: List[str]) -> int:
+    """Número de chaves distintas nos ficheiros de verificações dados."""
+    ficheiros = [_relativo(caminho) for caminho in caminhos]
+    marcadores = ", ".join("?" for _ in ficheiros)
+    with _lock:
+        return ligar().execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM verificacoes WHERE ficheiro IN ({marcadores})"
+            " GROUP BY referencia, indice_aposta, concurso_sorteio)", ficheiros).fetchone()[0]
+
+
+def contar_linhas(caminho: str) -> int:
+    tabela = tabela_do_ficheiro(caminho)
+    if tabela in (None, "documentos"):
+        return 0
+    with _lock:
+        return ligar().execute(f"SELECT COUNT(*) FROM {tabela} WHERE ficheiro = ?",
+                               (_relativo(caminho),)).fetchone()[0]
+
+
+# Para uso fora do pipeline (ex.: `python -c` ou um notebook sobre o .db)
+
+def _consultar(sql: str, parametros: tuple) -> List[Any]:
+    with _lock:
+        return [json.loads(dados) for (dados,) in ligar().execute(sql, parametros).fetchall()]
+
+
+def procurar_boletim(referencia: str) -> Optional[dict]:
+    encontrados = _consultar("SELECT dados FROM boletins WHERE referencia_unica = ? LIMIT 1", (referencia,))
+    return encontrados[0] if encontrados else None
+
+
+def boletins_do_sorteio(jogo: str, data_sorteio: str) -> List[dict]:
+    """Boletins de um jogo ("euromilhoes", ...) para a data de sorteio (YYYY-MM-DD)."""
+    return _consultar("SELECT dados FROM boletins WHERE jogo = ? AND data_sorteio = ? ORDER BY ficheiro, posicao",
+                      (jogo, data_sorteio))
+
+
+def procurar_sorteio(jogo: str, data: str) -> Optional[dict]:
+    """Sorteio de um jogo numa data (YYYY-MM-DD); o ficheiro anual tem prioridade sobre o _atual."""
+    encontrados = _consultar(
+        "SELECT dados FROM sorteios WHERE jogo = ? AND data = ? ORDER BY ficheiro LIKE '%\\_atual.json' ESCAPE '\\'"
+        " LIMIT 1", (jogo, data))
+    return encontrados[0] if encontrados else None
+
+
+def verificacoes_do_boletim(referencia: str) -> List[dict]:
+    """Histórico de verificações de um boletim (sem os ficheiros _recentes)."""
+    return _consultar(
+        "SELECT dados FROM verificacoes WHERE referencia = ? AND ficheiro NOT LIKE '%\\_recentes.json' ESCAPE '\\'"
+        " ORDER BY ficheiro, posicao", (referencia,))
+
+
+def verificacoes_premiadas(jogo: Optional[str] = None) -> List[dict]:
+    if jogo:
+        return _consultar("SELECT dados FROM verificacoes WHERE jogo = ? AND ganhou = 1"
+                          " AND ficheiro NOT LIKE '%\\_recentes.json' ESCAPE '\\' ORDER BY ficheiro, posicao", (jogo,))
+    return _consultar("SELECT dados FROM verificacoes WHERE ganhou = 1"
+                      " AND ficheiro NOT LIKE '%\\_recentes.json' ESCAPE '\\' ORDER BY ficheiro, posicao", ())
+
+
+def main():
+    if not ATIVO:
+        print("❌ Defina TOL_BD=<ficheiro .db> para usar a base de dados")
+        sys.exit(1)
+    comando = sys.argv[1] if len(sys.argv) > 1 else ""
+    if comando == "importar":
+        print(f"📥 {importar()} ficheiro(s) importado(s) para {CAMINHO_BD}")
+    elif comando == "exportar":
+        destino = sys.argv[2] if len(sys.argv) > 2 else "."
+        print(f"📤 {exportar(destino)} ficheiro(s) regenerado(s) em {destino}")
+    else:
+        print("Uso: python scripts/base_dados.py importar | exportar [pasta]")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
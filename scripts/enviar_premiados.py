@@ -5,6 +5,8 @@ from email.message import EmailMessage
 from datetime import datetime
 from typing import List, Dict
 
+from premios import centimos_do_premio
+
 # ===== CONFIGURAÇÃO =====
 FICHEIRO_PREMIADOS_PENDENTES = "resultados/premiados_pendentes.json"
 
@@ -32,14 +34,12 @@ def formatar_data(data_str: str) -> str:
     except:
         return data_str
 
-def extrair_valor(premio: dict) -> float:
-    valor_str = premio.get('valor', '0').replace('€', '').replace(' ', '').replace(',', '.')
-    if 'Reembolso' in valor_str:
-        return 1.0
-    try:
-        return float(valor_str)
-    except:
-        return 0.0
+def extrair_valor(premio: dict) -> int:
+    """Valor do prémio em cêntimos ("valor_centimos" ou, em registos antigos, o texto "valor")"""
+    return centimos_do_premio(premio)
+
+def formatar_centimos(centimos: int) -> str:
+    return f"€ {centimos / 100:.2f}".replace('.', ',')
 
 def gerar_html_premiados(premiados: List[Dict]) -> str:
     """Gera HTML com cards semelhantes aos da SPA."""
@@ -55,23 +55,23 @@ def gerar_html_premiados(premiados: List[Dict]) -> str:
         
         # Processar prémios
         premios_info = []
-        valor_total = 0.0
+        valor_total = 0
         detalhes = p.get('detalhes', {})
         if 'premios' in detalhes and isinstance(detalhes['premios'], list):
             for pr in detalhes['premios']:
                 nome = pr.get('premio', 'Prémio')
                 valor = extrair_valor(pr)
                 valor_total += valor
-                premios_info.append(f"{nome}: € {valor:.2f}".replace('.', ','))
+                premios_info.append(f"{nome}: {formatar_centimos(valor)}")
         elif 'premio' in detalhes:
             pr = detalhes['premio']
             nome = pr.get('categoria', pr.get('premio', 'Prémio'))
             valor = extrair_valor(pr)
             valor_total += valor
-            premios_info.append(f"{nome}: € {valor:.2f}".replace('.', ','))
+            premios_info.append(f"{nome}: {formatar_centimos(valor)}")
 
         premios_str = '<br>'.join(premios_info) if premios_info else 'Prémio não detalhado'
-        valor_total_str = f"€ {valor_total:.2f}".replace('.', ',')
+        valor_total_str = formatar_centimos(valor_total)
 
         # Descrição da aposta
         aposta = detalhes.get('aposta', {})
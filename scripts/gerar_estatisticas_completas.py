@@ -1,52 +1,42 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 import os
 from datetime import datetime
 from collections import defaultdict
 from typing import Dict, List, Any
 
+import armazenamento
+import historico_verificacoes
+import indice_sorteios
+import premios
+
 # ===== CONFIGURAÇÃO =====
 PASTA_RESULTADOS = "resultados/"
 PASTA_APOSTAS = "apostas/"                     # ← corrigido: aponta diretamente para a pasta das apostas
 FICHEIRO_ESTATISTICAS = os.path.join(PASTA_RESULTADOS, "estatisticas_completas.json")
 
-# ===== FUNÇÕES AUXILIARES =====
-def extrair_valor_monetario(valor) -> float:
-    """
-    Converte um valor (string ou número) para float.
-    Exemplos: "2,20" → 2.20, "7.15" → 7.15, 2.2 → 2.2, "Reembolso" → 1.0
-    """
-    if valor is None:
-        return 0.0
-
-    # Se já for número, retorna diretamente
-    if isinstance(valor, (int, float)):
-        return float(valor)
+# Campos em cêntimos durante a agregação (convertidos para euros no fim)
+CAMPOS_MONETARIOS = ("total_gasto", "total_recebido", "maior_premio")
 
-    # Converte para string e limpa
-    try:
-        valor_str = str(valor).strip()
-        if not valor_str:
-            return 0.0
+# ===== FUNÇÕES AUXILIARES =====
+def centimos_para_euros(centimos) -> float:
+    return round(centimos / 100, 2)
 
-        # Trata casos especiais
-        if 'Reembolso' in valor_str:
-            return 1.0
 
-        # Remove símbolos e substitui vírgula por ponto
-        valor_limpo = valor_str.replace('€', '').replace(' ', '').replace(',', '.')
-        return float(valor_limpo)
-    except (ValueError, TypeError):
-        return 0.0
+def custos_por_aposta(valor_total_centimos: int, n_apostas: int) -> List[int]:
+    """
+    Divide o valor do boletim pelas apostas sem perder cêntimos
+    (ex.: 100 por 3 → [34, 33, 33]).
+    """
+    if not n_apostas:
+        return [0]
+    base, resto = divmod(valor_total_centimos, n_apostas)
+    return [base + 1 if i < resto else base for i in range(n_apostas)]
 
 
 def carregar_json(caminho: str):
-    if not os.path.exists(caminho):
-        return None
-    with open(caminho, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return armazenamento.ler_json(caminho)
 
 
 def carregar_boletins(jogo: str) -> Dict[str, Any]:
@@ -64,34 +54,28 @@ def carregar_boletins(jogo: str) -> Dict[str, Any]:
 
 
 def carregar_sorteios(jogo: str) -> Dict[str, Any]:
-    """Carrega sorteios oficiais de /dados/<jogo>_2026.json"""
-    caminho = os.path.join("dados/", f"{jogo}_2026.json")
-    dados = carregar_json(caminho)
-    sorteios = {}
-
-    if isinstance(dados, dict):
-        for ano, lista in dados.items():
-            for s in lista:
-                concurso = s.get("concurso")
-                if concurso:
-                    sorteios[concurso] = s
-    return sorteios
+    """Sorteios oficiais por concurso (índice partilhado com os verificadores)"""
+    return indice_sorteios.carregar_indice(jogo)["por_concurso"]
 
 
 def carregar_verificacoes(jogo: str) -> List[Dict]:
-    """Carrega verificações de resultados/<jogo>_verificacoes.json"""
+    """Carrega verificações de resultados/<jogo>_verificacoes.json (+ diário .jsonl)"""
     caminho = os.path.join(PASTA_RESULTADOS, f"{jogo}_verificacoes.json")
-    dados = carregar_json(caminho)
+    dados = historico_verificacoes.carregar_historico(caminho)
     if not dados:
         return []
 
-    # Normalizar: transformar "premio" → "premios"
+    # Normalizar: transformar "premio" → "premios" (em cópias, o histórico
+    # pode estar partilhado em memória com os verificadores)
+    normalizadas = []
     for v in dados:
+        v = dict(v)
         if "premio" in v and v["premio"]:
             v["premios"] = [v["premio"]]
         elif "premios" not in v:
             v["premios"] = []
-    return dados
+        normalizadas.append(v)
+    return normalizadas
 
 
 def calcular_mediana(valores: List[float]) -> float:
@@ -123,27 +107,26 @@ def processar_jogo(jogo: str) -> Dict[str, Any]:
 
     stats_mensais = defaultdict(lambda: {
         "total_apostas": 0,
-        "total_gasto": 0.0,
-        "total_recebido": 0.0,
+        "total_gasto": 0,
+        "total_recebido": 0,
         "ganhadoras": 0,
         "acertos_numeros": 0,
         "acertos_especial": 0,
         "valores_premios": [],
-        "maior_premio": 0.0,
+        "maior_premio": 0,
         "data_maior_premio": None
     })
 
     for ref, apostas in por_ref.items():
         boletim = boletins.get(ref, {})
-        # Usa a função melhorada para converter o valor_total
-        valor_total = extrair_valor_monetario(boletim.get("valor_total", 0))
+        valor_total = premios.valor_em_centimos(boletim.get("valor_total", 0))
         n_apostas = len(boletim.get("apostas", [])) or len(apostas)
-        custo_por_aposta = valor_total / n_apostas if n_apostas else 0
+        custos = custos_por_aposta(valor_total, n_apostas)
 
         # 🔍 LOG ATIVADO – mostra o que está a acontecer
-        print(f"   🔍 Ref: {ref} | Encontrado: {'SIM' if boletim else 'NÃO'} | valor_total: {valor_total} | n_apostas: {n_apostas} | custo_por_aposta: {custo_por_aposta}")
+        print(f"   🔍 Ref: {ref} | Encontrado: {'SIM' if boletim else 'NÃO'} | valor_total: {centimos_para_euros(valor_total)} | n_apostas: {n_apostas} | custo_por_aposta: {centimos_para_euros(valor_total / n_apostas) if n_apostas else 0}")
 
-        for v in apostas:
+        for i, v in enumerate(apostas):
             data = v.get("boletim", {}).get("data_sorteio")
             if not data:
                 continue
@@ -152,15 +135,13 @@ def processar_jogo(jogo: str) -> Dict[str, Any]:
             mes = stats_mensais[ano_mes]
 
             mes["total_apostas"] += 1
-            mes["total_gasto"] += custo_por_aposta
+            mes["total_gasto"] += custos[i % len(custos)]
 
             ac = v.get("acertos", {})
             mes["acertos_numeros"] += ac.get("numeros", 0)
             mes["acertos_especial"] += ac.get("estrelas", 0)
 
-            total_recebido = 0
-            for p in v.get("premios", []):
-                total_recebido += extrair_valor_monetario(p.get("valor", "0"))
+            total_recebido = sum(premios.centimos_do_premio(p) for p in v.get("premios", []))
 
             if total_recebido > 0:
                 mes["ganhadoras"] += 1
@@ -171,29 +152,37 @@ def processar_jogo(jogo: str) -> Dict[str, Any]:
                     mes["maior_premio"] = total_recebido
                     mes["data_maior_premio"] = data
 
-    # Calcular derivados
-    for mes, d in stats_mensais.items():
-        d["saldo"] = round(d["total_recebido"] - d["total_gasto"], 2)
-        d["percentagem_ganhadoras"] = round((d["ganhadoras"] / d["total_apostas"] * 100) if d["total_apostas"] else 0, 2)
-        d["media_premios"] = round(d["total_recebido"] / d["ganhadoras"], 2) if d["ganhadoras"] else 0
-        d["mediana_premios"] = round(calcular_mediana(d["valores_premios"]), 2)
+    return dict(stats_mensais)
+
+
+def finalizar(d: Dict) -> Dict:
+    """Calcula os derivados e converte os cêntimos para euros (formato da app)."""
+    gasto = d["total_gasto"]
+    recebido = d["total_recebido"]
+    for campo in CAMPOS_MONETARIOS:
+        d[campo] = centimos_para_euros(d[campo])
+
+    d["saldo"] = centimos_para_euros(recebido - gasto)
+    d["percentagem_ganhadoras"] = round((d["ganhadoras"] / d["total_apostas"] * 100) if d["total_apostas"] else 0, 2)
+    if "acertos_numeros" in d:
+        d["media_premios"] = centimos_para_euros(recebido / d["ganhadoras"]) if d["ganhadoras"] else 0
+        if "valores_premios" in d:
+            d["mediana_premios"] = centimos_para_euros(calcular_mediana(d.pop("valores_premios")))
         d["media_acertos_numeros"] = round(d["acertos_numeros"] / d["total_apostas"], 2)
         d["media_acertos_especial"] = round(d["acertos_especial"] / d["total_apostas"], 2)
-        del d["valores_premios"]
-
-    return dict(stats_mensais)
+    return d
 
 
 # ===== ANUAL E GLOBAL =====
 def agregar_anual(mensais: Dict) -> Dict:
     anuais = defaultdict(lambda: {
         "total_apostas": 0,
-        "total_gasto": 0.0,
-        "total_recebido": 0.0,
+        "total_gasto": 0,
+        "total_recebido": 0,
         "ganhadoras": 0,
         "acertos_numeros": 0,
         "acertos_especial": 0,
-        "maior_premio": 0.0,
+        "maior_premio": 0,
         "data_maior_premio": None
     })
 
@@ -212,23 +201,16 @@ def agregar_anual(mensais: Dict) -> Dict:
             a["maior_premio"] = d["maior_premio"]
             a["data_maior_premio"] = d["data_maior_premio"]
 
-    for ano, d in anuais.items():
-        d["saldo"] = round(d["total_recebido"] - d["total_gasto"], 2)
-        d["percentagem_ganhadoras"] = round((d["ganhadoras"] / d["total_apostas"] * 100) if d["total_apostas"] else 0, 2)
-        d["media_premios"] = round(d["total_recebido"] / d["ganhadoras"], 2) if d["ganhadoras"] else 0
-        d["media_acertos_numeros"] = round(d["acertos_numeros"] / d["total_apostas"], 2)
-        d["media_acertos_especial"] = round(d["acertos_especial"] / d["total_apostas"], 2)
-
     return dict(anuais)
 
 
 def calcular_globais(estatisticas_por_jogo: Dict) -> Dict:
     global_mensal = defaultdict(lambda: {
         "total_apostas": 0,
-        "total_gasto": 0.0,
-        "total_recebido": 0.0,
+        "total_gasto": 0,
+        "total_recebido": 0,
         "ganhadoras": 0,
-        "maior_premio": 0.0,
+        "maior_premio": 0,
         "data_maior_premio": None
     })
 
@@ -246,10 +228,10 @@ def calcular_globais(estatisticas_por_jogo: Dict) -> Dict:
 
     global_anual = defaultdict(lambda: {
         "total_apostas": 0,
-        "total_gasto": 0.0,
-        "total_recebido": 0.0,
+        "total_gasto": 0,
+        "total_recebido": 0,
         "ganhadoras": 0,
-        "maior_premio": 0.0,
+        "maior_premio": 0,
         "data_maior_premio": None
     })
 
@@ -265,10 +247,6 @@ def calcular_globais(estatisticas_por_jogo: Dict) -> Dict:
             g["maior_premio"] = d["maior_premio"]
             g["data_maior_premio"] = d["data_maior_premio"]
 
-    for d in list(global_mensal.values()) + list(global_anual.values()):
-        d["saldo"] = round(d["total_recebido"] - d["total_gasto"], 2)
-        d["percentagem_ganhadoras"] = round((d["ganhadoras"] / d["total_apostas"] * 100) if d["total_apostas"] else 0, 2)
-
     return {"mensal": dict(global_mensal), "anual": dict(global_anual)}
 
 
@@ -283,7 +261,7 @@ def main():
         "mensal": {},
         "anual": {},
         "global": {},
-        "ultima_atualizacao": datetime.now().isoformat()
+        "ultima_atualizacao": None
     }
 
     for jogo in jogos:
@@ -301,9 +279,22 @@ def main():
         estatisticas["global"] = calcular_globais(estatisticas["mensal"])
         print("\n🌍 Estatísticas globais calculadas.")
 
-    os.makedirs(PASTA_RESULTADOS, exist_ok=True)
-    with open(FICHEIRO_ESTATISTICAS, "w", encoding="utf-8") as f:
-        json.dump(estatisticas, f, indent=2, ensure_ascii=False)
+    # Agregação feita em cêntimos (exata); só agora passa a euros
+    for por_jogo in (estatisticas["mensal"], estatisticas["anual"], estatisticas["global"]):
+        for periodos in por_jogo.values():
+            for d in periodos.values():
+                finalizar(d)
+
+    # Sem alterações nos números, mantém a data anterior (ficheiro igual → sem commit)
+    anteriores = armazenamento.ler_json(FICHEIRO_ESTATISTICAS, {})
+    if isinstance(anteriores, dict) and anteriores.get("ultima_atualizacao") and \
+            {k: v for k, v in anteriores.items() if k != "ultima_atualizacao"} == \
+            {k: v for k, v in estatisticas.items() if k != "ultima_atualizacao"}:
+        estatisticas["ultima_atualizacao"] = anteriores["ultima_atualizacao"]
+    else:
+        estatisticas["ultima_atualizacao"] = datetime.now().isoformat()
+
+    armazenamento.escrever_json(FICHEIRO_ESTATISTICAS, estatisticas)
 
     print(f"\n✅ Estatísticas guardadas em: {FICHEIRO_ESTATISTICAS}")
 
@@ -1,6 +1,5 @@
 import json
 import os
-import glob
 import time
 from datetime import datetime
 from typing import Dict, List
@@ -8,6 +7,9 @@ from typing import Dict, List
 # Nova dependência para envio direto de Web Push
 from pywebpush import webpush, WebPushException
 
+import armazenamento
+from premios import centimos_do_premio
+
 # ===== CONFIGURAÇÃO =====
 PASTA_RESULTADOS = "resultados/"
 FICHEIRO_NOTIFICACOES_ATIVAS = os.path.join(PASTA_RESULTADOS, "notificacoes_ativas.json")
@@ -40,7 +42,7 @@ def carregar_resultados_recentes() -> List[Dict]:
     """Carrega todos os ficheiros *_recentes.json"""
     todos_resultados = []
     padrao = os.path.join(PASTA_RESULTADOS, "*_recentes.json")
-    ficheiros = glob.glob(padrao)
+    ficheiros = armazenamento.listar(padrao)
     
     print(f"📁 Encontrados {len(ficheiros)} ficheiros recentes")
     
@@ -49,10 +51,11 @@ def carregar_resultados_recentes() -> List[Dict]:
         jogo = nome.replace('_recentes.json', '')
         
         try:
-            with open(ficheiro, "r", encoding="utf-8") as f:
-                resultados = json.load(f)
+            resultados = armazenamento.ler_json(ficheiro, [])
             
             for resultado in resultados:
+                # Cópia: o original pode estar partilhado em memória com os verificadores
+                resultado = dict(resultado)
                 resultado['_jogo'] = jogo
                 resultado['_id'] = gerar_id_unico(resultado, jogo)
                 todos_resultados.append(resultado)
@@ -65,13 +68,10 @@ def carregar_resultados_recentes() -> List[Dict]:
 
 def carregar_json(caminho: str) -> List[Dict]:
     """Função genérica para carregar ficheiros JSON"""
-    if os.path.exists(caminho):
-        try:
-            with open(caminho, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            return []
-    return []
+    try:
+        return armazenamento.ler_json(caminho, [])
+    except:
+        return []
 
 
 def gerar_resumo(resultado: dict) -> str:
@@ -95,16 +95,10 @@ def gerar_resumo(resultado: dict) -> str:
             return f"{numeros} números {'+ Dream' if dream else ''}"
         return f"{numeros} acertos"
     
-    # Calcular total dos prémios
-    total = 0.0
-    for p in premios:
-        valor_str = p.get('valor', '0').replace('€', '').replace(' ', '').replace(',', '.')
-        try:
-            total += float(valor_str)
-        except ValueError:
-            pass
+    # Calcular total dos prémios (em cêntimos)
+    total = sum(centimos_do_premio(p) for p in premios)
     
-    total_str = f"€ {total:.2f}".replace('.', ',')
+    total_str = f"€ {total / 100:.2f}".replace('.', ',')
     
     # Tratamento específico para Totoloto
     if jogo == 'totoloto':
@@ -142,13 +136,12 @@ def enviar_web_push_direto(tipo: str, jogo: str) -> bool:
         print("   ⚠️ VAPID_PRIVATE_KEY não configurada. Push não será enviada.")
         return False
 
-    if not os.path.exists(SUBSCRIPTION_FILE):
+    if not armazenamento.existe(SUBSCRIPTION_FILE):
         print(f"   ⚠️ Ficheiro {SUBSCRIPTION_FILE} não encontrado. Push não enviada.")
         return False
 
     try:
-        with open(SUBSCRIPTION_FILE, "r", encoding="utf-8") as f:
-            subscriptions = json.load(f)
+        subscriptions = armazenamento.ler_json(SUBSCRIPTION_FILE)
     except Exception as e:
         print(f"   ❌ Erro ao ler {SUBSCRIPTION_FILE}: {e}")
         return False
@@ -212,8 +205,7 @@ def enviar_web_push_direto(tipo: str, jogo: str) -> bool:
     # Atualizar ficheiro se houve remoções
     if len(subscriptions_validas) != len(subscriptions):
         try:
-            with open(SUBSCRIPTION_FILE, "w", encoding="utf-8") as f:
-                json.dump(subscriptions_validas, f, indent=2)
+            armazenamento.escrever_json(SUBSCRIPTION_FILE, subscriptions_validas, ensure_ascii=True)
             print(f"   ♻️ {SUBSCRIPTION_FILE} atualizado (removidas {len(subscriptions) - len(subscriptions_validas)} expiradas).")
         except Exception as e:
             print(f"   ⚠️ Erro ao escrever {SUBSCRIPTION_FILE}: {e}")
@@ -263,8 +255,7 @@ def main():
     # 4. Merge e Gravação das notificações ativas (mantido igual)
     lista_final_ativas = ativas + novas_notificacoes
 
-    with open(FICHEIRO_NOTIFICACOES_ATIVAS, "w", encoding="utf-8") as f:
-        json.dump(lista_final_ativas, f, indent=2, ensure_ascii=False)
+    armazenamento.escrever_json(FICHEIRO_NOTIFICACOES_ATIVAS, lista_final_ativas)
     
     print(f"\n✅ Sucesso: {len(novas_notificacoes)} notificações adicionadas.")
 
@@ -290,8 +281,7 @@ def main():
             novos_premiados.append(premiado['id'])
 
     if novos_premiados:
-        with open(caminho_premiados, "w", encoding="utf-8") as f:
-            json.dump(premiados_existentes, f, indent=2, ensure_ascii=False)
+        armazenamento.escrever_json(caminho_premiados, premiados_existentes)
         print(f"   🏆 {len(novos_premiados)} prémio(s) adicionado(s) a premiados_pendentes.json")
     
     # 6. Enviar Web Pushes diretamente para cada jogo
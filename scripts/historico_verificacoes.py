@@ -0,0 +1,137 @@
+import os
+from typing import Dict, List, Tuple
+
+import armazenamento
+
+# ===== CONFIGURACAO =====
+# Registos no diario a partir dos quais o historico e compactado
+LIMITE_DIARIO = 500
+
+# ============================================================
+# HISTORICO DE VERIFICACOES (comum aos 4 jogos)
+# ============================================================
+# O historico <jogo>_verificacoes.json e tratado como um dicionario
+# indexado por (referencia, indice, concurso): um resultado novo
+# substitui o existente com a mesma chave (ex.: sorteio corrigido)
+# ou e acrescentado no fim. Custo linear no tamanho do historico.
+#
+# Cada execucao so acrescenta os resultados novos ao diario
+# <jogo>_verificacoes.jsonl. Quando o diario passa LIMITE_DIARIO
+# registos, e fundido no JSON (mesmo formato de sempre) e esvaziado.
+# Leitores do historico devem usar carregar_historico().
+#
+# Com TOL_BD (base de dados SQLite, ver base_dados.py) o upsert nao le o
+# historico: os resultados atuais das chaves novas sao consultas ao indice
+# (referencia, indice, concurso) da tabela verificacoes. O historico
+# completo so e lido para compactar.
+
+def chave_verificacao(entrada: dict) -> tuple:
+    boletim = entrada.get("boletim", {})
+    return (
+        boletim.get("referencia"),
+        entrada.get("aposta", {}).get("indice"),
+        boletim.get("concurso_sorteio"),
+    )
+
+
+def indexar(historico: List[dict]) -> Dict[tuple, dict]:
+    # Em chaves repetidas fica a ultima entrada (mantendo a posicao da primeira)
+    return {chave_verificacao(entrada): entrada for entrada in historico}
+
+
+def fundir(historico: List[dict], novos: List[dict]) -> Tuple[List[dict], int, int]:
+    """
+    Junta `novos` ao historico (upsert por chave).
+    Devolve (historico atualizado, adicionados, substituidos).
+    """
+    por_chave = indexar(historico)
+    adicionados = 0
+    substituidos = 0
+    for novo in novos:
+        chave = chave_verificacao(novo)
+        if chave in por_chave:
+            substituidos += 1
+        else:
+            adicionados += 1
+        por_chave[chave] = novo
+    return list(por_chave.values()), adicionados, substituidos
+
+
+def caminho_diario(ficheiro: str) -> str:
+    return os.path.splitext(ficheiro)[0] + ".jsonl"
+
+
+def _carregar(ficheiro: str) -> Tuple[List[dict], int]:
+    """Historico completo (JSON compactado + diario) e n.º de registos no diario."""
+    historico = armazenamento.ler_json(ficheiro, [])
+    diario = armazenamento.ler_jsonl(caminho_diario(ficheiro))
+    if diario:
+        historico, _, _ = fundir(historico, diario)
+    return historico, len(diario)
+
+
+def carregar_historico(ficheiro: str) -> List[dict]:
+    return _carregar(ficheiro)[0]
+
+
+def compactar(ficheiro: str, historico: List[dict]):
+    armazenamento.escrever_json(ficheiro, historico)
+    armazenamento.limpar_jsonl(caminho_diario(ficheiro))
+
+
+def _atualizar_com_bd(bd, ficheiro: str, novos: List[dict]) -> Tuple[int, int, int]:
+    """atualizar_historico com as consultas na base de dados (ficheiros ja sincronizados)."""
+    caminhos = [ficheiro, caminho_diario(ficheiro)]
+    existentes = bd.verificacoes_por_chave(caminhos, [chave_verificacao(n) for n in novos])
+
+    # Resultados iguais aos que ja estao no historico nao sao gravados
+    novos = [n for n in novos if existentes.get(chave_verificacao(n)) != n]
+    total = bd.total_verificacoes(caminhos)
+    if not novos:
+        return total, 0, 0
+
+    chaves = set(existentes)
+    adicionados = 0
+    for novo in novos:
+        if chave_verificacao(novo) not in chaves:
+            chaves.add(chave_verificacao(novo))
+            adicionados += 1
+    substituidos = len(novos) - adicionados
+
+    if bd.contar_linhas(caminho_diario(ficheiro)) + len(novos) > LIMITE_DIARIO:
+        historico, _, _ = fundir(carregar_historico(ficheiro), novos)
+        compactar(ficheiro, historico)
+    else:
+        armazenamento.acrescentar_jsonl(caminho_diario(ficheiro), novos)
+    return total + adicionados, adicionados, substituidos
+
+
+def atualizar_historico(ficheiro: str, novos: List[dict]) -> Tuple[int, int, int]:
+    """
+    Aplica os novos resultados ao historico: acrescenta-os ao diario ou,
+    se o diario ficar grande (ou ainda nao houver JSON), compacta tudo.
+    Devolve (total no historico, adicionados, substituidos).
+    """
+    bd = armazenamento.base_dados_ativa()
+    diario = caminho_diario(ficheiro)
+    # Com escritas ainda em memoria (modo diferido) a base de dados nao as tem
+    if bd and not armazenamento.pendente(ficheiro) and not armazenamento.pendente(diario) \
+            and bd.sincronizar(ficheiro):
+        bd.sincronizar(diario)
+        return _atualizar_com_bd(bd, ficheiro, novos)
+
+    historico, n_diario = _carregar(ficheiro)
+
+    # Resultados iguais aos que ja estao no historico nao sao gravados
+    existentes = indexar(historico)
+    novos = [n for n in novos if existentes.get(chave_verificacao(n)) != n]
+    if not novos:
+        return len(historico), 0, 0
+
+    historico, adicionados, substituidos = fundir(historico, novos)
+
+    if not armazenamento.existe(ficheiro) or n_diario + len(novos) > LIMITE_DIARIO:
+        compactar(ficheiro, historico)
+    else:
+        armazenamento.acrescentar_jsonl(caminho_diario(ficheiro), novos)
+    return len(historico), adicionados, substituidos
@@ -0,0 +1,112 @@
+import hashlib
+import json
+from typing import Dict, Optional
+
+import armazenamento
+
+# ===== CONFIGURACAO =====
+# Formato dos ficheiros apostas/<jogo>.json (igual ao que sempre se gravou)
+INDENT_APOSTAS = 4
+
+# ============================================================
+# INDICE DE DUPLICADOS DOS FICHEIROS DE APOSTAS
+# ============================================================
+# Para cada apostas/<jogo>.json monta-se:
+#   - o conjunto das referencias unicas;
+#   - o conjunto das assinaturas canonicas dos boletins: hash de
+#     (data_sorteio, linhas de aposta ordenadas, cada uma com os numeros,
+#     estrelas e dream ordenados e o codigo) - o mesmo criterio da antiga
+#     comparacao par a par, mas sem depender da ordem das linhas.
+# Um boletim novo e duplicado se a referencia ou a assinatura ja existirem
+# (duas consultas a conjuntos, em vez de percorrer o historico).
+#
+# Os conjuntos sao montados numa passagem pelo historico ao carregar o
+# ficheiro e vivem so em memoria: guarda-los a parte obrigava a validar
+# o indice contra o ficheiro (que a PWA tambem altera), o que custa tanto
+# como reconstrui-los.
+#
+# Com TOL_BD (base de dados SQLite, ver base_dados.py) o historico nao e
+# lido para procurar duplicados: a referencia e a assinatura sao consultas
+# aos indices da tabela boletins (depois de base_dados.sincronizar copiar
+# o ficheiro, se mudou por outra via). Os conjuntos ficam so com os
+# boletins acrescentados nesta execucao, e o historico so e lido quando
+# ha um boletim novo para gravar.
+
+
+def assinatura(jogo: dict) -> str:
+    linhas = sorted(
+        json.dumps([
+            sorted(map(str, aposta.get("numeros") or [])),
+            sorted(map(str, aposta.get("estrelas") or [])),
+            sorted(map(str, aposta.get("dream") or [])),
+            aposta.get("codigo"),
+        ], ensure_ascii=False)
+        for aposta in jogo.get("apostas") or []
+    )
+    canonica = json.dumps([jogo.get("data_sorteio"), linhas], ensure_ascii=False)
+    return hashlib.md5(canonica.encode("utf-8")).hexdigest()
+
+
+def carregar(caminho_apostas: str) -> Dict:
+    """
+    Historico de um ficheiro de apostas e o respetivo indice, num
+    dicionario usado por duplicado(), acrescentar() e gravar().
+    """
+    bd = armazenamento.base_dados_ativa()
+    if bd and not armazenamento.pendente(caminho_apostas) and bd.sincronizar(caminho_apostas):
+        return {
+            "caminho": caminho_apostas,
+            "historico": None,  # lido em acrescentar()
+            "referencias": set(),
+            "assinaturas": set(),
+            "bd": bd,
+            "alterado": False,
+        }
+
+    historico = armazenamento.ler_json(caminho_apostas, [])
+    return {
+        "caminho": caminho_apostas,
+        "historico": historico,
+        "referencias": {j.get("referencia_unica") for j in historico if j.get("referencia_unica")},
+        "assinaturas": {assinatura(j) for j in historico},
+        "bd": None,
+        "alterado": False,
+    }
+
+
+def referencia_registada(estado: Dict, referencia: str) -> bool:
+    if referencia in estado["referencias"]:
+        return True
+    return bool(estado["bd"] and estado["bd"].existe_boletim(estado["caminho"], referencia=referencia))
+
+
+def duplicado(estado: Dict, jogo: dict) -> Optional[str]:
+    """"referencia" ou "conteudo" se o boletim ja estiver registado, senao None."""
+    ref = jogo.get("referencia_unica")
+    if ref and referencia_registada(estado, ref):
+        return "referencia"
+    chave = assinatura(jogo)
+    if chave in estado["assinaturas"] or \
+            (estado["bd"] and estado["bd"].existe_boletim(estado["caminho"], assinatura=chave)):
+        return "conteudo"
+    return None
+
+
+def acrescentar(estado: Dict, jogo: dict):
+    """Acrescenta o boletim em memoria (gravado so em gravar())."""
+    if estado["historico"] is None:
+        estado["historico"] = armazenamento.ler_json(estado["caminho"], [])
+    estado["historico"].append(jogo)
+    if jogo.get("referencia_unica"):
+        estado["referencias"].add(jogo["referencia_unica"])
+    estado["assinaturas"].add(assinatura(jogo))
+    estado["alterado"] = True
+
+
+def gravar(estado: Dict) -> bool:
+    """Grava o ficheiro de apostas (uma escrita para todos os boletins novos)."""
+    if not estado["alterado"]:
+        return False
+    armazenamento.escrever_json(estado["caminho"], estado["historico"], indent=INDENT_APOSTAS)
+    estado["alterado"] = False
+    return True
@@ -0,0 +1,168 @@
+import json
+import os
+import glob
+import re
+from typing import Dict, Optional, Tuple
+
+import premios
+
+# ===== CONFIGURACAO =====
+PASTA_DADOS = "dados/"
+
+# Prefixo dos ficheiros anuais de cada jogo (<prefixo>_YYYY.json)
+PREFIXOS_JOGOS = {
+    "euromilhoes": "euromilhoes",
+    "totoloto": "totoloto_sc",
+    "eurodreams": "eurodreams",
+    "milhao": "milhao",
+}
+
+# Cache por processo: caminho -> (mtime, tamanho, sorteios do ficheiro)
+_cache_ficheiros: Dict[str, tuple] = {}
+# Cache por processo: jogo -> (assinatura dos ficheiros, indice)
+_cache_indices: Dict[str, tuple] = {}
+
+
+# ============================================================
+# CARREGAMENTO
+# ============================================================
+
+def _ler_ficheiro_ano(caminho: str, ano: str) -> Optional[list]:
+    """Le um ficheiro <jogo>_YYYY.json (reutiliza a versao em memoria se nao mudou)."""
+    estado = os.stat(caminho)
+    em_cache = _cache_ficheiros.get(caminho)
+    if em_cache and em_cache[0] == estado.st_mtime_ns and em_cache[1] == estado.st_size:
+        return em_cache[2]
+
+    with open(caminho, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+
+    if isinstance(dados, dict) and isinstance(dados.get(ano), list):
+        lista = dados[ano]
+    elif isinstance(dados, list):
+        lista = dados
+    else:
+        print(f"Aviso: Formato invalido em {caminho}")
+        return None
+
+    _cache_ficheiros[caminho] = (estado.st_mtime_ns, estado.st_size, lista)
+    return lista
+
+
+def _listar_ficheiros(jogo: str, pasta: str) -> Dict[str, str]:
+    """Devolve {ano: caminho} dos ficheiros anuais (ignora <jogo>_atual.json)."""
+    prefixo = PREFIXOS_JOGOS.get(jogo, jogo)
+    padrao_nome = re.compile(rf"{re.escape(prefixo)}_(\d{{4}})\.json$")
+    ficheiros = {}
+    for caminho in glob.glob(os.path.join(pasta, f"{prefixo}_*.json")):
+        match = padrao_nome.match(os.path.basename(caminho))
+        if match:
+            ficheiros[match.group(1)] = caminho
+    return ficheiros
+
+
+def carregar_indice(jogo: str, pasta: str = PASTA_DADOS) -> dict:
+    """
+    Carrega todos os sorteios de um jogo e devolve o indice partilhado:
+      - "anos":               {ano: lista de sorteios}
+      - "por_data":           {"DD/MM/YYYY": sorteio}
+      - "por_concurso":       {"011/2026": sorteio}
+      - "por_data_concurso":  {"DD/MM/YYYY|011/2026": sorteio}
+      - "premios":            {id(sorteio): premios compilados (ver premios.py)}
+    O indice fica em memoria e e reutilizado por todos os verificadores
+    do mesmo processo enquanto os ficheiros nao mudarem.
+    """
+    ficheiros = _listar_ficheiros(jogo, pasta)
+    assinatura = []
+    for ano, caminho in sorted(ficheiros.items()):
+        try:
+            estado = os.stat(caminho)
+        except OSError:
+            continue
+        assinatura.append((caminho, estado.st_mtime_ns, estado.st_size))
+    assinatura = tuple(assinatura)
+
+    em_cache = _cache_indices.get(jogo)
+    if em_cache and em_cache[0] == assinatura:
+        return em_cache[1]
+
+    indice = {
+        "anos": {},
+        "por_data": {},
+        "por_concurso": {},
+        "por_data_concurso": {},
+        "premios": {},
+    }
+
+    for ano, caminho in sorted(ficheiros.items()):
+        try:
+            lista = _ler_ficheiro_ano(caminho, ano)
+        except Exception as e:
+            print(f"Erro ao carregar {caminho}: {e}")
+            continue
+        if lista is None:
+            continue
+
+        indice["anos"][ano] = lista
+        for sorteio in lista:
+            data = sorteio.get("data")
+            concurso = sorteio.get("concurso")
+            # Data e concurso: primeira ocorrencia ganha (igual a antiga
+            # pesquisa linear, que parava no primeiro sorteio encontrado)
+            if data:
+                indice["por_data"].setdefault(data, sorteio)
+            if concurso:
+                indice["por_concurso"].setdefault(concurso, sorteio)
+            # Data + concurso: ultima ocorrencia ganha (igual ao antigo
+            # dicionario {"data|concurso": sorteio}, preenchido por atribuicao)
+            indice["por_data_concurso"][f"{data}|{concurso}"] = sorteio
+            indice["premios"][id(sorteio)] = premios.compilar_premios(sorteio)
+
+    _cache_indices[jogo] = (assinatura, indice)
+    return indice
+
+
+def premios_do_sorteio(indice: dict, sorteio: dict) -> dict:
+    """Premios compilados de um sorteio do indice ({ordem: premio})."""
+    compilado = indice["premios"].get(id(sorteio))
+    if compilado is None:
+        compilado = indice["premios"][id(sorteio)] = premios.compilar_premios(sorteio)
+    return compilado
+
+
+def total_sorteios(indice: dict) -> int:
+    return sum(len(lista) for lista in indice["anos"].values())
+
+
+# ============================================================
+# PESQUISA
+# ============================================================
+
+def normalizar_data_para_busca(data_aposta: str) -> str:
+    """Converte data do formato ISO (YYYY-MM-DD) para o formato do sorteio (DD/MM/YYYY)"""
+    try:
+        ano, mes, dia = data_aposta.split('-')
+        return f"{dia}/{mes}/{ano}"
+    except:
+        return data_aposta
+
+
+def procurar_sorteio(indice: dict, data_aposta: str, concurso: Optional[str] = None) -> Tuple[Optional[dict], str]:
+    """
+    Procura o sorteio de um boletim (DUPLA VALIDACAO):
+    1. Data + concurso (se o boletim tiver concurso)
+    2. Apenas data
+    Devolve (sorteio, metodo) ou (None, "").
+    """
+    data_formatada = normalizar_data_para_busca(data_aposta)
+
+    if concurso:
+        sorteio = indice["por_data_concurso"].get(f"{data_formatada}|{concurso}")
+        if sorteio:
+            return sorteio, "data + concurso"
+
+    sorteio = indice["por_data"].get(data_formatada)
+    if sorteio:
+        return sorteio, "apenas data"
+
+    return None, ""
@@ -0,0 +1,70 @@
+import os
+from typing import Dict, Iterable, Optional
+
+import armazenamento
+
+# ===== CONFIGURACAO =====
+# Junto da cache de respostas do OCR: fora do git, guardado entre
+# execucoes pelo actions/cache (uma execucao que falhe deixa as imagens
+# em uploads/ e a seguinte ja nao as volta a ler)
+FICHEIRO_INDICE = ".cache_ocr/indice_uploads.json"
+# No GitHub Actions cada execucao parte de um checkout novo, em que todos
+# os ficheiros tem a data de modificacao do checkout. Os uploads da PWA
+# tem nomes unicos (foto_<ms>_<aleatorio>) e nunca sao reescritos, por
+# isso ai a impressao digital e so (nome, tamanho).
+VERIFICAR_MTIME = os.getenv("GITHUB_ACTIONS") != "true"
+
+# ============================================================
+# IMPRESSOES DIGITAIS DOS UPLOADS (nome, tamanho, mtime -> MD5)
+# ============================================================
+# Cada execucao do OCR precisava do MD5 de todos os ficheiros em uploads/
+# para saber se ja estavam no registo de processamento. Com este indice,
+# um ficheiro que nao mudou desde a ultima execucao nao volta a ser lido:
+# o MD5 guardado responde logo a "ja foi processado?" (o registo e um
+# dicionario indexado pelo MD5).
+#
+# So os ficheiros ainda em uploads/ sao indexados: depois de processadas,
+# as imagens sao movidas para uploads/processadas/<mes> e o OCR nunca mais
+# as lista, seja qual for o tamanho do historico.
+# Formato: {"<nome>": {"tamanho": int, "mtime": int (ns), "hash": "<md5>"}}
+
+
+def carregar_indice(ficheiro: str = FICHEIRO_INDICE) -> Dict[str, dict]:
+    indice = armazenamento.ler_json(ficheiro, {})
+    return indice if isinstance(indice, dict) else {}
+
+
+def hash_conhecido(indice: Dict[str, dict], caminho: str) -> Optional[str]:
+    """MD5 guardado para o ficheiro, se a impressao digital nao mudou (senao None)."""
+    entrada = indice.get(os.path.basename(caminho))
+    if not entrada:
+        return None
+    try:
+        estado = os.stat(caminho)
+    except OSError:
+        return None
+    if entrada.get("tamanho") != estado.st_size:
+        return None
+    if VERIFICAR_MTIME and entrada.get("mtime") != estado.st_mtime_ns:
+        return None
+    return entrada.get("hash")
+
+
+def registar(indice: Dict[str, dict], caminho: str, img_hash: str):
+    estado = os.stat(caminho)
+    indice[os.path.basename(caminho)] = {
+        "tamanho": estado.st_size,
+        "mtime": estado.st_mtime_ns,
+        "hash": img_hash,
+    }
+
+
+def guardar_indice(indice: Dict[str, dict], nomes: Iterable[str], ficheiro: str = FICHEIRO_INDICE):
+    """
+    Grava so as entradas dos ficheiros em `nomes` (os que estao em uploads/
+    nesta execucao): as imagens ja movidas para processadas/ nao voltam a
+    ser listadas e o indice nao cresce com o historico.
+    """
+    nomes = set(nomes)
+    os.makedirs(os.path.dirname(ficheiro) or ".", exist_ok=True)
+    armazenamento.escrever_json(ficheiro, {nome: indice[nome] for nome in sorted(indice) if nome in nomes})
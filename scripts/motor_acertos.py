@@ -0,0 +1,99 @@
+from typing import Callable, Dict, Iterable, List, Tuple
+
+# NumPy e opcional: so compensa em lotes grandes (ex.: apostas de grupo)
+try:
+    import numpy as np
+    _bitwise_count = getattr(np, "bitwise_count", None)  # numpy >= 2.0
+except ImportError:
+    np = None
+    _bitwise_count = None
+
+# ===== CONFIGURACAO =====
+LOTE_MINIMO_NUMPY = 512
+LIMITE_UINT64 = 1 << 64
+
+# ============================================================
+# MOTOR DE ACERTOS (Euromilhoes, Totoloto, EuroDreams)
+# ============================================================
+# Cada linha de aposta e cada sorteio sao codificados em mascaras de bits
+# (bit n ligado = numero n escolhido; numeros ate 50 cabem em 64 bits).
+# Os acertos sao popcount(aposta & sorteio), calculados num unico passo
+# por sorteio, e o premio sai de uma tabela (acertos_n, acertos_especial)
+# montada uma vez por sorteio.
+
+def mascara(valores) -> int:
+    """Converte uma lista de numeros ("07", "12", 3...) numa mascara de bits."""
+    if not isinstance(valores, (list, tuple, set)):
+        valores = [valores]
+    m = 0
+    for v in valores:
+        texto = str(v).strip()
+        if texto.isdigit():
+            m |= 1 << int(texto)
+    return m
+
+
+def decodificar(m: int) -> List[str]:
+    """Mascara -> lista ordenada de numeros com 2 digitos."""
+    numeros = []
+    n = 0
+    while m:
+        if m & 1:
+            numeros.append(str(n).zfill(2))
+        m >>= 1
+        n += 1
+    return numeros
+
+
+def contar_lote(mascaras: List[int], mascara_sorteio: int) -> List[int]:
+    """Numero de acertos de cada mascara contra a do sorteio."""
+    # Um numero fora do jogo (ex.: "75" lido mal pelo OCR) da uma mascara
+    # com mais de 64 bits, que nao cabe em uint64: conta-se em Python
+    if (_bitwise_count is not None and len(mascaras) >= LOTE_MINIMO_NUMPY
+            and max(mascaras) < LIMITE_UINT64 and mascara_sorteio < LIMITE_UINT64):
+        arr = np.array(mascaras, dtype=np.uint64)
+        return _bitwise_count(arr & np.uint64(mascara_sorteio)).tolist()
+    return [(m & mascara_sorteio).bit_count() for m in mascaras]
+
+
+def calcular_acertos_lote(pendentes: List[Tuple[dict, dict]],
+                          mascaras_linha: Callable[[dict], Tuple[int, int]],
+                          mascaras_sorteio: Callable[[dict], Tuple[int, int]]) -> List[List[Tuple[int, int]]]:
+    """
+    pendentes: [(boletim, sorteio)] pela ordem de verificacao.
+    Agrupa todas as linhas de todos os boletins pelo sorteio respetivo e
+    conta os acertos num lote por sorteio.
+    Devolve, por boletim, a lista [(acertos_numeros, acertos_especial)]
+    de cada linha (mesma ordem de boletim["apostas"]).
+    """
+    acertos = [[None] * len(b.get("apostas", [])) for b, _ in pendentes]
+    grupos: Dict[int, Tuple[dict, list]] = {}
+
+    for i, (boletim, sorteio) in enumerate(pendentes):
+        _, posicoes = grupos.setdefault(id(sorteio), (sorteio, []))
+        for j, linha in enumerate(boletim.get("apostas", [])):
+            posicoes.append((i, j) + mascaras_linha(linha))
+
+    for sorteio, posicoes in grupos.values():
+        m_numeros, m_especial = mascaras_sorteio(sorteio)
+        n_numeros = contar_lote([p[2] for p in posicoes], m_numeros)
+        n_especial = contar_lote([p[3] for p in posicoes], m_especial)
+        for (i, j, _, _), n, e in zip(posicoes, n_numeros, n_especial):
+            acertos[i][j] = (n, e)
+
+    return acertos
+
+
+def tabela_premios(premios_sorteio: dict, encontrar: Callable, max_numeros: int,
+                   valores_especial: Iterable) -> dict:
+    """
+    Pre-calcula {(acertos_n, especial): premio} para um sorteio a partir
+    dos seus premios compilados (premios.py), usando a funcao de procura
+    do proprio jogo (as regras ficam num so sitio).
+    """
+    valores_especial = list(valores_especial)
+    return {
+        (n, e): encontrar(premios_sorteio, n, e)
+        for n in range(max_numeros + 1)
+        for e in valores_especial
+    }
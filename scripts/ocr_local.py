@@ -0,0 +1,186 @@
+import os
+import re
+from typing import List, Optional, Tuple
+
+import validacao_ocr
+
+# Tesseract e opcional: sem pytesseract (ou sem o binario) todas as
+# imagens seguem para o Gemini, como antes
+try:
+    import pytesseract
+    pytesseract.get_tesseract_version()
+    DISPONIVEL = True
+except Exception:
+    pytesseract = None
+    DISPONIVEL = False
+
+# ===== CONFIGURACAO =====
+# OCR_LOCAL=0 desativa o caminho local
+ATIVO = os.getenv("OCR_LOCAL", "1") != "0"
+# Confianca media minima (0-100) das palavras com digitos
+CONFIANCA_MINIMA = 80
+CONFIG_TESSERACT = "--oem 1 --psm 6"
+
+# ============================================================
+# OCR LOCAL DOS TALOES DA SANTA CASA (caminho rapido)
+# ============================================================
+# Os taloes impressos tem sempre a mesma estrutura:
+#   1 AP SIMPLES AUT SORT 053            2026/07/03   <- concurso, data do sorteio
+#   1.N 01 18 20 28 50                                 <- Euromilhoes / Eurodreams
+#     E 02 08                                          <- estrelas (S = dream)
+#   1. 10 12 17 39 41                                  <- Totoloto
+#   NUMERO DA SORTE 03
+#   MJZ 27821                                          <- M1lhao
+#   TOTAL A PAGAR                        € 2,20
+#   2026/07/03                  684-06935646-019       <- data da aposta, referencia
+#   18:35:18
+# O texto do Tesseract e lido com estas regras; o boletim so e aceite se
+# passar validacao_ocr.validar_jogo e a confianca for alta. Caso
+# contrario devolve None e a imagem segue para o Gemini.
+
+_RE_CABECALHO = re.compile(r"SORT\.?\s*(\d{3})\b.*?(\d{4})/(\d{2})/(\d{2})")
+_RE_LINHA_N = re.compile(r"^(\d{1,2})\s*\.\s*N\s+((?:\d{2}\s+)*\d{2})$")
+_RE_LINHA_TOTOLOTO = re.compile(r"^(\d{1,2})\s*\.\s+((?:\d{2}\s+)*\d{2})$")
+_RE_LINHA_E = re.compile(r"^E\s+((?:\d{2}\s+)*\d{2})$")
+_RE_LINHA_S = re.compile(r"^S\s+(\d{2})$")
+_RE_SORTE = re.compile(r"SORTE\s+(\d{2})\b")
+_RE_CODIGO = re.compile(r"^([A-Z]{3})\s?(\d{5})$")
+_RE_VALOR = re.compile(r"(?:€|EUR|E)\s*(\d{1,3}),(\d{2})\b")
+_RE_DATA = re.compile(r"^(\d{4})/(\d{2})/(\d{2})\b")
+_RE_HORA = re.compile(r"^(\d{2}):(\d{2}):(\d{2})\b")
+_RE_REF_JOGO = re.compile(r"\b(\d{3}-\d{8}-(?:M[1IL]L|EUR))\b")
+_RE_REF_LONGA = re.compile(r"\b(\d{6}-\d{2}-\d{10}-\d{3})\b")
+_RE_REF_NUMERICA = re.compile(r"\b(\d{3}-\d{8}-\d{3})\b")
+
+# Trocas tipicas do Tesseract em zonas so de digitos
+_DIGITOS = str.maketrans({"O": "0", "o": "0", "D": "0", "I": "1", "l": "1", "|": "1", "S": "5", "B": "8"})
+
+
+def _normalizar_numeros(texto: str) -> str:
+    """Corrige letras lidas no lugar de digitos ("O7" -> "07") em tokens de 2 caracteres com um digito."""
+    return " ".join(
+        t.translate(_DIGITOS) if len(t) == 2 and any(c.isdigit() for c in t) else t
+        for t in texto.split()
+    )
+
+
+def _linhas_e_confianca(img) -> Tuple[List[str], float]:
+    """Uma passagem do Tesseract: linhas de texto e confianca media das palavras com digitos."""
+    dados = pytesseract.image_to_data(img, config=CONFIG_TESSERACT, output_type=pytesseract.Output.DICT)
+    linhas = {}
+    confiancas = []
+    for i, palavra in enumerate(dados["text"]):
+        palavra = palavra.strip()
+        if not palavra:
+            continue
+        chave = (dados["block_num"][i], dados["par_num"][i], dados["line_num"][i])
+        linhas.setdefault(chave, []).append(palavra)
+        if any(c.isdigit() for c in palavra):
+            confiancas.append(float(dados["conf"][i]))
+    texto = [" ".join(palavras) for _, palavras in sorted(linhas.items())]
+    return texto, (sum(confiancas) / len(confiancas) if confiancas else 0.0)
+
+
+def _tipo_pela_estrutura(texto: str, linhas: List[str]) -> Optional[str]:
+    if any(_RE_LINHA_N.match(l) for l in linhas):
+        if any(_RE_LINHA_E.match(l) for l in linhas):
+            return "Euromilhões"
+        if any(_RE_LINHA_S.match(l) for l in linhas):
+            return "Eurodreams"
+        return None
+    if _RE_SORTE.search(texto):
+        return "Totoloto"
+    if "DIGO" in texto and any(_RE_CODIGO.match(l) for l in linhas):
+        return "M1lhão"
+    return None
+
+
+def interpretar_texto(linhas: List[str]) -> Optional[dict]:
+    """Converte as linhas do talao num boletim no formato do Gemini (ou None)."""
+    linhas_maiusculas = [_normalizar_numeros(l.upper()) for l in linhas if l.strip()]
+    texto = "\n".join(linhas_maiusculas)
+
+    tipo = _tipo_pela_estrutura(texto, linhas_maiusculas)
+    cabecalho = _RE_CABECALHO.search(texto)
+    if not tipo or not cabecalho:
+        return None
+    concurso, ano, mes, dia = cabecalho.groups()
+
+    # Apostas
+    apostas = []
+    ultima = None
+    for linha in linhas_maiusculas:
+        if tipo == "M1lhão":
+            codigo = _RE_CODIGO.match(linha)
+            if codigo:
+                apostas.append({"indice": len(apostas) + 1, "codigo": codigo.group(1) + codigo.group(2)})
+            continue
+
+        padrao = _RE_LINHA_TOTOLOTO if tipo == "Totoloto" else _RE_LINHA_N
+        linha_n = padrao.match(linha)
+        if linha_n:
+            ultima = {"indice": int(linha_n.group(1)), "numeros": linha_n.group(2).split()}
+            apostas.append(ultima)
+        elif tipo == "Euromilhões" and ultima is not None and _RE_LINHA_E.match(linha):
+            ultima["estrelas"] = _RE_LINHA_E.match(linha).group(1).split()
+        elif tipo == "Eurodreams" and ultima is not None and _RE_LINHA_S.match(linha):
+            ultima["dream"] = [_RE_LINHA_S.match(linha).group(1)]
+
+    if tipo == "Totoloto":
+        sorte = _RE_SORTE.search(texto)
+        if not sorte:
+            return None
+        for aposta in apostas:
+            aposta["numero_da_sorte"] = sorte.group(1)
+
+    # Rodape: valor, data/hora da aposta e referencia
+    valor = _RE_VALOR.search(texto)
+    total = next((i for i, l in enumerate(linhas_maiusculas) if "TOTAL A PAGAR" in l), None)
+    rodape = linhas_maiusculas[total:] if total is not None else []
+    data_aposta = next((_RE_DATA.match(l) for l in rodape if _RE_DATA.match(l)), None)
+    hora = next((_RE_HORA.match(l) for l in rodape if _RE_HORA.match(l)), None)
+    if not valor or not data_aposta or not hora:
+        return None
+
+    rodape_texto = "\n".join(rodape)
+    referencia = None
+    for padrao in (_RE_REF_JOGO, _RE_REF_LONGA, _RE_REF_NUMERICA):
+        encontrada = padrao.search(rodape_texto)
+        if encontrada:
+            referencia = re.sub(r"M[1IL]L$", "M1L", encontrada.group(1))
+            break
+
+    data = "-".join(data_aposta.groups())
+    return {
+        "tipo": tipo,
+        "data_sorteio": f"{ano}-{mes}-{dia}",
+        "data_aposta": data,
+        "data_emissao": f"{data} {':'.join(hora.groups())}",
+        "referencia_unica": referencia,
+        "concurso": f"{concurso}/{ano}",
+        "valor_total": int(valor.group(1)) + int(valor.group(2)) / 100,
+        "valido": True,
+        "apostas": apostas,
+    }
+
+
+def extrair_jogo(img) -> Tuple[Optional[dict], float, List[str]]:
+    """
+    Tenta ler o boletim localmente.
+    Devolve (jogo, confianca, erros); jogo e None quando o resultado nao e
+    de confianca e a imagem deve seguir para o Gemini.
+    """
+    if not (ATIVO and DISPONIVEL):
+        return None, 0.0, ["OCR local indisponível"]
+
+    linhas, confianca = _linhas_e_confianca(img.convert("L"))
+    jogo = interpretar_texto(linhas)
+    if jogo is None:
+        return None, confianca, ["estrutura do talão não reconhecida"]
+
+    erros = validacao_ocr.validar_jogo(jogo)
+    if confianca < CONFIANCA_MINIMA:
+        erros.append(f"confiança {confianca:.0f} < {CONFIANCA_MINIMA}")
+    if erros:
+        return None, confianca, erros
+    return jogo, confianca, []
@@ -0,0 +1,94 @@
+import re
+
+# ============================================================
+# PREMIOS DE UM SORTEIO (compilados uma vez por sorteio)
+# ============================================================
+# Os nomes dos premios variam entre ficheiros ("1.º Prémio",
+# "1.� Pr�mio", "Nº da Sorte", "N� da Sorte"...). Em vez de normalizar
+# os nomes a cada linha de aposta, cada sorteio e compilado num
+# dicionario indexado pela ordem do premio:
+#   {1: {...}, 2: {...}, "sorte": {...}}
+# Cada premio compilado e uma copia com "valor_centimos" (inteiro),
+# o campo que os consumidores (estatisticas, email, notificacoes) leem.
+
+# ===== CONFIGURACAO =====
+# "Reembolso do valor da aposta" (Totoloto) conta como 1 EUR
+REEMBOLSO_CENTIMOS = 100
+
+_RE_ORDEM = re.compile(r"^\s*(\d+)")
+_RE_MOEDA = re.compile(r"(?:€|EUR)\s*(\d[\d.,]*)")
+_RE_NUMERO = re.compile(r"^\d[\d.,]*$")
+_RE_MILHARES = re.compile(r"^\d{1,3}(?:\.\d{3})+$")
+
+
+def ordem_premio(nome: str):
+    """ "1.º Prémio" -> 1, "N� da Sorte" -> "sorte", outro -> None """
+    nome = nome or ""
+    match = _RE_ORDEM.match(nome)
+    if match:
+        return int(match.group(1))
+    if "sorte" in nome.lower():
+        return "sorte"
+    return None
+
+
+def _numero_para_centimos(texto: str) -> int:
+    texto = texto.rstrip(".,")
+    if "," in texto:
+        # Formato PT: "126.931,65"
+        inteiros, _, decimais = texto.partition(",")
+        inteiros = inteiros.replace(".", "")
+    elif _RE_MILHARES.match(texto):
+        # "20.000" (milhares sem decimais)
+        inteiros, decimais = texto.replace(".", ""), ""
+    else:
+        # "7.15", "2.2", "4"
+        inteiros, _, decimais = texto.partition(".")
+    decimais = (decimais.replace(".", "") + "00")[:2]
+    return int(inteiros or "0") * 100 + int(decimais)
+
+
+def valor_em_centimos(valor) -> int:
+    """
+    Converte um valor monetario em centimos:
+    "€ 126.931,65" -> 12693165, "€ 20.000/mês x 30 anos" -> 2000000 (primeiro montante),
+    "2.2" -> 220, 7.15 -> 715, "Reembolso..." -> 100, "(1)" / "" / None -> 0
+    """
+    if valor is None or isinstance(valor, bool):
+        return 0
+    if isinstance(valor, (int, float)):
+        return int(round(valor * 100))
+
+    texto = str(valor).strip()
+    match = _RE_MOEDA.search(texto)
+    if match:
+        return _numero_para_centimos(match.group(1))
+    if "reembolso" in texto.lower():
+        return REEMBOLSO_CENTIMOS
+    if _RE_NUMERO.match(texto):
+        return _numero_para_centimos(texto)
+    return 0
+
+
+def centimos_do_premio(premio: dict) -> int:
+    """Le "valor_centimos" (resultados novos) ou converte "valor" (historico antigo)."""
+    centimos = premio.get("valor_centimos")
+    if isinstance(centimos, int):
+        return centimos
+    return valor_em_centimos(premio.get("valor"))
+
+
+def com_centimos(premio: dict) -> dict:
+    """Copia do premio com "valor_centimos" (o dicionario original nao e alterado)."""
+    return dict(premio, valor_centimos=valor_em_centimos(premio.get("valor")))
+
+
+def compilar_premios(sorteio: dict) -> dict:
+    """Compila a lista "premios" de um sorteio (primeira ocorrencia ganha)."""
+    compilado = {}
+    for premio in sorteio.get("premios", []) or []:
+        ordem = ordem_premio(premio.get("premio", ""))
+        if ordem is None or ordem in compilado:
+            continue
+        compilado[ordem] = com_centimos(premio)
+    return compilado
@@ -1,4 +1,6 @@
 import os
+import io
+import sys
 import json
 import hashlib
 import cv2
@@ -7,9 +9,17 @@ import time
 from PIL import Image, ImageEnhance, ImageOps
 from datetime import datetime
 from google import genai
+from google.genai import types
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 import threading
 
+import armazenamento
+import indice_apostas
+import indice_uploads
+import ocr_local
+import validacao_ocr
+
 # ===== CONFIGURAÇÃO DE MODELOS E CHAVES =====
 # Modelos Gemini válidos em Março de 2026 (ordem de fallback)
 MODELOS_FALLBACK = [
@@ -43,148 +53,464 @@ PASTA_UPLOADS = "uploads/"
 PASTA_DADOS = "apostas/"
 PASTA_PREPROCESSADAS = "preprocessadas/"
 PASTA_THUMBNAILS = "thumbnails/"
-
-# ===== CONTROLO DE TAXA (5 por minuto) =====
+# Respostas do Gemini por (imagem, modelo, prompt); não vai para o git,
+# é guardada entre execuções pelo actions/cache
+PASTA_CACHE_OCR = ".cache_ocr/"
+DIAS_CACHE_OCR = 30
+
+# ===== IMAGENS ENVIADAS AO GEMINI =====
+# As versões são recortadas ao boletim, reduzidas e recodificadas antes
+# do envio (fotos de telemóvel em resolução total só aumentam bytes e tokens)
+LADO_MAXIMO_ENVIO = 1600
+FORMATO_ENVIO = "JPEG"  # "JPEG" ou "WEBP"
+QUALIDADE_ENVIO = 85
+# Boletins por pedido ao Gemini (1 = um pedido por imagem)
+TAMANHO_LOTE = 4
+# Campos que continuam inválidos depois da reparação local são pedidos de
+# novo ao Gemini (só esses campos, num pedido pequeno). False: guarda como veio
+PEDIR_CORRECOES = True
+# O boletim só é recortado/endireitado se ocupar pelo menos esta fração da foto
+FRACAO_MINIMA_RECORTE = 0.2
+MARGEM_RECORTE = 0.02
+# Lado maior da cópia reduzida usada para detetar o contorno do boletim
+LADO_DETECAO = 1000
+
+# ===== ESCRITA EM DISCO =====
+# Os JSON (apostas, registo, cota, índices) ficam em memória durante a
+# execução e são gravados de uma vez a cada CHECKPOINT_IMAGENS imagens
+# registadas e no fim (uma execução interrompida perde no máximo isso)
+CHECKPOINT_IMAGENS = 10
+
+# ===== DEDUPLICAÇÃO PERCETUAL =====
+# dHash (16x16 = 256 bits) do boletim já endireitado. Medido nas thumbnails
+# (`python scripts/processar_uploads.py --medir-dhash`): boletins
+# diferentes, mesmo do mesmo jogo, ficam a 56 bits ou mais; a mesma foto
+# recomprimida, reduzida ou com outro brilho/contraste fica até 11. Uma
+# foto tirada de novo (outro enquadramento ou rotação) passa dos 19 e é
+# sempre processada. Abaixo do limiar a foto é rejeitada sem gastar cota,
+# exceto se o OCR local ler uma referência ainda não registada. 0 desativa
+# a verificação.
+TAMANHO_DHASH = 16
+LIMIAR_DHASH = 12
+
+# ===== CONTROLO DE TAXA (5 por minuto, por chave) =====
 REQUISICOES_POR_MINUTO = 5
-SEGUNDOS_ENTRE_REQUISICOES = 60 / REQUISICOES_POR_MINUTO
-timestamps = deque(maxlen=REQUISICOES_POR_MINUTO)
+LIMITE_DIARIO_CHAVE = 20
+# Preparação das imagens (hash, OpenCV/PIL, OCR local) em processos
+# separados, um por núcleo: o trabalho de CPU não bloqueia os pedidos
+PROCESSOS_PREPARACAO = os.cpu_count() or 1
+timestamps_por_chave = {f"key_{i+1}": deque(maxlen=REQUISICOES_POR_MINUTO) for i in range(len(GEMINI_KEYS))}
 lock = threading.Lock()
+lock_cota = threading.Lock()
+lock_escrita = threading.Lock()
+lock_metricas = threading.Lock()
+lock_dhash = threading.Lock()
 ultima_chave_idx = -1
+imagens_desde_checkpoint = 0
+# Totais da execução: bytes dos uploads vs. bytes enviados, e latência dos pedidos
+metricas = {"imagens": 0, "bytes_upload": 0, "bytes_envio": 0, "pedidos": 0, "segundos_pedidos": 0.0,
+            "ocr_local": 0}
+
+# ===== COTA DIÁRIA POR CHAVE =====
+# A cota gratuita do Gemini renova à meia-noite do Pacífico, não à local
+FUSO_COTA = "America/Los_Angeles"
+try:
+    from zoneinfo import ZoneInfo
+    _fuso_cota = ZoneInfo(FUSO_COTA)
+except Exception:
+    # Sem base de dados de fusos (ex.: Windows sem tzdata): PST fixo
+    from datetime import timezone, timedelta
+    _fuso_cota = timezone(timedelta(hours=-8))
+
+# Estado em memória: o ficheiro é lido uma vez por execução e só é
+# reescrito nos checkpoints (fim de cada imagem e fim da execução)
+_cota = None
+_cota_alterada = False
+_clientes = {}
+# Pedidos em curso por chave (ainda não registados na cota)
+reservas_chave = {}
+
+def dia_cota():
+    """Dia corrente da cota (YYYY-MM-DD no fuso do Pacífico)"""
+    return datetime.now(_fuso_cota).strftime("%Y-%m-%d")
 
 # ===== FUNÇÕES DE CONTROLO DE CHAVES =====
 def carregar_cota_chaves():
-    """Carrega o estado de cada chave"""
-    if os.path.exists(FICHEIRO_COTA_CHAVES):
-        with open(FICHEIRO_COTA_CHAVES, "r") as f:
-            return json.load(f)
-    return {}
-
-def guardar_cota_chaves(cota):
-    os.makedirs(os.path.dirname(FICHEIRO_COTA_CHAVES), exist_ok=True)
-    with open(FICHEIRO_COTA_CHAVES, "w") as f:
-        json.dump(cota, f, indent=2)
+    """Carrega o estado de cada chave (lido do disco só na primeira vez)"""
+    global _cota
+    if _cota is None:
+        _cota = armazenamento.ler_json(FICHEIRO_COTA_CHAVES, {})
+    return _cota
+
+def guardar_cota_chaves():
+    """Checkpoint: grava o estado das chaves se mudou desde o último"""
+    global _cota_alterada
+    with lock_cota:
+        if _cota is None or not _cota_alterada:
+            return
+        armazenamento.escrever_json(FICHEIRO_COTA_CHAVES, _cota, indent=2, ensure_ascii=True)
+        _cota_alterada = False
+
+def usadas_hoje(key_id):
+    """Pedidos registados hoje para a chave (0 se o registo é de outro dia)"""
+    registo = carregar_cota_chaves().get(key_id, {})
+    return registo.get("usadas", 0) if registo.get("data") == dia_cota() else 0
+
+def _definir_usadas(key_id, usadas):
+    global _cota_alterada
+    carregar_cota_chaves()[key_id] = {"data": dia_cota(), "usadas": usadas}
+    _cota_alterada = True
+
+def obter_cliente(idx):
+    """Cliente Gemini da chave (criado uma vez por execução)"""
+    if idx not in _clientes:
+        _clientes[idx] = genai.Client(api_key=GEMINI_KEYS[idx])
+    return _clientes[idx]
 
 def obter_cliente_disponivel():
     """
     Retorna um cliente Gemini com uma chave que ainda tem cota hoje.
     Usa round-robin para distribuir as requisições entre as chaves.
+    A chave fica reservada até registar_uso_chave/libertar_chave, para
+    que pedidos em paralelo não ultrapassem o limite diário.
     """
     global ultima_chave_idx
-    cota_chaves = carregar_cota_chaves()
-    hoje = datetime.now().strftime("%Y-%m-%d")
-    num_keys = len(GEMINI_KEYS)
+    with lock_cota:
+        num_keys = len(GEMINI_KEYS)
 
-    for i in range(num_keys):
-        idx = (ultima_chave_idx + 1 + i) % num_keys
-        key_id = f"key_{idx+1}"
-        registo = cota_chaves.get(key_id, {"data": "", "usadas": 0})
+        for i in range(num_keys):
+            idx = (ultima_chave_idx + 1 + i) % num_keys
+            key_id = f"key_{idx+1}"
 
-        # Reset se for novo dia
-        if registo.get("data") != hoje:
-            registo = {"data": hoje, "usadas": 0}
-
-        # Se ainda tem cota (limite 20 por dia)
-        if registo["usadas"] < 20:
-            ultima_chave_idx = idx
-            print(f"   🔑 Usando {key_id} ({registo['usadas'] + 1}/20 hoje)")
-            return genai.Client(api_key=GEMINI_KEYS[idx]), key_id, registo["usadas"] + 1
+            # Se ainda tem cota (limite 20 por dia), contando os pedidos em curso
+            ocupadas = usadas_hoje(key_id) + reservas_chave.get(key_id, 0)
+            if ocupadas < LIMITE_DIARIO_CHAVE:
+                ultima_chave_idx = idx
+                reservas_chave[key_id] = reservas_chave.get(key_id, 0) + 1
+                print(f"   🔑 Usando {key_id} ({ocupadas + 1}/{LIMITE_DIARIO_CHAVE} hoje)")
+                return obter_cliente(idx), key_id, ocupadas + 1
 
     # Todas as chaves esgotadas
     return None, None, None
 
-def registar_uso_chave(key_id, usadas_atualizadas):
+def libertar_chave(key_id):
+    """Liberta a reserva de um pedido que terminou sem sucesso"""
+    with lock_cota:
+        if reservas_chave.get(key_id, 0) > 0:
+            reservas_chave[key_id] -= 1
+
+def registar_uso_chave(key_id):
     """Regista uma requisição bem sucedida"""
-    cota_chaves = carregar_cota_chaves()
-    hoje = datetime.now().strftime("%Y-%m-%d")
-    cota_chaves[key_id] = {"data": hoje, "usadas": usadas_atualizadas}
-    guardar_cota_chaves(cota_chaves)
+    with lock_cota:
+        if reservas_chave.get(key_id, 0) > 0:
+            reservas_chave[key_id] -= 1
+        _definir_usadas(key_id, min(usadas_hoje(key_id) + 1, LIMITE_DIARIO_CHAVE))
 
 def marcar_chave_esgotada(key_id):
     """Marca uma chave como esgotada (20/20) após erro 429"""
-    cota_chaves = carregar_cota_chaves()
-    hoje = datetime.now().strftime("%Y-%m-%d")
-    cota_chaves[key_id] = {"data": hoje, "usadas": 20}
-    guardar_cota_chaves(cota_chaves)
-    print(f"   ⚠️ {key_id} marcada como esgotada (20/20)")
+    with lock_cota:
+        if reservas_chave.get(key_id, 0) > 0:
+            reservas_chave[key_id] -= 1
+        _definir_usadas(key_id, LIMITE_DIARIO_CHAVE)
+    print(f"   ⚠️ {key_id} marcada como esgotada ({LIMITE_DIARIO_CHAVE}/{LIMITE_DIARIO_CHAVE})")
 
 # ===== FUNÇÕES DE RATE LIMIT =====
-def esperar_rate_limit():
-    """Garante que não excedemos 5 requisições por minuto"""
+def esperar_rate_limit(key_id):
+    """
+    Garante que uma chave não excede 5 requisições em qualquer janela de 60s.
+    O instante do pedido é reservado dentro do lock; a espera é feita fora
+    dele, para que os pedidos das outras chaves não fiquem bloqueados.
+    """
     with lock:
+        timestamps = timestamps_por_chave[key_id]
         agora = time.time()
-        # Remover timestamps mais antigos que 60 segundos
-        while timestamps and timestamps[0] < agora - 60:
-            timestamps.popleft()
-
-        if len(timestamps) >= REQUISICOES_POR_MINUTO:
-            mais_antigo = timestamps[0]
-            tempo_espera = 60 - (agora - mais_antigo)
-            if tempo_espera > 0:
-                print(f"   ⏳ Rate limit: a aguardar {tempo_espera:.1f}s...")
-                time.sleep(tempo_espera)
+        if len(timestamps) >= REQUISICOES_POR_MINUTO and timestamps[0] > agora - 60:
+            instante = timestamps[0] + 60
+        else:
+            instante = agora
+        timestamps.append(instante)
 
-        timestamps.append(time.time())
+    tempo_espera = instante - agora
+    if tempo_espera > 0:
+        print(f"   ⏳ Rate limit {key_id}: a aguardar {tempo_espera:.1f}s...")
+        time.sleep(tempo_espera)
 
 # ===== FUNÇÕES DE PROCESSAMENTO DE IMAGEM =====
-def gerar_hash(caminho):
-    """Gera hash MD5 de um ficheiro"""
-    h = hashlib.md5()
+# Cada imagem nova é lida uma só vez: dos mesmos bytes sai o hash (se não
+# estiver no índice de uploads) e a imagem descodificada uma só vez para a
+# thumbnail, o OCR local e as 3 versões enviadas ao Gemini.
+def ler_upload(caminho):
+    """Lê o ficheiro uma vez e devolve (bytes, hash MD5)"""
     with open(caminho, "rb") as f:
-        h.update(f.read())
-    return h.hexdigest()
+        dados = f.read()
+    return dados, gerar_hash(dados)
+
+def gerar_hash(dados):
+    """Gera hash MD5 do conteúdo de um ficheiro"""
+    return hashlib.md5(dados).hexdigest()
+
+def descodificar_imagem(dados):
+    """Descodifica os bytes e aplica a orientação EXIF (uma só vez)"""
+    img = ImageOps.exif_transpose(Image.open(io.BytesIO(dados)))
+    img.load()
+    return img
+
+def codificar_thumbnail(img, nome_arquivo):
+    """Thumbnail (lado máximo 800) codificada no formato da extensão do ficheiro"""
+    # Redimensionar para uma imagem nova (a original continua intacta para o OCR)
+    if img.width > 800 or img.height > 800:
+        thumb = ImageOps.contain(img, (800, 800))
+    else:
+        thumb = img
+    formato = Image.registered_extensions().get(os.path.splitext(nome_arquivo)[1].lower(), "JPEG")
+    buffer = io.BytesIO()
+    thumb.save(buffer, format=formato, optimize=True, quality=85)
+    return buffer.getvalue()
 
-def gerar_thumbnail(caminho_original, nome_arquivo):
-    os.makedirs(PASTA_THUMBNAILS, exist_ok=True)
+def guardar_thumbnail(conteudo, nome_arquivo):
     try:
-        img = Image.open(caminho_original)
-        img = ImageOps.exif_transpose(img)
-        img.thumbnail((800, 800))
         # 👇 estrutura organizada por mês
         mes = datetime.now().strftime("%Y-%m")
         pasta_thumb = os.path.join(PASTA_THUMBNAILS, mes)
         os.makedirs(pasta_thumb, exist_ok=True)
         caminho_thumb = os.path.join(pasta_thumb, nome_arquivo)
-        img.save(caminho_thumb, optimize=True, quality=85)
+        with open(caminho_thumb, "wb") as f:
+            f.write(conteudo)
         print(f"   🖼️ Thumbnail gerada: {nome_arquivo}")
     except Exception as e:
         print(f"   ⚠️ Erro ao gerar thumbnail: {e}")
 
-def preprocessar_imagem(caminho, img_nome):
-    """Gera 3 versões estratégicas da imagem"""
-    os.makedirs(PASTA_PREPROCESSADAS, exist_ok=True)
+def ordenar_cantos(pontos):
+    """4 pontos -> [sup. esquerdo, sup. direito, inf. direito, inf. esquerdo]"""
+    pontos = np.asarray(pontos, dtype=np.float32).reshape(4, 2)
+    soma = pontos.sum(axis=1)
+    diferenca = np.diff(pontos, axis=1).ravel()
+    return np.array([
+        pontos[np.argmin(soma)],
+        pontos[np.argmin(diferenca)],
+        pontos[np.argmax(soma)],
+        pontos[np.argmax(diferenca)],
+    ], dtype=np.float32)
+
+def detetar_cantos_boletim(img):
+    """
+    Procura o contorno do boletim (maior zona clara, via Otsu) numa cópia
+    reduzida da foto. Devolve os 4 cantos na escala original, ou None se
+    não houver uma zona suficientemente grande.
+    Contorno com 4 vértices -> cantos reais (correção de perspetiva);
+    caso contrário -> retângulo mínimo rodado (só endireita a inclinação).
+    """
+    escala = min(1.0, LADO_DETECAO / max(img.size))
+    pequena = img if escala == 1.0 else img.resize(
+        (max(1, round(img.width * escala)), max(1, round(img.height * escala))), Image.BILINEAR)
+    gray = np.asarray(pequena.convert("L"))
+    _, mascara = cv2.threshold(cv2.GaussianBlur(gray, (5, 5), 0), 0, 255,
+                               cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    # Fechar falhas (texto/linhas escuras) dentro do papel
+    mascara = cv2.morphologyEx(mascara, cv2.MORPH_CLOSE, np.ones((9, 9), np.uint8))
+    contornos, _ = cv2.findContours(mascara, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    if not contornos:
+        return None
+
+    contorno = max(contornos, key=cv2.contourArea)
+    fracao = cv2.contourArea(contorno) / (gray.shape[0] * gray.shape[1])
+    # Demasiado pequeno (não é o boletim) ou a foto inteira (nada a recortar)
+    if fracao < FRACAO_MINIMA_RECORTE or fracao > 0.95:
+        return None
+
+    aproximado = cv2.approxPolyDP(contorno, 0.02 * cv2.arcLength(contorno, True), True)
+    if len(aproximado) == 4 and cv2.isContourConvex(aproximado):
+        cantos = aproximado
+    else:
+        cantos = cv2.boxPoints(cv2.minAreaRect(contorno))
+    return ordenar_cantos(cantos) / escala
 
-    img = cv2.imread(caminho)
-    if img is None:
-        raise ValueError(f"Imagem não pode ser lida: {caminho}")
+def endireitar_boletim(img):
+    """
+    Recorta a foto ao boletim, corrigindo perspetiva e inclinação, para que
+    as versões enviadas não incluam fundo. Se o boletim não for detetado,
+    devolve a imagem intacta.
+    """
+    cantos = detetar_cantos_boletim(img)
+    if cantos is None:
+        return img
+
+    # Margem à volta do boletim (afastar cada canto do centro)
+    centro = cantos.mean(axis=0)
+    cantos = centro + (cantos - centro) * (1 + 2 * MARGEM_RECORTE)
+
+    sup_esq, sup_dir, inf_dir, inf_esq = cantos
+    largura = int(round(max(np.linalg.norm(sup_dir - sup_esq), np.linalg.norm(inf_dir - inf_esq))))
+    altura = int(round(max(np.linalg.norm(inf_esq - sup_esq), np.linalg.norm(inf_dir - sup_dir))))
+    if largura < 50 or altura < 50:
+        return img
+
+    destino = np.array([[0, 0], [largura - 1, 0], [largura - 1, altura - 1], [0, altura - 1]], dtype=np.float32)
+    matriz = cv2.getPerspectiveTransform(cantos.astype(np.float32), destino)
+    origem = np.asarray(img if img.mode in ("RGB", "L") else img.convert("RGB"))
+    endireitada = cv2.warpPerspective(origem, matriz, (largura, altura),
+                                      flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    return Image.fromarray(endireitada)
+
+def reduzir_para_envio(img):
+    """Limita o lado maior a LADO_MAXIMO_ENVIO (nunca amplia)"""
+    if max(img.size) <= LADO_MAXIMO_ENVIO:
+        return img
+    return ImageOps.contain(img, (LADO_MAXIMO_ENVIO, LADO_MAXIMO_ENVIO), Image.LANCZOS)
+
+def codificar_versao(img, binaria=False):
+    """Codifica uma versão para envio: (bytes, mime_type, extensão)"""
+    buffer = io.BytesIO()
+    if binaria:
+        # 1 bit por pixel: PNG muito pequeno e sem perdas
+        img.convert("1").save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue(), "image/png", "png"
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.save(buffer, format=FORMATO_ENVIO, quality=QUALIDADE_ENVIO, optimize=True)
+    return buffer.getvalue(), f"image/{FORMATO_ENVIO.lower()}", FORMATO_ENVIO.lower().replace("jpeg", "jpg")
+
+def calcular_dhash(img):
+    """dHash do boletim: gradiente horizontal numa grelha de 17x16 (hex)"""
+    pequena = np.asarray(img.convert("L").resize((TAMANHO_DHASH + 1, TAMANHO_DHASH), Image.LANCZOS),
+                         dtype=np.int16)
+    bits = (pequena[:, 1:] > pequena[:, :-1]).ravel()
+    return f"{int(''.join('1' if b else '0' for b in bits), 2):0{TAMANHO_DHASH * TAMANHO_DHASH // 4}x}"
+
+def construir_indice_dhash(registo):
+    """
+    Índice [(dhash, hash_md5, nome)] das imagens já lidas com jogos (as
+    registadas sem jogos ou como duplicadas não servem de original). Entradas
+    antigas do registo sem "dhash" são completadas a partir da thumbnail (o
+    registo guardado no fim da primeira imagem já as inclui).
+    """
+    thumbnails = {}
+    for raiz, _, ficheiros in os.walk(PASTA_THUMBNAILS):
+        for nome in ficheiros:
+            thumbnails[nome] = os.path.join(raiz, nome)
+
+    indice = []
+    completadas = 0
+    for img_hash, entrada in registo.items():
+        if entrada.get("jogos", 0) <= 0 or "duplicado_de" in entrada:
+            continue
+        if "dhash" not in entrada:
+            caminho = thumbnails.get(entrada.get("arquivo", ""))
+            if not caminho:
+                continue
+            try:
+                with open(caminho, "rb") as f:
+                    entrada["dhash"] = calcular_dhash(endireitar_boletim(descodificar_imagem(f.read())))
+                completadas += 1
+            except Exception as e:
+                print(f"   ⚠️ Erro ao calcular dHash de {caminho}: {e}")
+                continue
+        indice.append((int(entrada["dhash"], 16), img_hash, entrada.get("arquivo", img_hash)))
+
+    if completadas:
+        print(f"🧬 dHash calculado a partir de {completadas} thumbnail(s)")
+    return indice
+
+def procurar_duplicado(indice, dhash):
+    """(distância, hash MD5, nome) da imagem já processada mais parecida, se abaixo do limiar"""
+    valor = int(dhash, 16)
+    melhor = None
+    for outro, img_hash, nome in indice:
+        distancia = (valor ^ outro).bit_count()
+        if distancia <= LIMIAR_DHASH and (melhor is None or distancia < melhor[0]):
+            melhor = (distancia, img_hash, nome)
+    return melhor
+
+def medir_limiar_dhash():
+    """
+    Distâncias de dHash entre as thumbnails com boletins nas apostas:
+    mínima entre boletins diferentes (tem de ficar acima de LIMIAR_DHASH)
+    e máxima entre fotos do mesmo boletim. Devolve 1 se o limiar apanhar
+    boletins diferentes, senão 0.
+    """
+    referencias = {}
+    for jogo in ["euromilhoes", "totoloto", "eurodreams", "milhao"]:
+        for boletim in armazenamento.ler_json(os.path.join(PASTA_DADOS, f"{jogo}.json"), []):
+            if isinstance(boletim, dict) and boletim.get("imagem_origem"):
+                referencias.setdefault(boletim["imagem_origem"], set()).add(
+                    (jogo, boletim.get("referencia_unica")))
+
+    dhashes = {}
+    for raiz, _, ficheiros in os.walk(PASTA_THUMBNAILS):
+        for nome in ficheiros:
+            if nome not in referencias:
+                continue
+            try:
+                with open(os.path.join(raiz, nome), "rb") as f:
+                    dhashes[nome] = int(calcular_dhash(endireitar_boletim(descodificar_imagem(f.read()))), 16)
+            except Exception as e:
+                print(f"   ⚠️ Erro ao calcular dHash de {nome}: {e}")
+
+    nomes = sorted(dhashes)
+    diferentes = []
+    mesmo_boletim = []
+    for i, a in enumerate(nomes):
+        for b in nomes[i + 1:]:
+            distancia = (dhashes[a] ^ dhashes[b]).bit_count()
+            (mesmo_boletim if referencias[a] & referencias[b] else diferentes).append((distancia, a, b))
+
+    print(f"🧬 {len(nomes)} thumbnail(s) com boletins, limiar atual: {LIMIAR_DHASH} bits")
+    if mesmo_boletim:
+        print(f"   Mesmo boletim: até {max(mesmo_boletim)[0]} bits ({len(mesmo_boletim)} par(es))")
+    if not diferentes:
+        print("   Sem pares de boletins diferentes para comparar")
+        return 0
+    distancia, a, b = min(diferentes)
+    print(f"   Boletins diferentes: a partir de {distancia} bits ({a} / {b})")
+    if distancia <= LIMIAR_DHASH:
+        print(f"   ❌ O limiar de {LIMIAR_DHASH} bits rejeitaria boletins diferentes")
+        return 1
+    print(f"   ✅ Margem de {distancia - LIMIAR_DHASH} bits acima do limiar")
+    return 0
+
+def preprocessar_imagem(img_boletim, img_nome):
+    """
+    Gera 3 versões estratégicas do boletim (já orientado e endireitado por
+    endireitar_boletim), reduzidas e codificadas para envio.
+    Devolve a lista de (bytes, mime_type).
+    """
+    os.makedirs(PASTA_PREPROCESSADAS, exist_ok=True)
 
     nome_base = os.path.splitext(img_nome)[0]
-    versoes = []
+    img_original = reduzir_para_envio(img_boletim)
 
     # 1. Original (com correção de orientação)
-    img_original = ImageOps.exif_transpose(Image.open(caminho))
-    versoes.append(img_original)
-
-    # 2. Binarização adaptativa
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # 2. Binarização adaptativa (sobre o mesmo array, em tons de cinzento)
+    gray = np.asarray(img_original.convert("L"))
     binary = cv2.adaptiveThreshold(
         gray, 255,
         cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
         cv2.THRESH_BINARY,
         11, 2
     )
+    del gray
     img_binary = Image.fromarray(binary)
-    versoes.append(img_binary)
-    img_binary.save(os.path.join(PASTA_PREPROCESSADAS, f"{nome_base}_binary.png"))
 
     # 3. Alto contraste + nitidez
     enhancer = ImageEnhance.Contrast(img_original)
     img_contrast = enhancer.enhance(3.0)
     enhancer = ImageEnhance.Sharpness(img_contrast)
     img_sharp = enhancer.enhance(2.0)
-    versoes.append(img_sharp)
-    img_sharp.save(os.path.join(PASTA_PREPROCESSADAS, f"{nome_base}_enhanced.png"))
+    del img_contrast
 
-    print(f"   📸 Geradas 3 versões")
+    versoes = []
+    for sufixo, img, binaria in [("original", img_original, False),
+                                 ("binary", img_binary, True),
+                                 ("enhanced", img_sharp, False)]:
+        conteudo, mime, extensao = codificar_versao(img, binaria)
+        versoes.append((conteudo, mime))
+        if sufixo != "original":
+            # Guarda exatamente o que é enviado (sem recodificar)
+            with open(os.path.join(PASTA_PREPROCESSADAS, f"{nome_base}_{sufixo}.{extensao}"), "wb") as f:
+                f.write(conteudo)
+
+    print(f"   📸 Geradas 3 versões {img_original.width}x{img_original.height} "
+          f"({sum(len(c) for c, _ in versoes) / 1024:.0f} KB)")
     return versoes
 
 # ===== PROMPT DO GEMINI (COMPLETO) =====
@@ -320,18 +646,181 @@ ESTRUTURA JSON OBRIGATÓRIA POR TIPO DE JOGO:
 Retorna APENAS JSON válido, sem texto adicional.
 """
 
+# ===== PROMPT PARA VÁRIOS BOLETINS NUM SÓ PEDIDO =====
+PROMPT_LOTE = PROMPT_FINAL + """
+MODO LOTE (substitui o formato de resposta acima):
+- Este pedido contém VÁRIOS boletins DIFERENTES. Cada boletim começa com o marcador "=== BOLETIM N ===" e é seguido das suas 3 versões.
+- Aplica TODAS as regras acima a cada boletim, de forma independente. NUNCA mistures números, datas ou referências de boletins diferentes.
+- Devolve um objeto por boletim, pela mesma ordem dos marcadores:
+{
+  "boletins": [
+    {"boletim": 1, "jogos": [ ...o objeto do jogo deste boletim, como acima... ]},
+    {"boletim": 2, "jogos": [ ... ]}
+  ]
+}
+- Se não conseguires ler um boletim, devolve-o na mesma com "jogos": [].
+Retorna APENAS JSON válido, sem texto adicional.
+"""
+
+# ===== ESQUEMAS DE RESPOSTA (structured output) =====
+# O Gemini é obrigado a devolver exatamente esta estrutura: sem campos em
+# falta, tipos errados ou texto à volta do JSON. As regras de cada jogo
+# (quantidades, intervalos, formatos) são verificadas depois, localmente,
+# por validacao_ocr.
+_LISTA_NUMEROS = {"type": "ARRAY", "items": {"type": "STRING"}}
+ESQUEMA_JOGO = {
+    "type": "OBJECT",
+    "properties": {
+        "tipo": {"type": "STRING", "enum": list(validacao_ocr.REGRAS_JOGOS)},
+        "data_sorteio": {"type": "STRING"},
+        "data_aposta": {"type": "STRING"},
+        "data_emissao": {"type": "STRING"},
+        "referencia_unica": {"type": "STRING"},
+        "concurso": {"type": "STRING"},
+        "valor_total": {"type": "NUMBER"},
+        "valido": {"type": "BOOLEAN"},
+        "apostas": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "indice": {"type": "INTEGER"},
+                    "numeros": _LISTA_NUMEROS,
+                    "estrelas": _LISTA_NUMEROS,
+                    "numero_da_sorte": {"type": "STRING"},
+                    "dream": _LISTA_NUMEROS,
+                    "codigo": {"type": "STRING"},
+                },
+                "required": ["indice"],
+            },
+        },
+    },
+    "required": ["tipo", "data_sorteio", "data_aposta", "referencia_unica", "concurso", "valor_total", "apostas"],
+}
+ESQUEMA_RESPOSTA = {
+    "type": "OBJECT",
+    "properties": {"jogos": {"type": "ARRAY", "items": ESQUEMA_JOGO}},
+    "required": ["jogos"],
+}
+ESQUEMA_LOTE = {
+    "type": "OBJECT",
+    "properties": {
+        "boletins": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {
+                    "boletim": {"type": "INTEGER"},
+                    "jogos": {"type": "ARRAY", "items": ESQUEMA_JOGO},
+                },
+                "required": ["boletim", "jogos"],
+            },
+        }
+    },
+    "required": ["boletins"],
+}
+ESQUEMA_CORRECOES = {
+    "type": "OBJECT",
+    "properties": {
+        "correcoes": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"campo": {"type": "STRING"}, "valor": {"type": "STRING"}},
+                "required": ["campo", "valor"],
+            },
+        }
+    },
+    "required": ["correcoes"],
+}
+
+# ===== PROMPT DE CORREÇÃO (só os campos inválidos) =====
+PROMPT_CORRECAO = """
+Já extraíste este boletim das imagens seguintes, mas alguns campos não cumprem as regras do jogo:
+
+{jogo}
+
+Erros encontrados:
+{erros}
+
+Volta a ler nas imagens APENAS estes campos: {campos}
+Regras: números com 2 dígitos ("07"); Euromilhões 5 números (01-50) + 2 estrelas (01-12);
+Totoloto 5 números (01-49) + número da sorte (01-13); Eurodreams 6 números (01-40) + dream (01-05);
+M1lhão código AAA99999; datas YYYY-MM-DD; concurso 000/AAAA.
+Para listas, devolve os números separados por espaços (ex.: "02 08").
+Formato:
+{{"correcoes": [{{"campo": "apostas[0].estrelas", "valor": "02 08"}}]}}
+Retorna APENAS JSON válido, sem texto adicional.
+"""
+
+# ===== CACHE DE RESPOSTAS DO GEMINI =====
+# Uma resposta já paga não volta a ser pedida: se a execução falhar depois
+# do pedido (ou for repetida), a mesma imagem com o mesmo modelo e o mesmo
+# prompt é lida da cache. Mudar o prompt invalida as entradas antigas.
+def caminho_cache_resposta(img_hash, modelo, prompt):
+    hash_prompt = hashlib.md5(prompt.encode("utf-8")).hexdigest()
+    chave = hashlib.md5(f"{img_hash}|{modelo}|{hash_prompt}".encode("utf-8")).hexdigest()
+    return os.path.join(PASTA_CACHE_OCR, f"{chave}.json")
+
+def ler_cache_resposta(img_hash):
+    """(modelo, texto da resposta) em cache para a imagem, pela ordem dos modelos"""
+    for modelo in MODELOS_FALLBACK:
+        # Pedido individual ou parte de um lote (só o resultado deste boletim)
+        for prompt in (PROMPT_FINAL, PROMPT_LOTE):
+            entrada = armazenamento.ler_json(caminho_cache_resposta(img_hash, modelo, prompt))
+            if entrada and isinstance(entrada.get("resposta"), str):
+                return modelo, entrada["resposta"]
+    return None, None
+
+def limpar_cache_respostas():
+    """Apaga entradas com mais de DIAS_CACHE_OCR dias (a cache não cresce sem fim)"""
+    if not os.path.isdir(PASTA_CACHE_OCR):
+        return
+    limite = time.time() - DIAS_CACHE_OCR * 86400
+    for nome in os.listdir(PASTA_CACHE_OCR):
+        caminho = os.path.join(PASTA_CACHE_OCR, nome)
+        if os.path.getmtime(caminho) < limite:
+            os.remove(caminho)
+
+def guardar_cache_resposta(img_hash, img_nome, modelo, prompt, texto):
+    # Gravada logo (não espera pelo checkpoint): uma resposta paga não se perde
+    os.makedirs(PASTA_CACHE_OCR, exist_ok=True)
+    armazenamento.escrever_texto(caminho_cache_resposta(img_hash, modelo, prompt), json.dumps({
+        "imagem": img_nome,
+        "hash_imagem": img_hash,
+        "modelo": modelo,
+        "data": datetime.now().isoformat(),
+        "resposta": texto
+    }, indent=2, ensure_ascii=False))
+
 # ===== FUNÇÕES DE GESTÃO DE JOGOS =====
 def carregar_registo():
     """Carrega registo de imagens processadas"""
-    if os.path.exists(FICHEIRO_REGISTO):
-        with open(FICHEIRO_REGISTO, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+    return armazenamento.ler_json(FICHEIRO_REGISTO, {})
 
 def guardar_registo(reg):
-    """Guarda registo de imagens processadas"""
-    with open(FICHEIRO_REGISTO, "w", encoding="utf-8") as f:
-        json.dump(reg, f, indent=4, ensure_ascii=False)
+    """Guarda registo de imagens processadas (no disco no próximo checkpoint)"""
+    armazenamento.escrever_json(FICHEIRO_REGISTO, reg, indent=4)
+
+def descarregar_escritas():
+    """
+    Grava no disco tudo o que está pendente. O registo vai por último: uma
+    imagem só fica marcada como processada com os seus jogos já no disco.
+    """
+    global imagens_desde_checkpoint
+    gravar_apostas()
+    with lock_cota:
+        gravados = armazenamento.descarregar(ultimos=[FICHEIRO_REGISTO])
+    imagens_desde_checkpoint = 0
+    return gravados
+
+def contar_imagem_registada():
+    """Chamado com lock_escrita por cada imagem registada: checkpoint a cada CHECKPOINT_IMAGENS"""
+    global imagens_desde_checkpoint
+    imagens_desde_checkpoint += 1
+    if imagens_desde_checkpoint >= CHECKPOINT_IMAGENS:
+        gravados = descarregar_escritas()
+        print(f"   💾 Checkpoint: {gravados} ficheiro(s) gravado(s)")
 
 def limpar_nome_jogo(nome):
     """Converte nome do jogo para nome de ficheiro"""
@@ -343,53 +832,34 @@ def limpar_nome_jogo(nome):
     }
     return mapping.get(nome, nome.lower().strip().replace(" ", "_"))
 
-def aposta_duplicada(jogo_novo, historico):
-    """Verifica se já existe um boletim com a mesma data de sorteio
-    e as mesmas apostas (números, estrelas, dream, código)."""
-    data_nova = jogo_novo.get("data_sorteio")
-    apostas_novas = jogo_novo.get("apostas", [])
+# Ficheiros de apostas desta execução: carregados uma vez, com o índice
+# de duplicados (referências e assinaturas) montado em memória
+apostas_carregadas = {}
 
-    for item in historico:
-        if item.get("data_sorteio") != data_nova:
-            continue
-        apostas_existentes = item.get("apostas", [])
-        if len(apostas_novas) != len(apostas_existentes):
-            continue
-        iguais = True
-        for ap_nova, ap_exist in zip(apostas_novas, apostas_existentes):
-            if (sorted(ap_nova.get("numeros", [])) != sorted(ap_exist.get("numeros", [])) or
-                sorted(ap_nova.get("estrelas", [])) != sorted(ap_exist.get("estrelas", [])) or
-                sorted(ap_nova.get("dream", [])) != sorted(ap_exist.get("dream", [])) or
-                ap_nova.get("codigo") != ap_exist.get("codigo")):
-                iguais = False
-                break
-        if iguais:
-            return True
-    return False
+def obter_apostas(caminho):
+    if caminho not in apostas_carregadas:
+        apostas_carregadas[caminho] = indice_apostas.carregar(caminho)
+    return apostas_carregadas[caminho]
+
+def gravar_apostas():
+    """Ficheiros de apostas com boletins novos (uma escrita por ficheiro e checkpoint)"""
+    for estado in apostas_carregadas.values():
+        indice_apostas.gravar(estado)
 
 def guardar_jogo(jogo, img_nome, img_hash):
-    """Guarda um jogo no ficheiro correspondente ao tipo"""
+    """Acrescenta um jogo ao ficheiro correspondente ao tipo (gravado em gravar_apostas)"""
     if not jogo.get("tipo"):
         return False
 
     nome_ficheiro = f"{limpar_nome_jogo(jogo['tipo'])}.json"
-    caminho = os.path.join(PASTA_DADOS, nome_ficheiro)
+    apostas = obter_apostas(os.path.join(PASTA_DADOS, nome_ficheiro))
 
-    # Carregar histórico existente
-    if os.path.exists(caminho):
-        with open(caminho, "r", encoding="utf-8") as f:
-            historico = json.load(f)
-    else:
-        historico = []
-
-    # Verificar duplicados por referência única
-    ref = jogo.get("referencia_unica")
-    if ref and any(item.get("referencia_unica") == ref for item in historico):
-        print(f"   ⚠️ Referência {ref} já registada")
+    # Verificar duplicados por referência única e por conteúdo (mesma data e chave)
+    duplicado = indice_apostas.duplicado(apostas, jogo)
+    if duplicado == "referencia":
+        print(f"   ⚠️ Referência {jogo.get('referencia_unica')} já registada")
         return False
-
-    # Verificar duplicados por conteúdo (segunda camada)
-    if aposta_duplicada(jogo, historico):
+    if duplicado == "conteudo":
         print(f"   ⚠️ Aposta duplicada (mesma data e chave). Ignorada.")
         return False
 
@@ -399,23 +869,480 @@ def guardar_jogo(jogo, img_nome, img_hash):
     jogo["data_processamento"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     jogo["confirmado"] = False  # campo adicional
 
-    historico.append(jogo)
+    indice_apostas.acrescentar(apostas, jogo)
+    return True
 
-    # Guardar
-    with open(caminho, "w", encoding="utf-8") as f:
-        json.dump(historico, f, indent=4, ensure_ascii=False)
+# ===== PROCESSAMENTO DE UMA IMAGEM =====
+def registar_jogos(jogos, img_nome, img_hash, dhash, registo, prefixo, origem):
+    """
+    Guarda os jogos extraídos de uma imagem e regista a imagem como
+    processada (origem: "gemini" ou "local"). Devolve True se guardou algum.
+    """
+    with lock_escrita:
+        jogos_nesta_imagem = 0
+        for jogo in jogos:
+            # Validação específica para M1lhão
+            if jogo.get("tipo") == "M1lhão":
+                if not any(aposta.get("codigo") for aposta in jogo.get("apostas", [])):
+                    print(f"   ⚠️ Ignorado M1lhão sem código na imagem {img_nome}")
+                    continue
+
+            if guardar_jogo(jogo, img_nome, img_hash):
+                jogos_nesta_imagem += 1
+
+        if jogos_nesta_imagem == 0:
+            return False
+
+        print(f"   ✅ {prefixo} {jogos_nesta_imagem} jogo(s) processado(s) ({origem})")
+        registo[img_hash] = {
+            "arquivo": img_nome,
+            "data": datetime.now().isoformat(),
+            "jogos": jogos_nesta_imagem,
+            "dhash": dhash,
+            "origem": origem
+        }
+        guardar_registo(registo)
+        guardar_cota_chaves()
+        contar_imagem_registada()
+        return True
 
-    return True
+def registar_sem_jogos(registo, img_nome, img_hash, **extra):
+    """
+    Regista como processada uma imagem sem jogos novos (duplicada ou já
+    guardada). Sem "dhash": uma imagem sem jogos nunca serve de original.
+    """
+    with lock_escrita:
+        registo[img_hash] = {
+            "arquivo": img_nome,
+            "data": datetime.now().isoformat(),
+            "jogos": 0,
+            **extra
+        }
+        guardar_registo(registo)
+        contar_imagem_registada()
+
+def analisar_imagem(img_nome, img_hash, prefixo):
+    """
+    Trabalho de CPU de uma imagem, corrido num processo do pool de
+    preparação: hash MD5 (se img_hash for None, ou seja, se o ficheiro não
+    estiver no índice de uploads), descodificação, endireitamento, dHash,
+    thumbnail, OCR local e, se a imagem não ficar resolvida pelo OCR local
+    nem pela cache, as versões para o Gemini. Não toca no registo nem no
+    índice de dHash (que vivem no processo principal); devolve um
+    dicionário com os resultados para preparar_imagem.
+    """
+    print(f"\n🚀 {prefixo} {img_nome}")
+    analise = {"img_nome": img_nome, "img_hash": img_hash, "prefixo": prefixo}
+
+    # Ler uma vez (hash dos mesmos bytes), descodificar e endireitar o boletim
+    try:
+        dados, hash_calculado = ler_upload(os.path.join(PASTA_UPLOADS, img_nome))
+        if img_hash is None:
+            img_hash = analise["img_hash"] = analise["hash_calculado"] = hash_calculado
+        img = descodificar_imagem(dados)
+        boletim = endireitar_boletim(img)
+        analise["dhash"] = calcular_dhash(boletim)
+        analise["bytes_upload"] = len(dados)
+        del dados
+    except Exception as e:
+        analise["erro"] = str(e)
+        return analise
+
+    try:
+        analise["thumbnail"] = codificar_thumbnail(img, img_nome)
+    except Exception as e:
+        print(f"   ⚠️ Erro ao gerar thumbnail: {e}")
+    del img
+
+    # Caminho rápido: OCR local, só aceite se cumprir as regras do jogo
+    if ocr_local.ATIVO and ocr_local.DISPONIVEL:
+        try:
+            jogo, confianca, erros = ocr_local.extrair_jogo(boletim)
+        except Exception as e:
+            jogo, confianca, erros = None, 0.0, [str(e)]
+        if jogo:
+            analise["ocr_local"] = (jogo, confianca)
+            return analise
+        print(f"   🔎 {prefixo} OCR local insuficiente ({'; '.join(erros[:3])}). A usar o Gemini.")
+
+    # Resposta já obtida numa execução anterior: não são precisas versões
+    modelo_cache, texto_cache = ler_cache_resposta(img_hash)
+    if texto_cache is not None:
+        try:
+            resultado = json.loads(texto_cache)
+        except json.JSONDecodeError:
+            resultado = None
+        if isinstance(resultado, dict):
+            analise["cache"] = (modelo_cache, resultado)
+            return analise
+
+    # Versões preprocessadas para o Gemini
+    try:
+        analise["versoes"] = preprocessar_imagem(boletim, img_nome)
+    except Exception as e:
+        analise["erro"] = str(e)
+    return analise
+
+def referencia_nova(analise):
+    """True se o OCR local leu uma referência que ainda não está nas apostas (outro boletim)"""
+    if "ocr_local" not in analise:
+        return False
+    jogo = analise["ocr_local"][0]
+    referencia = jogo.get("referencia_unica")
+    if not referencia or not jogo.get("tipo"):
+        return False
+    with lock_escrita:
+        apostas = obter_apostas(os.path.join(PASTA_DADOS, f"{limpar_nome_jogo(jogo['tipo'])}.json"))
+        return not indice_apostas.referencia_registada(apostas, referencia)
+
+def preparar_imagem(analise, registo, indice_dhash, em_espera):
+    """
+    Fase de uma imagem no processo principal, com o resultado de
+    analisar_imagem: rejeita fotos quase iguais a uma já lida com jogos
+    (salvo se o OCR local ler uma referência nova), grava a thumbnail e regista o que ficou resolvido sem pedido (OCR local
+    ou cache). Uma foto parecida com outra ainda em processamento nesta
+    execução vai para `em_espera`: só é rejeitada depois de o original ter
+    jogos (se falhar, é processada normalmente). Devolve True/False se a
+    imagem ficou resolvida, ou o boletim pendente (dicionário com as versões
+    já codificadas) para enviar_lote.
+    """
+    img_nome, img_hash, prefixo = analise["img_nome"], analise["img_hash"], analise["prefixo"]
+    if "erro" in analise:
+        print(f"   ❌ {prefixo} Erro no pré-processamento: {analise['erro']}")
+        return False
+    # Hash só conhecido depois da leitura (ficheiro fora do índice de uploads)
+    if img_hash in registo:
+        print(f"   ⏭️ {prefixo} Imagem já processada ({img_nome})")
+        return False
+    dhash = analise["dhash"]
+
+    # Verificar e reservar o dHash num só passo (duplicados no mesmo lote)
+    if LIMIAR_DHASH:
+        with lock_dhash:
+            duplicado = procurar_duplicado(indice_dhash, dhash)
+            if not duplicado:
+                indice_dhash.append((int(dhash, 16), img_hash, img_nome))
+        if duplicado and referencia_nova(analise):
+            distancia, _, original = duplicado
+            print(f"   🔎 {prefixo} Parecida com {original} (dHash a {distancia} bits), mas a referência lida "
+                  f"é nova. Processada.")
+            with lock_dhash:
+                indice_dhash.append((int(dhash, 16), img_hash, img_nome))
+            duplicado = None
+        if duplicado:
+            distancia, hash_original, original = duplicado
+            with lock_escrita:
+                original_lido = registo.get(hash_original, {}).get("jogos", 0) > 0
+            if not original_lido:
+                print(f"   ⏸️ {prefixo} Parecida com {original}, ainda em processamento. Em espera.")
+                em_espera.append(analise)
+                return False
+            print(f"   ♻️ {prefixo} Foto repetida de {original} (dHash a {distancia} bits). Ignorada sem pedido.")
+            registar_sem_jogos(registo, img_nome, img_hash, duplicado_de=hash_original)
+            return False
+
+    if analise.get("thumbnail"):
+        guardar_thumbnail(analise["thumbnail"], img_nome)
+
+    if "ocr_local" in analise:
+        jogo, confianca = analise["ocr_local"]
+        print(f"   🔎 {prefixo} OCR local (confiança {confianca:.0f}): {jogo['tipo']}")
+        # Boletim lido com confiança: mesmo que já exista (duplicado), não vai ao Gemini
+        # e a imagem fica registada (não volta a passar pelo OCR local)
+        if not registar_jogos([jogo], img_nome, img_hash, dhash, registo, prefixo, "local"):
+            print(f"   ⚠️ {prefixo} Nenhum jogo novo (OCR local)")
+            registar_sem_jogos(registo, img_nome, img_hash, origem="local")
+            return False
+        with lock_metricas:
+            metricas["ocr_local"] += 1
+        return True
+
+    # Resposta já obtida numa execução anterior: sem pedido nem cota
+    if "cache" in analise:
+        modelo_cache, resultado = analise["cache"]
+        print(f"   💾 {prefixo} Resposta em cache ({modelo_cache})")
+        jogos = validar_jogos(resultado.get("jogos", []), prefixo)
+        if registar_jogos(jogos, img_nome, img_hash, dhash, registo, prefixo, "gemini"):
+            return True
+        print(f"   ⚠️ {prefixo} Nenhum jogo válido encontrado")
+        return False
+
+    versoes = analise["versoes"]
+    bytes_envio = sum(len(conteudo) for conteudo, _ in versoes)
+    with lock_metricas:
+        metricas["imagens"] += 1
+        metricas["bytes_upload"] += analise["bytes_upload"]
+        metricas["bytes_envio"] += bytes_envio
+
+    return {
+        "img_nome": img_nome,
+        "img_hash": img_hash,
+        "dhash": dhash,
+        "prefixo": prefixo,
+        "partes": [types.Part.from_bytes(data=conteudo, mime_type=mime) for conteudo, mime in versoes],
+        "bytes_envio": bytes_envio,
+    }
+
+
+def pedir_gemini(conteudo, rotulo, bytes_envio, esquema):
+    """
+    Envia um pedido ao Gemini (resposta obrigada a seguir `esquema`), com
+    fallback entre modelos e tentativas em caso de ocupado. Devolve
+    (modelo, texto, resultado JSON) ou (None, None, None) se todos os
+    modelos falharem.
+    """
+    # Tentar cada modelo por ordem
+    for modelo in MODELOS_FALLBACK:
+        tentativas_restantes = 3  # número de tentativas para este modelo (para erros 503)
+        while tentativas_restantes > 0:
+            # Obter cliente com chave disponível
+            cliente, key_id, _ = obter_cliente_disponivel()
+            if not cliente:
+                print(f"   ⚠️ {rotulo} Sem chaves disponíveis para o modelo {modelo}. A passar ao próximo.")
+                break  # sai do while, vai para o próximo modelo
+
+            try:
+                # Respeitar rate limit da chave
+                esperar_rate_limit(key_id)
+
+                print(f"   🤖 {rotulo} Tentativa {4 - tentativas_restantes} com {modelo} | {key_id}")
+
+                # Enviar requisição
+                inicio = time.perf_counter()
+                resposta = cliente.models.generate_content(
+                    model=modelo,
+                    contents=conteudo,
+                    config={
+                        "temperature": 0,
+                        "response_mime_type": "application/json",
+                        "response_schema": esquema
+                    }
+                )
+                latencia = time.perf_counter() - inicio
+                with lock_metricas:
+                    metricas["pedidos"] += 1
+                    metricas["segundos_pedidos"] += latencia
+                print(f"   📦 {rotulo} {bytes_envio / 1024:.0f} KB enviados em {latencia:.1f}s")
+            except Exception as e:
+                erro_str = str(e).upper()
+                print(f"   ❌ {rotulo} Erro: {e}")
+
+                # Tratamento de erros
+                if "429" in erro_str or "RESOURCE_EXHAUSTED" in erro_str:
+                    # Cota esgotada: marcar chave e tentar outra imediatamente (não gasta tentativa do modelo)
+                    marcar_chave_esgotada(key_id)
+                    continue
+
+                libertar_chave(key_id)
+                if "503" in erro_str or "UNAVAILABLE" in erro_str:
+                    # Serviço indisponível: decrementa tentativas e tenta novamente (pode ser a mesma ou outra chave)
+                    tentativas_restantes -= 1
+                    if tentativas_restantes > 0:
+                        print(f"   🔄 {rotulo} Modelo indisponível, restam {tentativas_restantes} tentativa(s). A aguardar 5s...")
+                        time.sleep(5)
+                        continue
+                    print(f"   ⚠️ {rotulo} Esgotadas tentativas para o modelo {modelo} devido a indisponibilidade.")
+                else:
+                    # Outro erro (ex: imagem inválida) - considerar falha permanente para este modelo
+                    print(f"   ⚠️ {rotulo} Erro não recuperável. A passar para próximo modelo.")
+                break  # Sai do while, vai para o próximo modelo
+
+            # Se chegou aqui, a requisição foi bem-sucedida
+            registar_uso_chave(key_id)
+
+            # Processar resposta JSON (texto None: resposta bloqueada ou sem candidatos)
+            try:
+                resultado = json.loads(resposta.text)
+            except (TypeError, json.JSONDecodeError):
+                print(f"   ❌ {rotulo} Resposta não é JSON válido: {(resposta.text or '')[:200]!r}")
+                # Considerar como erro não recuperável e passar ao próximo modelo
+                break
+            if not isinstance(resultado, dict):
+                print(f"   ❌ {rotulo} Resposta JSON sem o objeto esperado")
+                break
+            return modelo, resposta.text, resultado
+
+    return None, None, None
+
+def pedir_correcoes(jogo, erros, pendente):
+    """
+    Pede ao Gemini só os campos com erro de um jogo (com as mesmas imagens)
+    e aplica as correções recebidas. Devolve os erros que ficaram.
+    """
+    campos = validacao_ocr.campos_com_erro(erros)
+    prompt = PROMPT_CORRECAO.format(
+        jogo=json.dumps(jogo, ensure_ascii=False),
+        erros="\n".join(f"- {erro}" for erro in erros),
+        campos=", ".join(campos),
+    )
+    rotulo = pendente["prefixo"]
+    print(f"   🩹 {rotulo} A pedir correção de {len(campos)} campo(s): {', '.join(campos)}")
+    _, _, resultado = pedir_gemini([prompt] + pendente["partes"], rotulo, pendente["bytes_envio"], ESQUEMA_CORRECOES)
+
+    for correcao in (resultado or {}).get("correcoes", []) or []:
+        if not isinstance(correcao, dict):
+            continue
+        # Só se aceitam correções aos campos que foram pedidos
+        if correcao.get("campo") in campos:
+            validacao_ocr.aplicar_correcao(jogo, correcao["campo"], correcao.get("valor", ""))
+    reparado, erros = validacao_ocr.reparar_jogo(jogo)
+    jogo.clear()
+    jogo.update(reparado)
+    return erros
+
+def validar_jogos(jogos, rotulo, pendente=None):
+    """
+    Repara localmente os jogos devolvidos pelo Gemini (formatos, números sem
+    zero à esquerda, estrelas misturadas com os números...) e valida-os
+    contra as regras do jogo. Com o boletim pendente (imagens disponíveis),
+    os campos que continuem inválidos são pedidos de novo. Os jogos são
+    sempre devolvidos; os erros que ficarem são só mostrados no log.
+    """
+    validados = []
+    for jogo in jogos:
+        if not isinstance(jogo, dict):
+            continue
+        reparado, erros = validacao_ocr.reparar_jogo(jogo)
+        if reparado != jogo:
+            print(f"   🔧 {rotulo} Jogo reparado localmente ({reparado.get('tipo')})")
+        if erros and PEDIR_CORRECOES and pendente is not None:
+            erros = pedir_correcoes(reparado, erros, pendente)
+        if erros:
+            print(f"   ⚠️ {rotulo} Jogo com {len(erros)} erro(s) por rever: {'; '.join(erros[:3])}")
+        validados.append(reparado)
+    return validados
+
+def registar_resultado(pendente, resultado, registo):
+    """Guarda os jogos de um boletim pendente; True se guardou algum"""
+    jogos = validar_jogos(resultado.get("jogos", []), pendente["prefixo"], pendente)
+    if registar_jogos(jogos, pendente["img_nome"], pendente["img_hash"],
+                      pendente["dhash"], registo, pendente["prefixo"], "gemini"):
+        return True
+    print(f"   ⚠️ {pendente['prefixo']} Nenhum jogo válido encontrado")
+    # Sem jogos a imagem não entra no registo: volta a ser tentada na próxima execução
+    return False
+
+def enviar_lote(pendentes, registo):
+    """
+    Envia um ou mais boletins num só pedido. Com vários, cada boletim vai
+    delimitado pelo seu marcador e a resposta traz um resultado por boletim;
+    os boletins em falta ou sem jogos são repetidos em pedidos individuais.
+    Devolve o número de imagens registadas com jogos.
+    """
+    bytes_envio = sum(p["bytes_envio"] for p in pendentes)
+
+    # Pedido individual (prompt original)
+    if len(pendentes) == 1:
+        pendente = pendentes[0]
+        modelo, texto, resultado = pedir_gemini([PROMPT_FINAL] + pendente["partes"], pendente["prefixo"], bytes_envio,
+                                              ESQUEMA_RESPOSTA)
+        if resultado is None:
+            print(f"   ❌ {pendente['prefixo']} Falha em todos os modelos para a imagem {pendente['img_nome']}")
+            return 0
+        guardar_cache_resposta(pendente["img_hash"], pendente["img_nome"], modelo, PROMPT_FINAL, texto)
+        return int(registar_resultado(pendente, resultado, registo))
+
+    # Pedido em lote
+    rotulo = "[lote " + ", ".join(p["prefixo"].strip("[]") for p in pendentes) + "]"
+    conteudo = [PROMPT_LOTE]
+    for n, pendente in enumerate(pendentes, 1):
+        conteudo.append(f"=== BOLETIM {n} ===")
+        conteudo.extend(pendente["partes"])
+
+    modelo, _, resultado = pedir_gemini(conteudo, rotulo, bytes_envio, ESQUEMA_LOTE)
+    por_boletim = {}
+    for item in (resultado or {}).get("boletins", []) or []:
+        if isinstance(item, dict) and isinstance(item.get("boletim"), int):
+            por_boletim.setdefault(item["boletim"], item)
+
+    registadas = 0
+    falhados = []
+    for n, pendente in enumerate(pendentes, 1):
+        jogos = por_boletim.get(n, {}).get("jogos")
+        if not isinstance(jogos, list) or not jogos:
+            falhados.append(pendente)
+            continue
+        parcial = {"jogos": jogos}
+        guardar_cache_resposta(pendente["img_hash"], pendente["img_nome"], modelo, PROMPT_LOTE,
+                               json.dumps(parcial, ensure_ascii=False))
+        registadas += registar_resultado(pendente, parcial, registo)
+
+    if falhados:
+        print(f"   🔁 {rotulo} {len(falhados)} boletim(ns) sem resultado no lote. A pedir individualmente...")
+        for pendente in falhados:
+            registadas += enviar_lote([pendente], registo)
+    return registadas
+
+def analises_concluidas(futuros, indice):
+    """
+    Resultados de analisar_imagem pela ordem em que ficam prontos; os
+    hashes calculados no pool entram no índice de uploads
+    """
+    for futuro in as_completed(futuros):
+        try:
+            analise = futuro.result()
+        except Exception as e:
+            print(f"   ❌ Erro inesperado na preparação: {e}")
+            continue
+        if "hash_calculado" in analise:
+            indice_uploads.registar(indice, os.path.join(PASTA_UPLOADS, analise["img_nome"]),
+                                    analise["hash_calculado"])
+        yield analise
+
+def despachar(analises, registo, indice_dhash, em_espera, pedidos):
+    """
+    Prepara as imagens analisadas à medida que chegam, agrupa os boletins
+    pendentes em lotes de TAMANHO_LOTE para o pool de pedidos e espera por
+    todos. Devolve o número de imagens registadas com jogos.
+    """
+    registadas = 0
+    lotes = []
+    pendentes = []
+    for analise in analises:
+        try:
+            resultado = preparar_imagem(analise, registo, indice_dhash, em_espera)
+        except Exception as e:
+            print(f"   ❌ Erro inesperado na preparação: {e}")
+            continue
+        if isinstance(resultado, dict):
+            pendentes.append(resultado)
+            if len(pendentes) >= TAMANHO_LOTE:
+                lotes.append(pedidos.submit(enviar_lote, pendentes, registo))
+                pendentes = []
+        elif resultado:
+            registadas += 1
+    if pendentes:
+        lotes.append(pedidos.submit(enviar_lote, pendentes, registo))
+
+    for lote in lotes:
+        try:
+            registadas += lote.result()
+        except Exception as e:
+            print(f"   ❌ Erro inesperado num pedido: {e}")
+    return registadas
 
 # ===== FUNÇÃO PRINCIPAL DE PROCESSAMENTO =====
 def processar_com_multiplas_chaves():
-    """Processa imagens com fallback entre modelos e tentativas em caso de ocupado"""
+    """
+    Processa as imagens novas em duas fases sobrepostas: um pool de
+    processos (um por núcleo) lê cada imagem uma vez, calcula o hash que
+    não estiver no índice de uploads e prepara a imagem
+    (pré-processamento, OCR local, cache) e, à medida que ficam prontas, o
+    processo principal filtra os duplicados e agrupa os boletins pendentes
+    em lotes de TAMANHO_LOTE, enviados por um pool de pedidos (um
+    trabalhador por chave, cada chave limitada pela sua própria janela de
+    5 pedidos/minuto).
+    """
     # Criar pastas necessárias
     for pasta in [PASTA_DADOS, PASTA_UPLOADS, PASTA_PREPROCESSADAS, PASTA_THUMBNAILS]:
         os.makedirs(pasta, exist_ok=True)
 
+    # Todos os JSON ficam em memória até ao checkpoint (ver CHECKPOINT_IMAGENS)
+    armazenamento.ativar_escrita_diferida()
+
     # Carregar registo de imagens processadas
     registo = carregar_registo()
+    limpar_cache_respostas()
 
     # Listar imagens na pasta uploads
     imagens = [f for f in os.listdir(PASTA_UPLOADS) if f.lower().endswith((".jpg", ".jpeg", ".png"))]
@@ -424,143 +1351,69 @@ def processar_com_multiplas_chaves():
         print("📭 Nenhuma imagem encontrada na pasta uploads/")
         return
 
-    # Filtrar apenas imagens não processadas
+    # Hash de cada upload: do índice de impressões digitais se o ficheiro
+    # não mudou; os restantes são lidos (uma só vez) no pool de preparação
+    indice = indice_uploads.carregar_indice()
     imagens_para_processar = []
+    reutilizados = 0
     for img_nome in imagens:
-        caminho = os.path.join(PASTA_UPLOADS, img_nome)
-        img_hash = gerar_hash(caminho)
-        if img_hash not in registo:
-            imagens_para_processar.append((img_nome, caminho, img_hash))
+        img_hash = indice_uploads.hash_conhecido(indice, os.path.join(PASTA_UPLOADS, img_nome))
+        if img_hash:
+            reutilizados += 1
+            if img_hash in registo:
+                continue
+        imagens_para_processar.append((img_nome, img_hash))
+    if reutilizados:
+        print(f"🗂️ Hashes reutilizados do índice: {reutilizados}/{len(imagens)}")
 
     if not imagens_para_processar:
+        indice_uploads.guardar_indice(indice, imagens)
+        descarregar_escritas()
         print("📭 Nenhuma imagem nova para processar.")
         return
 
-    print(f"\n📊 Encontradas {len(imagens_para_processar)} imagens para processar")
-    print(f"🔑 {len(GEMINI_KEYS)} chaves disponíveis (limite total: {len(GEMINI_KEYS) * 20}/dia)")
-    print(f"⏱️  Rate limit minuto: {REQUISICOES_POR_MINUTO} req/min\n")
-
+    total = len(imagens_para_processar)
+    num_processos = max(1, min(total, PROCESSOS_PREPARACAO))
+    num_pedidos = len(GEMINI_KEYS)
     processadas_com_sucesso = 0
-    idx = 0
-
-    while idx < len(imagens_para_processar):
-        img_nome, caminho, img_hash = imagens_para_processar[idx]
-        print(f"\n🚀 [{idx+1}/{len(imagens_para_processar)}] {img_nome}")
-
-        # Gerar thumbnail e versões preprocessadas
-        gerar_thumbnail(caminho, img_nome)
-        try:
-            versoes = preprocessar_imagem(caminho, img_nome)
-        except Exception as e:
-            print(f"   ❌ Erro no pré-processamento: {e}")
-            idx += 1
-            continue
-
-        sucesso_imagem = False
-
-        # Tentar cada modelo por ordem
-        for modelo in MODELOS_FALLBACK:
-            if sucesso_imagem:
-                break
-
-            tentativas_restantes = 3  # número de tentativas para este modelo (para erros 503)
-            while tentativas_restantes > 0 and not sucesso_imagem:
-                # Obter cliente com chave disponível
-                cliente, key_id, usadas_atual = obter_cliente_disponivel()
-                if not cliente:
-                    print(f"   ⚠️ Sem chaves disponíveis para o modelo {modelo}. A passar ao próximo.")
-                    break  # sai do while, vai para o próximo modelo
-
-                try:
-                    # Respeitar rate limit
-                    esperar_rate_limit()
-
-                    print(f"   🤖 Tentativa {4 - tentativas_restantes} com {modelo} | {key_id}")
-
-                    # Enviar requisição
-                    resposta = cliente.models.generate_content(
-                        model=modelo,
-                        contents=[PROMPT_FINAL] + versoes,
-                        config={
-                            "temperature": 0,
-                            "response_mime_type": "application/json"
-                        }
-                    )
-
-                    # Se chegou aqui, a requisição foi bem-sucedida
-                    registar_uso_chave(key_id, usadas_atual)
-
-                    # Processar resposta JSON
-                    try:
-                        dados = json.loads(resposta.text)
-                    except json.JSONDecodeError:
-                        print(f"   ❌ Resposta não é JSON válido: {resposta.text[:200]}")
-                        # Considerar como erro não recuperável e passar ao próximo modelo
+    try:
+        indice_dhash = construir_indice_dhash(registo) if LIMIAR_DHASH else []
+
+        print(f"\n📊 Encontradas {total} imagens para processar")
+        print(f"🔑 {len(GEMINI_KEYS)} chaves disponíveis (limite total: {len(GEMINI_KEYS) * LIMITE_DIARIO_CHAVE}/dia)")
+        print(f"⏱️  Rate limit minuto: {REQUISICOES_POR_MINUTO} req/min por chave")
+        print(f"🧵 Em paralelo: {num_processos} processo(s) (preparação) + {num_pedidos} trabalhador(es) (pedidos)")
+        print(f"📚 Boletins por pedido: até {TAMANHO_LOTE}")
+        print(f"🔎 OCR local: {'ativo' if ocr_local.ATIVO and ocr_local.DISPONIVEL else 'indisponível'}\n")
+
+        # O pool de processos é criado (e os processos arrancam) antes de
+        # existirem threads de pedidos
+        with ProcessPoolExecutor(max_workers=num_processos) as preparacao:
+            futuros = [
+                preparacao.submit(analisar_imagem, img_nome, img_hash, f"[{i+1}/{total}]")
+                for i, (img_nome, img_hash) in enumerate(imagens_para_processar)
+            ]
+
+            with ThreadPoolExecutor(max_workers=num_pedidos) as pedidos:
+                analises = analises_concluidas(futuros, indice)
+                while True:
+                    em_espera = []
+                    processadas_com_sucesso += despachar(analises, registo, indice_dhash, em_espera, pedidos)
+                    if not em_espera:
                         break
-
-                    jogos_nesta_imagem = 0
-                    for jogo in dados.get("jogos", []):
-                        # Validação específica para M1lhão
-                        if jogo.get("tipo") == "M1lhão":
-                            if not any(aposta.get("codigo") for aposta in jogo.get("apostas", [])):
-                                print(f"   ⚠️ Ignorado M1lhão sem código na imagem {img_nome}")
-                                continue
-
-                        if guardar_jogo(jogo, img_nome, img_hash):
-                            jogos_nesta_imagem += 1
-
-                    if jogos_nesta_imagem > 0:
-                        print(f"   ✅ {jogos_nesta_imagem} jogo(s) processado(s)")
-                        registo[img_hash] = {
-                            "arquivo": img_nome,
-                            "data": datetime.now().isoformat(),
-                            "jogos": jogos_nesta_imagem
-                        }
-                        guardar_registo(registo)
-                        processadas_com_sucesso += 1
-                        sucesso_imagem = True
-                    else:
-                        print("   ⚠️ Nenhum jogo válido encontrado")
-                        # Mesmo sem jogos, consideramos a imagem processada (não volta a tentar)
-                        sucesso_imagem = True
-
-                except Exception as e:
-                    erro_str = str(e).upper()
-                    print(f"   ❌ Erro: {e}")
-
-                    # Tratamento de erros
-                    if "429" in erro_str or "RESOURCE_EXHAUSTED" in erro_str:
-                        # Cota esgotada: marcar chave e tentar outra imediatamente (não gasta tentativa do modelo)
-                        marcar_chave_esgotada(key_id)
-                        # Continua no while (tenta outra chave, mesmo modelo)
-                        continue
-                    elif "503" in erro_str or "UNAVAILABLE" in erro_str:
-                        # Serviço indisponível: decrementa tentativas e tenta novamente (pode ser a mesma ou outra chave)
-                        tentativas_restantes -= 1
-                        if tentativas_restantes > 0:
-                            print(f"   🔄 Modelo indisponível, restam {tentativas_restantes} tentativa(s). A aguardar 5s...")
-                            time.sleep(5)
-                            # Continua no while (tenta novamente com outra chave, se disponível)
-                        else:
-                            print(f"   ⚠️ Esgotadas tentativas para o modelo {modelo} devido a indisponibilidade.")
-                            break  # Sai do while, vai para o próximo modelo
-                    else:
-                        # Outro erro (ex: parsing, imagem inválida) - considerar falha permanente para este modelo
-                        print("   ⚠️ Erro não recuperável. A passar para próximo modelo.")
-                        break  # Sai do while, vai para o próximo modelo
-
-            # Fim do while de tentativas para este modelo
-
-        # Após percorrer todos os modelos
-        if not sucesso_imagem:
-            print(f"   ❌ Falha em todos os modelos para a imagem {img_nome}")
-            # Opcional: marcar a imagem como falhada para não re-processar? Por enquanto avança.
-        idx += 1
-
-        # Pequena pausa entre imagens (para não sobrecarregar)
-        if idx < len(imagens_para_processar):
-            print(f"   ⏱️  Aguardar {SEGUNDOS_ENTRE_REQUISICOES:.0f}s antes da próxima imagem...")
-            time.sleep(SEGUNDOS_ENTRE_REQUISICOES)
+                    # Os originais que falharam saem do índice: as fotos em
+                    # espera parecidas com eles são processadas na volta seguinte
+                    with lock_escrita:
+                        indice_dhash[:] = [e for e in indice_dhash if registo.get(e[1], {}).get("jogos", 0) > 0]
+                    print(f"\n⏸️ {len(em_espera)} foto(s) em espera: a reavaliar após os originais")
+                    analises = em_espera
+    finally:
+        # Checkpoint final (inclui chaves usadas em imagens sem jogos ou falhadas
+        # e hashes novos do índice de uploads)
+        indice_uploads.guardar_indice(indice, imagens)
+        guardar_cota_chaves()
+        gravados = descarregar_escritas()
+        print(f"\n💾 {gravados} ficheiro(s) gravado(s)")
 
     # RELATÓRIO FINAL
     print(f"\n{'='*50}")
@@ -570,16 +1423,26 @@ def processar_com_multiplas_chaves():
     print(f"📊 Total na pasta: {len(imagens)} imagens")
     print(f"📅 Restantes: {len(imagens_para_processar) - processadas_com_sucesso} imagens")
 
+    # Métricas de envio
+    if metricas["ocr_local"]:
+        print(f"\n🔎 Lidas pelo OCR local (sem pedido ao Gemini): {metricas['ocr_local']}")
+    if metricas["imagens"]:
+        print(f"\n📦 Upload: {metricas['bytes_upload'] / 1024:.0f} KB | "
+              f"Enviado: {metricas['bytes_envio'] / 1024:.0f} KB "
+              f"({metricas['bytes_envio'] / max(metricas['bytes_upload'], 1):.0%} do upload, 3 versões por imagem)")
+    if metricas["pedidos"]:
+        print(f"⏱️  Latência média por pedido: {metricas['segundos_pedidos'] / metricas['pedidos']:.1f}s "
+              f"({metricas['pedidos']} pedidos)")
+
     # Mostrar estado das chaves
-    cota_chaves = carregar_cota_chaves()
-    hoje = datetime.now().strftime("%Y-%m-%d")
-    print(f"\n🔑 Estado das chaves hoje ({hoje}):")
+    print(f"\n🔑 Estado das chaves hoje ({dia_cota()}, hora do Pacífico):")
     for i in range(len(GEMINI_KEYS)):
         key_id = f"key_{i+1}"
-        registo_chave = cota_chaves.get(key_id, {"usadas": 0, "data": ""})
-        usadas = registo_chave["usadas"] if registo_chave.get("data") == hoje else 0
-        print(f"   {key_id}: {usadas}/20")
+        print(f"   {key_id}: {usadas_hoje(key_id)}/{LIMITE_DIARIO_CHAVE}")
 
 # ===== PONTO DE ENTRADA =====
 if __name__ == "__main__":
+    # --medir-dhash: verifica LIMIAR_DHASH contra as thumbnails, sem processar nada
+    if "--medir-dhash" in sys.argv[1:]:
+        sys.exit(medir_limiar_dhash())
     processar_com_multiplas_chaves()
@@ -0,0 +1,285 @@
+import re
+from datetime import datetime
+from typing import List
+
+# ============================================================
+# REGRAS DOS BOLETINS (validacao do resultado do OCR)
+# ============================================================
+# Um boletim extraido (pelo Gemini ou pelo OCR local) so e aceite sem
+# revisao se cumprir as regras do jogo: quantidade e intervalo dos
+# numeros, sem repetidos, datas validas, referencia e concurso no
+# formato impresso pela Santa Casa e valor total coerente com o
+# numero de apostas. Cada erro e devolvido como texto com o campo em
+# causa, ex.: "apostas[0].estrelas: 13 fora de 01-12".
+
+# ===== CONFIGURACAO =====
+# campo -> (quantidade, minimo, maximo)
+REGRAS_JOGOS = {
+    "Euromilhões": {"numeros": (5, 1, 50), "estrelas": (2, 1, 12)},
+    "Totoloto": {"numeros": (5, 1, 49), "numero_da_sorte": (1, 1, 13)},
+    "Eurodreams": {"numeros": (6, 1, 40), "dream": (1, 1, 5)},
+    "M1lhão": {},
+}
+
+# Preco de cada aposta simples, em centimos
+PRECO_APOSTA_CENTIMOS = {
+    "Euromilhões": 220,
+    "Totoloto": 100,
+    "Eurodreams": 250,
+    "M1lhão": 30,
+}
+
+_RE_DATA = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+_RE_DATA_HORA = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+_RE_CODIGO_MILHAO = re.compile(r"^[A-Z]{3}\d{5}$")
+_RE_CONCURSO = re.compile(r"^\d{3}/\d{4}$")
+# "684-05231704-M1L", "184-01904247-093", "260708-17-7065150098-567"
+_RE_REFERENCIA = re.compile(r"^(?:\d{3}-\d{8}-(?:\d{3}|M1L|EUR)|\d{6}-\d{2}-\d{10}-\d{3})$")
+
+
+def _valores(aposta: dict, campo: str) -> list:
+    valor = aposta.get(campo)
+    if valor is None:
+        return []
+    return valor if isinstance(valor, list) else [valor]
+
+
+def _validar_data(jogo: dict, campo: str, padrao, formato: str, erros: List[str]):
+    valor = jogo.get(campo)
+    if not isinstance(valor, str) or not padrao.match(valor):
+        erros.append(f"{campo}: formato inválido ({valor!r})")
+        return
+    try:
+        datetime.strptime(valor, formato)
+    except ValueError:
+        erros.append(f"{campo}: data inexistente ({valor})")
+
+
+def validar_aposta(tipo: str, aposta: dict, posicao: int) -> List[str]:
+    """Erros de uma linha de aposta segundo as regras do jogo."""
+    erros = []
+    prefixo = f"apostas[{posicao}]"
+
+    if tipo == "M1lhão":
+        codigo = aposta.get("codigo") or ""
+        if not _RE_CODIGO_MILHAO.match(codigo):
+            erros.append(f"{prefixo}.codigo: formato inválido ({codigo!r}, esperado AAA99999)")
+        return erros
+
+    for campo, (quantidade, minimo, maximo) in REGRAS_JOGOS[tipo].items():
+        valores = _valores(aposta, campo)
+        if len(valores) != quantidade:
+            erros.append(f"{prefixo}.{campo}: {len(valores)} valor(es), esperado(s) {quantidade}")
+        for valor in valores:
+            texto = str(valor)
+            if not re.fullmatch(r"\d{2}", texto):
+                erros.append(f"{prefixo}.{campo}: {texto!r} não tem 2 dígitos")
+            elif not minimo <= int(texto) <= maximo:
+                erros.append(f"{prefixo}.{campo}: {texto} fora de {minimo:02d}-{maximo:02d}")
+        if len(set(map(str, valores))) != len(valores):
+            erros.append(f"{prefixo}.{campo}: números repetidos")
+    return erros
+
+
+def validar_jogo(jogo: dict) -> List[str]:
+    """Lista de erros do boletim (vazia se cumpre todas as regras)."""
+    tipo = jogo.get("tipo")
+    if tipo not in REGRAS_JOGOS:
+        return [f"tipo: desconhecido ({tipo!r})"]
+
+    erros = []
+    _validar_data(jogo, "data_sorteio", _RE_DATA, "%Y-%m-%d", erros)
+    _validar_data(jogo, "data_aposta", _RE_DATA, "%Y-%m-%d", erros)
+    if jogo.get("data_emissao") is not None:
+        _validar_data(jogo, "data_emissao", _RE_DATA_HORA, "%Y-%m-%d %H:%M:%S", erros)
+    if not erros and jogo["data_aposta"] > jogo["data_sorteio"]:
+        erros.append("data_aposta: posterior a data_sorteio")
+
+    if not _RE_REFERENCIA.match(jogo.get("referencia_unica") or ""):
+        erros.append(f"referencia_unica: formato inválido ({jogo.get('referencia_unica')!r})")
+    if not _RE_CONCURSO.match(str(jogo.get("concurso") or "")):
+        erros.append(f"concurso: formato inválido ({jogo.get('concurso')!r}, esperado 000/AAAA)")
+
+    apostas = jogo.get("apostas") or []
+    if not apostas:
+        erros.append("apostas: nenhuma aposta")
+    for posicao, aposta in enumerate(apostas):
+        erros.extend(validar_aposta(tipo, aposta, posicao))
+
+    if not valor_coerente(jogo):
+        erros.append(f"valor_total: {jogo.get('valor_total')} não corresponde a {len(apostas)} aposta(s)")
+    return erros
+
+
+def valor_coerente(jogo: dict) -> bool:
+    """valor_total == preco da aposta simples x numero de apostas."""
+    try:
+        centimos = int(round(float(jogo.get("valor_total")) * 100))
+    except (TypeError, ValueError):
+        return False
+    return centimos == PRECO_APOSTA_CENTIMOS.get(jogo.get("tipo"), -1) * len(jogo.get("apostas") or [])
+
+
+# ============================================================
+# REPARACAO AUTOMATICA
+# ============================================================
+# Erros de formato que tem uma unica correcao possivel sao reparados
+# localmente, sem novo pedido: "7" -> "07", datas "24/02/2026",
+# 7 numeros no Euromilhoes (os 2 ultimos sao as estrelas, regra do
+# prompt), codigo M1lhao com espacos, concurso sem ano, etc.
+# O que ficar por reparar e devolvido por validar_jogo e pode ser
+# pedido de novo ao modelo, so para esses campos.
+
+_TIPOS = {
+    "euromilhoes": "Euromilhões",
+    "totoloto": "Totoloto",
+    "eurodreams": "Eurodreams",
+    "euro dreams": "Eurodreams",
+    "m1lhao": "M1lhão",
+    "milhao": "M1lhão",
+}
+_SEM_ACENTOS = str.maketrans("õãáéíóúç", "oaaeiouc")
+_RE_DATA_DMA = re.compile(r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})")
+_RE_DATA_AMD = re.compile(r"^(\d{4})[/.-](\d{1,2})[/.-](\d{1,2})")
+_RE_HORA = re.compile(r"(\d{1,2}):(\d{2}):(\d{2})")
+# Campo em excesso -> campo especial (quantidade), quando este vem vazio
+_EXCEDENTES = {
+    "Euromilhões": ("estrelas", 2),
+    "Eurodreams": ("dream", 1),
+}
+
+
+def _dois_digitos(valor):
+    texto = str(valor).strip()
+    if texto.isdigit() and 0 < int(texto) < 100:
+        return f"{int(texto):02d}"
+    return texto
+
+
+def _normalizar_data(valor, com_hora: bool = False):
+    if not isinstance(valor, str):
+        return valor
+    texto = valor.strip()
+    match = _RE_DATA_AMD.match(texto)
+    if match:
+        ano, mes, dia = match.groups()
+    else:
+        match = _RE_DATA_DMA.match(texto)
+        if not match:
+            return valor
+        dia, mes, ano = match.groups()
+    data = f"{ano}-{int(mes):02d}-{int(dia):02d}"
+    if not com_hora:
+        return data
+    hora = _RE_HORA.search(texto[match.end():])
+    if not hora:
+        return valor
+    h, m, s = hora.groups()
+    return f"{data} {int(h):02d}:{m}:{s}"
+
+
+def reparar_jogo(jogo: dict):
+    """
+    Devolve (copia reparada do jogo, erros que ficaram por reparar).
+    O dicionario original nao e alterado.
+    """
+    jogo = dict(jogo)
+    chave_tipo = str(jogo.get("tipo") or "").strip().lower().translate(_SEM_ACENTOS)
+    jogo["tipo"] = _TIPOS.get(chave_tipo, jogo.get("tipo"))
+    tipo = jogo["tipo"]
+
+    jogo["data_sorteio"] = _normalizar_data(jogo.get("data_sorteio"))
+    jogo["data_aposta"] = _normalizar_data(jogo.get("data_aposta"))
+    if jogo.get("data_emissao") is not None:
+        jogo["data_emissao"] = _normalizar_data(jogo["data_emissao"], com_hora=True)
+
+    if isinstance(jogo.get("referencia_unica"), str):
+        referencia = re.sub(r"\s+", "", jogo["referencia_unica"]).upper()
+        jogo["referencia_unica"] = re.sub(r"-M[IL]L$", "-M1L", referencia)
+
+    concurso = str(jogo.get("concurso") or "").strip()
+    match = re.match(r"^(\d{1,3})(?:/(\d{4}))?$", concurso)
+    if match:
+        ano = match.group(2) or str(jogo.get("data_sorteio") or "")[:4]
+        if ano.isdigit():
+            jogo["concurso"] = f"{int(match.group(1)):03d}/{ano}"
+
+    if isinstance(jogo.get("valor_total"), str):
+        try:
+            jogo["valor_total"] = float(jogo["valor_total"].replace("€", "").replace(",", ".").strip())
+        except ValueError:
+            pass
+
+    apostas = []
+    for aposta in jogo.get("apostas") or []:
+        aposta = dict(aposta)
+        if tipo == "M1lhão":
+            if isinstance(aposta.get("codigo"), str):
+                aposta["codigo"] = re.sub(r"\s+", "", aposta["codigo"]).upper()
+            apostas.append(aposta)
+            continue
+
+        for campo in REGRAS_JOGOS.get(tipo, {}):
+            if campo == "numero_da_sorte":
+                valor = aposta.get(campo)
+                if isinstance(valor, list):
+                    valor = valor[0] if len(valor) == 1 else valor
+                if valor is not None and not isinstance(valor, list):
+                    aposta[campo] = _dois_digitos(valor)
+            elif campo in aposta:
+                valor = aposta[campo]
+                valores = valor if isinstance(valor, list) else str(valor).split()
+                aposta[campo] = [_dois_digitos(v) for v in valores]
+
+        # "Se encontrares 7 numeros, os ultimos sao as estrelas / o Dream Number"
+        if tipo in _EXCEDENTES:
+            campo, quantidade = _EXCEDENTES[tipo]
+            numeros = aposta.get("numeros") or []
+            esperado = REGRAS_JOGOS[tipo]["numeros"][0]
+            if len(numeros) == esperado + quantidade and not aposta.get(campo):
+                aposta["numeros"], aposta[campo] = numeros[:esperado], numeros[esperado:]
+        apostas.append(aposta)
+    jogo["apostas"] = apostas
+
+    return jogo, validar_jogo(jogo)
+
+
+def campos_com_erro(erros: List[str]) -> List[str]:
+    """ "apostas[0].estrelas: ..." -> "apostas[0].estrelas" (sem repetidos, pela ordem)"""
+    campos = []
+    for erro in erros:
+        campo = erro.split(":", 1)[0].strip()
+        if campo not in campos:
+            campos.append(campo)
+    return campos
+
+
+def aplicar_correcao(jogo: dict, campo: str, valor: str) -> bool:
+    """
+    Aplica uma correcao devolvida pelo modelo, ex.:
+    ("apostas[0].estrelas", "02 08"), ("data_sorteio", "2026-02-24").
+    Listas vem como numeros separados por espacos. Devolve False se o
+    caminho nao existir.
+    """
+    match = re.match(r"^apostas\[(\d+)\]\.(\w+)$", campo)
+    if match:
+        posicao, nome = int(match.group(1)), match.group(2)
+        apostas = jogo.get("apostas") or []
+        if posicao >= len(apostas):
+            return False
+        if nome in ("numeros", "estrelas", "dream"):
+            apostas[posicao][nome] = str(valor).split()
+        else:
+            apostas[posicao][nome] = str(valor).strip()
+        return True
+
+    if campo == "valor_total":
+        try:
+            jogo[campo] = float(str(valor).replace(",", "."))
+        except ValueError:
+            return False
+        return True
+    if campo in ("tipo", "data_sorteio", "data_aposta", "data_emissao", "referencia_unica", "concurso"):
+        jogo[campo] = str(valor).strip()
+        return True
+    return False
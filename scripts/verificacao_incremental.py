@@ -0,0 +1,73 @@
+import hashlib
+import json
+import os
+
+import armazenamento
+
+# ===== CONFIGURACAO =====
+# VERIFICACAO_COMPLETA=1 ignora as marcas e volta a verificar todos os boletins
+VERIFICACAO_COMPLETA = os.environ.get("VERIFICACAO_COMPLETA", "") == "1"
+
+# ============================================================
+# MARCAS DE VERIFICACAO
+# ============================================================
+# Ficheiro <jogo>_marcas.json: {referencia_unica: hash(boletim + sorteio)}.
+# Um boletim so volta a ser verificado se for novo, se o sorteio mudou
+# (ex.: os premios foram preenchidos/corrigidos) ou se o proprio boletim
+# foi editado (ex.: correcao dos numeros na validacao).
+
+def _hash(dados) -> str:
+    texto = json.dumps(dados, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()
+
+
+def calcular_marca(boletim: dict, sorteio: dict) -> str:
+    return _hash([
+        boletim.get("data_sorteio"),
+        boletim.get("concurso"),
+        boletim.get("apostas", []),
+        boletim.get("codigo"),
+        sorteio,
+    ])
+
+
+def carregar_marcas(ficheiro_marcas: str, ficheiro_historico: str) -> dict:
+    """
+    Carrega as marcas da ultima verificacao. Sem historico (ou com
+    VERIFICACAO_COMPLETA) devolve marcas vazias para forcar tudo.
+    """
+    if VERIFICACAO_COMPLETA or not armazenamento.existe(ficheiro_historico):
+        return {}
+    marcas = armazenamento.ler_json(ficheiro_marcas, {})
+    return marcas if isinstance(marcas, dict) else {}
+
+
+def precisa_verificar(marcas: dict, boletim: dict, sorteio: dict) -> bool:
+    referencia = boletim.get("referencia_unica")
+    if not referencia:
+        return True
+    return marcas.get(referencia) != calcular_marca(boletim, sorteio)
+
+
+def registar(marcas: dict, boletim: dict, sorteio: dict):
+    referencia = boletim.get("referencia_unica")
+    if referencia:
+        marcas[referencia] = calcular_marca(boletim, sorteio)
+
+
+def data_verificacao(sorteio: dict, data_aposta: str = "") -> str:
+    """
+    Data estavel para "data_verificacao": a do sorteio ("YYYY-MM-DD 00:00:00").
+    Com a hora da execucao, voltar a verificar o mesmo boletim mudava os
+    ficheiros (e disparava commits/workflows) sem nada ter mudado.
+    """
+    data = sorteio.get("data") or ""
+    partes = data.split("/")
+    if len(partes) == 3:
+        dia, mes, ano = partes
+        return f"{ano}-{mes.zfill(2)}-{dia.zfill(2)} 00:00:00"
+    return f"{(data_aposta or '')[:10]} 00:00:00"
+
+
+def guardar_marcas(ficheiro_marcas: str, marcas: dict):
+    armazenamento.escrever_json(ficheiro_marcas, marcas)
@@ -1,24 +1,27 @@
-import json
 import os
-import glob
-import re
-from datetime import datetime
 from typing import List, Tuple
 
+import armazenamento
+import historico_verificacoes
+import indice_sorteios
+import motor_acertos
+import verificacao_incremental
+
 # ===== CONFIGURACAO =====
 FICHEIRO_APOSTAS = "apostas/eurodreams.json"
 PASTA_DADOS = "dados/"
-FICHEIRO_SORTEIOS_PADRAO = "eurodreams_*.json"
 FICHEIRO_RESULTADOS = "resultados/eurodreams_verificacoes.json"
+FICHEIRO_MARCAS = "resultados/eurodreams_marcas.json"
 
 # ===== TABELA DE PREMIOS EURODREAMS =====
+# (numeros, dream) -> ordem do premio ("1.º Prémio" -> 1)
 PREMIOS_EURODREAMS = {
-    (6, True):  "1. Prémio",
-    (6, False): "2. Prémio",
-    (5, False): "3. Prémio",
-    (4, False): "4. Prémio",
-    (2, False): "6. Prémio",
-    (3, False): "5. Prémio",   # Corrigida ordem para coerencia
+    (6, True):  1,
+    (6, False): 2,
+    (5, False): 3,
+    (4, False): 4,
+    (2, False): 6,
+    (3, False): 5,   # Corrigida ordem para coerencia
 }
 
 # ============================================================
@@ -26,53 +29,16 @@ PREMIOS_EURODREAMS = {
 # ============================================================
 
 def carregar_json(ficheiro: str):
-    if not os.path.exists(ficheiro):
+    dados = armazenamento.ler_json(ficheiro)
+    if dados is None:
         print(f"Aviso: Ficheiro nao encontrado: {ficheiro}")
         return []
-    with open(ficheiro, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return dados
 
 def carregar_sorteios():
-    todos = {}
-    ficheiros = glob.glob(os.path.join(PASTA_DADOS, FICHEIRO_SORTEIOS_PADRAO))
-
-    for ficheiro in ficheiros:
-        nome = os.path.basename(ficheiro)
-        # 🔧 Ignorar o ficheiro "atual" (evita erro de parsing)
-        if nome == "eurodreams_atual.json":
-            print(f"   Ignorando {nome} (apenas último sorteio)")
-            continue
-
-        try:
-            with open(ficheiro, "r", encoding="utf-8") as f:
-                dados = json.load(f)
-
-            if isinstance(dados, list):
-                lista = dados
-            else:
-                # Caso esteja estruturado por ano
-                lista = []
-                for ano in dados.values():
-                    lista.extend(ano)
-
-            index = {}
-            for s in lista:
-                chave = f"{s.get('data')}|{s.get('concurso')}"
-                index[chave] = s
-
-            todos.update(index)
-
-        except Exception as e:
-            print(f"Erro ao carregar {ficheiro}: {e}")
-
-    return todos
-
-def normalizar_data_para_busca(data_iso: str) -> str:
-    try:
-        ano, mes, dia = data_iso.split("-")
-        return f"{dia}/{mes}/{ano}"
-    except:
-        return data_iso
+    # Indice partilhado (ignora eurodreams_atual.json, que e apenas o ultimo sorteio)
+    indice = indice_sorteios.carregar_indice("eurodreams", PASTA_DADOS)
+    return indice if indice["anos"] else {}
 
 def extrair_numeros_sorteio(sorteio: dict) -> Tuple[List[str], str]:
     numeros = [str(n).zfill(2) for n in sorteio.get("numeros", [])]
@@ -87,58 +53,44 @@ def extrair_dream_aposta(aposta: dict) -> str:
     else:
         return str(dream_raw).zfill(2)
 
-def calcular_acertos(aposta_numeros, aposta_dream, sorteio_numeros, sorteio_dream):
-    acertos = len(set(aposta_numeros) & set(sorteio_numeros))
-    acertou_dream = (aposta_dream == sorteio_dream)
-    return acertos, acertou_dream
-
-def normalizar(texto):
-    """Remove acentos, ordinais e pontuação para comparações exatas."""
-    texto = texto.lower()
-    texto = re.sub(r'[ºª]', '', texto)           # remove ordinais
-    texto = re.sub(r'[^a-z0-9 ]', '', texto)     # remove pontuação
-    texto = re.sub(r'\s+', ' ', texto).strip()   # normaliza espaços
-    return texto
-
-def encontrar_premio_por_nome(lista_premios, nome_esperado):
-    """Procura um prémio na lista ignorando diferenças de acentos/ordinais."""
-    if not nome_esperado:
-        return None
-    esperado_norm = normalizar(nome_esperado)
-    for p in lista_premios:
-        if normalizar(p.get("premio", "")) == esperado_norm:
-            return p
-    return None
+def mascaras_aposta(aposta: dict) -> Tuple[int, int]:
+    return (motor_acertos.mascara(aposta.get("numeros", [])),
+            motor_acertos.mascara(extrair_dream_aposta(aposta)))
+
+def mascaras_sorteio(sorteio: dict) -> Tuple[int, int]:
+    numeros, dream = extrair_numeros_sorteio(sorteio)
+    return motor_acertos.mascara(numeros), motor_acertos.mascara(dream)
 
 # ============================================================
 # LOGICA DE PREMIOS (OFICIAL)
 # ============================================================
 
-def encontrar_premio(sorteio: dict, acertos_n: int, acertou_dream: bool):
+def encontrar_premio(premios_sorteio: dict, acertos_n: int, acertou_dream: bool):
     if acertos_n == 6:
-        nome = "1. Prémio" if acertou_dream else "2. Prémio"
+        ordem = 1 if acertou_dream else 2
     else:
-        nome = PREMIOS_EURODREAMS.get((acertos_n, False))
+        ordem = PREMIOS_EURODREAMS.get((acertos_n, False))
 
-    if not nome:
+    if not ordem:
         return None
 
-    # 👇 Usa a procura normalizada em vez da comparação exata
-    return encontrar_premio_por_nome(sorteio.get("premios", []), nome)
+    # Premios compilados do sorteio ({ordem: premio})
+    return premios_sorteio.get(ordem)
 
 # ============================================================
 # VERIFICACAO
 # ============================================================
 
-def verificar_boletins(apostas, sorteios):
+def verificar_boletins(apostas, sorteios, marcas=None):
     resultados = []
+    pendentes = []
 
     for boletim in apostas:
         data = boletim.get("data_sorteio")
         concurso = boletim.get("concurso")
-        chave = f"{normalizar_data_para_busca(data)}|{concurso}"
+        chave = f"{indice_sorteios.normalizar_data_para_busca(data)}|{concurso}"
 
-        sorteio = sorteios.get(chave)
+        sorteio = sorteios["por_data_concurso"].get(chave)
         if not sorteio:
             print(f"Aviso: Sorteio nao encontrado para data {data}")
             continue
@@ -148,25 +100,45 @@ def verificar_boletins(apostas, sorteios):
             print(f"Aviso: Sorteio {concurso} sem lista de prémios completa. Ignorado.")
             continue
 
-        numeros_sorteio, dream_sorteio = extrair_numeros_sorteio(sorteio)
+        # Boletim e sorteio iguais aos da ultima verificacao: nada a fazer
+        if marcas is not None and not verificacao_incremental.precisa_verificar(marcas, boletim, sorteio):
+            continue
 
-        for aposta in boletim.get("apostas", []):
-            numeros_aposta = aposta.get("numeros", [])
-            dream_aposta = extrair_dream_aposta(aposta)
+        pendentes.append((boletim, sorteio))
+
+    # Acertos de todas as linhas, num lote por sorteio
+    acertos_lote = motor_acertos.calcular_acertos_lote(pendentes, mascaras_aposta, mascaras_sorteio)
 
-            acertos_n, acertou_dream = calcular_acertos(
-                numeros_aposta, dream_aposta,
-                numeros_sorteio, dream_sorteio
+    por_sorteio = {}
+    for (boletim, sorteio), acertos_boletim in zip(pendentes, acertos_lote):
+        data = boletim.get("data_sorteio")
+        concurso = boletim.get("concurso")
+
+        # Numeros, mascara e tabela de premios calculados uma vez por sorteio
+        if id(sorteio) not in por_sorteio:
+            por_sorteio[id(sorteio)] = (
+                extrair_numeros_sorteio(sorteio),
+                mascaras_sorteio(sorteio)[0],
+                motor_acertos.tabela_premios(
+                    indice_sorteios.premios_do_sorteio(sorteios, sorteio),
+                    encontrar_premio, 6, (False, True)
+                )
             )
+        (numeros_sorteio, dream_sorteio), m_numeros, tabela = por_sorteio[id(sorteio)]
+
+        for aposta, (acertos_n, acertos_dream) in zip(boletim.get("apostas", []), acertos_boletim):
+            numeros_aposta = aposta.get("numeros", [])
+            dream_aposta = extrair_dream_aposta(aposta)
+            acertou_dream = acertos_dream > 0
 
             # Listas exatas para o frontend destacar acertos
-            numeros_acertados = sorted(list(set(numeros_aposta) & set(numeros_sorteio)))
+            numeros_acertados = motor_acertos.decodificar(mascaras_aposta(aposta)[0] & m_numeros)
             dream_acertado = dream_aposta if acertou_dream else None
 
-            premio = encontrar_premio(sorteio, acertos_n, acertou_dream)
+            premio = tabela[(acertos_n, acertou_dream)]
 
             resultado = {
-                "data_verificacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "data_verificacao": verificacao_incremental.data_verificacao(sorteio, data),
                 "boletim": {
                     "referencia": boletim.get("referencia_unica"),
                     "concurso_sorteio": concurso,
@@ -192,12 +164,16 @@ def verificar_boletins(apostas, sorteios):
                 "ganhou": bool(premio),
                 "premio": premio if premio else {
                     "premio": "Sem premio",
-                    "valor": "EUR 0,00"
+                    "valor": "EUR 0,00",
+                    "valor_centimos": 0
                 }
             }
 
             resultados.append(resultado)
 
+        if marcas is not None:
+            verificacao_incremental.registar(marcas, boletim, sorteio)
+
     return resultados
 
 # ============================================================
@@ -207,46 +183,18 @@ def verificar_boletins(apostas, sorteios):
 def guardar_resultados(resultados):
     os.makedirs("resultados", exist_ok=True)
 
-    if os.path.exists(FICHEIRO_RESULTADOS):
-        with open(FICHEIRO_RESULTADOS, "r", encoding="utf-8") as f:
-            historico = json.load(f)
-    else:
-        historico = []
-
-    novos = 0
-    for novo in resultados:
-        chave_nova = (
-            novo["boletim"]["referencia"],
-            novo["aposta"]["indice"],
-            novo["boletim"]["concurso_sorteio"]
-        )
-
-        existe = False
-        for existente in historico:
-            chave_existente = (
-                existente["boletim"]["referencia"],
-                existente["aposta"]["indice"],
-                existente["boletim"]["concurso_sorteio"]
-            )
-            if chave_nova == chave_existente:
-                existe = True
-                break
-
-        if not existe:
-            historico.append(novo)
-            novos += 1
-
-    with open(FICHEIRO_RESULTADOS, "w", encoding="utf-8") as f:
-        json.dump(historico, f, indent=2, ensure_ascii=False)
+    total, novos, substituidos = historico_verificacoes.atualizar_historico(
+        FICHEIRO_RESULTADOS, resultados
+    )
 
     print(f"\nHistorico guardado em: {FICHEIRO_RESULTADOS}")
     print(f"Novas verificacoes no historico: {novos}")
-    print(f"Total no historico: {len(historico)}")
+    print(f"Verificacoes atualizadas no historico: {substituidos}")
+    print(f"Total no historico: {total}")
 
     if resultados:
         caminho_recentes = os.path.join("resultados", "eurodreams_recentes.json")
-        with open(caminho_recentes, "w", encoding="utf-8") as f:
-            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        armazenamento.escrever_json(caminho_recentes, resultados)
         print(f"Resultados recentes guardados em: {caminho_recentes}")
         print(f"Total de resultados recentes: {len(resultados)}")
 
@@ -283,13 +231,15 @@ def main():
         print("ERRO: Sem sorteios")
         return
 
-    resultados = verificar_boletins(apostas, sorteios)
+    marcas = verificacao_incremental.carregar_marcas(FICHEIRO_MARCAS, FICHEIRO_RESULTADOS)
+    resultados = verificar_boletins(apostas, sorteios, marcas)
 
     if resultados:
         guardar_resultados(resultados)
+        verificacao_incremental.guardar_marcas(FICHEIRO_MARCAS, marcas)
         gerar_relatorio(resultados)
     else:
-        print("Nenhum resultado gerado")
+        print("Nenhum resultado gerado (sem boletins novos ou sorteios alterados)")
 
 if __name__ == "__main__":
     main()
@@ -1,117 +1,64 @@
-import json
 import os
-import glob
-import re
-from datetime import datetime
 from typing import Dict, List, Tuple, Optional
 
+import armazenamento
+import historico_verificacoes
+import indice_sorteios
+import motor_acertos
+import verificacao_incremental
+
 # ===== CONFIGURACAO =====
 FICHEIRO_APOSTAS = "apostas/euromilhoes.json"
 PASTA_DADOS = "dados/"
 FICHEIRO_RESULTADOS = "resultados/euromilhoes_verificacoes.json"
+FICHEIRO_MARCAS = "resultados/euromilhoes_marcas.json"
 
 # ===== TABELA DE PREMIOS EUROMILHOES =====
+# (numeros, estrelas) -> ordem do premio ("1.º Prémio" -> 1)
 PREMIOS_EUROMILHOES = {
-    (5, 2): "1. Prémio",
-    (5, 1): "2. Prémio",
-    (5, 0): "3. Prémio",
-    (4, 2): "4. Prémio",
-    (4, 1): "5. Prémio",
-    (3, 2): "6. Prémio",
-    (4, 0): "7. Prémio",
-    (2, 2): "8. Prémio",
-    (3, 1): "9. Prémio",
-    (3, 0): "10. Prémio",
-    (1, 2): "11. Prémio",
-    (2, 1): "12. Prémio",
-    (2, 0): "13. Prémio"
+    (5, 2): 1,
+    (5, 1): 2,
+    (5, 0): 3,
+    (4, 2): 4,
+    (4, 1): 5,
+    (3, 2): 6,
+    (4, 0): 7,
+    (2, 2): 8,
+    (3, 1): 9,
+    (3, 0): 10,
+    (1, 2): 11,
+    (2, 1): 12,
+    (2, 0): 13
 }
 
-# ============================================================
-# NOVAS FUNÇÕES DE NORMALIZAÇÃO
-# ============================================================
-
-def normalizar(texto):
-    """Remove acentos, ordinais e pontuação para comparações exatas."""
-    texto = texto.lower()
-    texto = re.sub(r'[ºª]', '', texto)           # remove ordinais
-    texto = re.sub(r'[^a-z0-9 ]', '', texto)     # remove pontuação
-    texto = re.sub(r'\s+', ' ', texto).strip()   # normaliza espaços
-    return texto
-
-def encontrar_premio_por_nome(lista_premios, nome_esperado):
-    """Procura um prémio na lista ignorando diferenças de acentos/ordinais."""
-    if not nome_esperado:
-        return None
-    esperado_norm = normalizar(nome_esperado)
-    for p in lista_premios:
-        if normalizar(p.get("premio", "")) == esperado_norm:
-            return p
-    return None
-
 # ============================================================
 # FUNÇÕES ORIGINAIS (mantidas intactas exceto a modificação abaixo)
 # ============================================================
 
 def carregar_todos_sorteios() -> dict:
     """
-    Carrega todos os ficheiros de sorteios (euromilhoes_ANO.json)
-    Ignora euromilhoes_atual.json porque e apenas o ultimo sorteio
+    Carrega todos os ficheiros de sorteios (euromilhoes_ANO.json) atraves
+    do indice partilhado (ignora euromilhoes_atual.json)
     """
-    todos_sorteios = {}
-    
-    padrao = os.path.join(PASTA_DADOS, "euromilhoes_*.json")
-    ficheiros = glob.glob(padrao)
+    indice = indice_sorteios.carregar_indice("euromilhoes", PASTA_DADOS)
     
-    if not ficheiros:
+    if not indice["anos"]:
         print(f"Aviso: Nenhum ficheiro de sorteios encontrado em {PASTA_DADOS}")
         return {}
     
-    for ficheiro in ficheiros:
-        nome = os.path.basename(ficheiro)
-        
-        if nome == "euromilhoes_atual.json":
-            print(f"   Ignorando {nome} (apenas ultimo sorteio)")
-            continue
-        
-        match = re.search(r'euromilhoes_(\d{4})\.json', nome)
-        if not match:
-            print(f"   Ignorando {nome} (formato nao reconhecido)")
-            continue
-        
-        ano = match.group(1)
-        
-        try:
-            with open(ficheiro, "r", encoding="utf-8") as f:
-                dados = json.load(f)
-            
-            if ano in dados and isinstance(dados[ano], list):
-                sorteios_indexados = {}
-                for sorteio in dados[ano]:
-                    chave = f"{sorteio.get('data')}|{sorteio.get('concurso')}"
-                    sorteios_indexados[chave] = sorteio
-                
-                todos_sorteios[ano] = {
-                    "lista": dados[ano],
-                    "index": sorteios_indexados
-                }
-                print(f"   Carregados {len(dados[ano])} sorteios de {ano}")
-            else:
-                print(f"Aviso: Formato invalido em {ficheiro}")
-                
-        except Exception as e:
-            print(f"Erro ao carregar {ficheiro}: {e}")
+    for ano, lista in sorted(indice["anos"].items()):
+        print(f"   Carregados {len(lista)} sorteios de {ano}")
     
-    return todos_sorteios
+    return indice
 
 def carregar_json(ficheiro: str):
     """Carrega um ficheiro JSON de apostas"""
-    if not os.path.exists(ficheiro):
+    dados = armazenamento.ler_json(ficheiro)
+    if dados is None:
         print(f"Aviso: Ficheiro nao encontrado: {ficheiro}")
         return []
     
-    with open(ficheiro, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return dados
 
 def converter_data(data_str: str) -> str:
     """Converte data para formato comparavel (YYYY-MM-DD)"""
@@ -124,16 +71,6 @@ def converter_data(data_str: str) -> str:
     except:
         return data_str
 
-def normalizar_data_para_busca(data_aposta: str) -> str:
-    """
-    Converte data do formato ISO (YYYY-MM-DD) para o formato do sorteio (DD/MM/YYYY)
-    """
-    try:
-        ano, mes, dia = data_aposta.split('-')
-        return f"{dia}/{mes}/{ano}"
-    except:
-        return data_aposta
-
 def extrair_concurso_referencia(referencia: str) -> Optional[str]:
     """
     Tenta extrair numero de concurso da referencia unica do boletim
@@ -153,64 +90,47 @@ def extrair_chave_sorteio(chave_str: str) -> Tuple[List[str], List[str]]:
     
     return numeros, estrelas
 
-def calcular_acertos(aposta_numeros: List[str], aposta_estrelas: List[str],
-                     sorteio_numeros: List[str], sorteio_estrelas: List[str]) -> Tuple[int, int]:
-    """Calcula quantos numeros e estrelas acertou"""
-    acertos_numeros = len(set(aposta_numeros) & set(sorteio_numeros))
-    acertos_estrelas = len(set(aposta_estrelas) & set(sorteio_estrelas))
-    return acertos_numeros, acertos_estrelas
+def mascaras_aposta(aposta_ind: dict) -> Tuple[int, int]:
+    """Mascaras de bits (numeros, estrelas) de uma linha de aposta"""
+    return (motor_acertos.mascara(aposta_ind.get("numeros", [])),
+            motor_acertos.mascara(aposta_ind.get("estrelas", [])))
+
+def mascaras_sorteio(sorteio: dict) -> Tuple[int, int]:
+    """Mascaras de bits (numeros, estrelas) da chave do sorteio"""
+    numeros, estrelas = extrair_chave_sorteio(sorteio.get("chave", ""))
+    return motor_acertos.mascara(numeros), motor_acertos.mascara(estrelas)
 
-def encontrar_premio(sorteio: dict, acertos_n: int, acertos_e: int) -> Optional[dict]:
-    """Encontra o premio correspondente na lista de premios do sorteio (com procura normalizada)"""
-    chave_premio = (acertos_n, acertos_e)
-    nome_premio = PREMIOS_EUROMILHOES.get(chave_premio)
+def encontrar_premio(premios_sorteio: dict, acertos_n: int, acertos_e: int) -> Optional[dict]:
+    """Encontra o premio correspondente nos premios compilados do sorteio ({ordem: premio})"""
+    ordem = PREMIOS_EUROMILHOES.get((acertos_n, acertos_e))
     
-    if not nome_premio:
+    if not ordem:
         return None
     
-    # 👇 Alteração principal: usa a procura normalizada em vez da comparação exata
-    return encontrar_premio_por_nome(sorteio.get("premios", []), nome_premio)
+    return premios_sorteio.get(ordem)
 
-def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
+def verificar_boletins(apostas: list, todos_sorteios: dict, marcas: Optional[dict] = None) -> list:
     """
     Verifica todos os boletins contra os sorteios usando DUPLA VALIDACAO:
     1. Data do sorteio
     2. Numero do concurso (se disponivel no boletim)
+    Com `marcas`, ignora os boletins cujo boletim e sorteio nao mudaram
+    desde a ultima verificacao (e atualiza as marcas dos verificados).
     """
     resultados = []
+    pendentes = []
     
     for aposta in apostas:
         data_aposta = aposta.get("data_sorteio")
         
-        try:
-            ano_aposta = data_aposta.split('-')[0]
-        except:
+        if not data_aposta:
             print(f"Aviso: Data invalida: {data_aposta}")
             continue
         
-        dados_ano = todos_sorteios.get(ano_aposta)
-        if not dados_ano:
-            print(f"Aviso: Nenhum sorteio encontrado para o ano {ano_aposta}")
-            continue
-        
-        data_sorteio_formatada = normalizar_data_para_busca(data_aposta)
         concurso_aposta = aposta.get("concurso")
-        
-        sorteio_encontrado = None
-        metodo_encontrado = ""
-        
-        if concurso_aposta:
-            chave_exata = f"{data_sorteio_formatada}|{concurso_aposta}"
-            sorteio_encontrado = dados_ano["index"].get(chave_exata)
-            if sorteio_encontrado:
-                metodo_encontrado = "data + concurso"
-        
-        if not sorteio_encontrado:
-            for sorteio in dados_ano["lista"]:
-                if sorteio.get("data") == data_sorteio_formatada:
-                    sorteio_encontrado = sorteio
-                    metodo_encontrado = "apenas data"
-                    break
+        sorteio_encontrado, metodo_encontrado = indice_sorteios.procurar_sorteio(
+            todos_sorteios, data_aposta, concurso_aposta
+        )
         
         if not sorteio_encontrado:
             print(f"Aviso: Sorteio nao encontrado para data {data_aposta}")
@@ -221,24 +141,44 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
             print(f"Aviso: Sorteio {concurso_aposta} sem lista de prémios completa. Ignorado.")
             continue
         
-        numeros_sorteio, estrelas_sorteio = extrair_chave_sorteio(sorteio_encontrado.get("chave", ""))
+        if marcas is not None and not verificacao_incremental.precisa_verificar(marcas, aposta, sorteio_encontrado):
+            continue
+        
+        pendentes.append((aposta, sorteio_encontrado, metodo_encontrado))
+    
+    # Acertos de todas as linhas, num lote por sorteio
+    acertos_lote = motor_acertos.calcular_acertos_lote(
+        [(a, s) for a, s, _ in pendentes], mascaras_aposta, mascaras_sorteio
+    )
+    
+    por_sorteio = {}
+    for (aposta, sorteio_encontrado, metodo_encontrado), acertos_boletim in zip(pendentes, acertos_lote):
+        concurso_aposta = aposta.get("concurso")
+        
+        # Chave, mascaras e tabela de premios calculadas uma vez por sorteio
+        if id(sorteio_encontrado) not in por_sorteio:
+            por_sorteio[id(sorteio_encontrado)] = (
+                extrair_chave_sorteio(sorteio_encontrado.get("chave", "")),
+                mascaras_sorteio(sorteio_encontrado),
+                motor_acertos.tabela_premios(
+                    indice_sorteios.premios_do_sorteio(todos_sorteios, sorteio_encontrado),
+                    encontrar_premio, 5, range(3)
+                )
+            )
+        (numeros_sorteio, estrelas_sorteio), (m_numeros, m_estrelas), tabela = por_sorteio[id(sorteio_encontrado)]
         
-        for aposta_ind in aposta.get("apostas", []):
+        for aposta_ind, (acertos_n, acertos_e) in zip(aposta.get("apostas", []), acertos_boletim):
             numeros_aposta = aposta_ind.get("numeros", [])
             estrelas_aposta = aposta_ind.get("estrelas", [])
             
-            acertos_n, acertos_e = calcular_acertos(
-                numeros_aposta, estrelas_aposta,
-                numeros_sorteio, estrelas_sorteio
-            )
-            
-            numeros_acertados = sorted(list(set(numeros_aposta) & set(numeros_sorteio)))
-            estrelas_acertadas = sorted(list(set(estrelas_aposta) & set(estrelas_sorteio)))
+            m_aposta_n, m_aposta_e = mascaras_aposta(aposta_ind)
+            numeros_acertados = motor_acertos.decodificar(m_aposta_n & m_numeros)
+            estrelas_acertadas = motor_acertos.decodificar(m_aposta_e & m_estrelas)
             
-            premio = encontrar_premio(sorteio_encontrado, acertos_n, acertos_e)
+            premio = tabela.get((acertos_n, acertos_e))
             
             resultado = {
-                "data_verificacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "data_verificacao": verificacao_incremental.data_verificacao(sorteio_encontrado, aposta.get("data_sorteio")),
                 "metodo_validacao": metodo_encontrado,
                 "boletim": {
                     "referencia": aposta.get("referencia_unica"),
@@ -272,6 +212,7 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
                     "categoria": premio.get("premio"),
                     "descricao": premio.get("descricao"),
                     "valor": premio.get("valor", "0"),
+                    "valor_centimos": premio.get("valor_centimos", 0),
                     "vencedores_pt": premio.get("vencedores_pt", "0"),
                     "vencedores_eu": premio.get("vencedores_eu", "0")
                 }
@@ -282,17 +223,22 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
                     resultado["premio"] = {
                         "categoria": "Sem premio",
                         "descricao": "Nao corresponde a qualquer premio",
-                        "valor": "EUR 0,00"
+                        "valor": "EUR 0,00",
+                        "valor_centimos": 0
                     }
                 else:
                     resultado["premio"] = {
                         "categoria": "Sem premio",
                         "descricao": "0 acertos",
-                        "valor": "EUR 0,00"
+                        "valor": "EUR 0,00",
+                        "valor_centimos": 0
                     }
             
             resultados.append(resultado)
             mostrar_resultado_simples(resultado, metodo_encontrado)
+        
+        if marcas is not None:
+            verificacao_incremental.registar(marcas, aposta, sorteio_encontrado)
     
     return resultados
 
@@ -324,39 +270,21 @@ def guardar_resultados(resultados: list):
     """
     os.makedirs("resultados", exist_ok=True)
     
-    if os.path.exists(FICHEIRO_RESULTADOS):
-        with open(FICHEIRO_RESULTADOS, "r", encoding="utf-8") as f:
-            historico = json.load(f)
-    else:
-        historico = []
-    
-    novos_adicionados = 0
-    for novo in resultados:
-        existe = False
-        for existente in historico:
-            if (existente.get("boletim", {}).get("referencia") == novo["boletim"]["referencia"] and
-                existente.get("aposta", {}).get("indice") == novo["aposta"]["indice"]):
-                existe = True
-                break
-        
-        if not existe:
-            historico.append(novo)
-            novos_adicionados += 1
-    
-    with open(FICHEIRO_RESULTADOS, "w", encoding="utf-8") as f:
-        json.dump(historico, f, indent=2, ensure_ascii=False)
+    total, novos_adicionados, substituidos = historico_verificacoes.atualizar_historico(
+        FICHEIRO_RESULTADOS, resultados
+    )
     
     print(f"\nHistorico guardado em: {FICHEIRO_RESULTADOS}")
     print(f"Novas verificacoes no historico: {novos_adicionados}")
-    print(f"Total no historico: {len(historico)}")
+    print(f"Verificacoes atualizadas no historico: {substituidos}")
+    print(f"Total no historico: {total}")
     
     if resultados:
         nome_base = os.path.basename(FICHEIRO_RESULTADOS)
         nome_recentes = nome_base.replace('_verificacoes', '_recentes')
         caminho_recentes = os.path.join("resultados", nome_recentes)
         
-        with open(caminho_recentes, "w", encoding="utf-8") as f:
-            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        armazenamento.escrever_json(caminho_recentes, resultados)
         
         print(f"Resultados recentes guardados em: {caminho_recentes}")
         print(f"Total de resultados recentes: {len(resultados)}")
@@ -407,17 +335,19 @@ def main():
         print("ERRO: Nenhum sorteio encontrado")
         return
     
-    total_sorteios = sum(len(d["lista"]) for d in todos_sorteios.values())
+    total_sorteios = indice_sorteios.total_sorteios(todos_sorteios)
     print(f"\nApostas carregadas: {len(apostas)}")
-    print(f"Sorteios carregados: {total_sorteios} (de {len(todos_sorteios)} anos)")
+    print(f"Sorteios carregados: {total_sorteios} (de {len(todos_sorteios['anos'])} anos)")
     
-    resultados = verificar_boletins(apostas, todos_sorteios)
+    marcas = verificacao_incremental.carregar_marcas(FICHEIRO_MARCAS, FICHEIRO_RESULTADOS)
+    resultados = verificar_boletins(apostas, todos_sorteios, marcas)
     
     if resultados:
         guardar_resultados(resultados)
+        verificacao_incremental.guardar_marcas(FICHEIRO_MARCAS, marcas)
         gerar_relatorio(resultados)
     else:
-        print("\nNenhum resultado para verificar")
+        print("\nNenhum resultado para verificar (sem boletins novos ou sorteios alterados)")
 
 if __name__ == "__main__":
     main()
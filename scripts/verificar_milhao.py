@@ -1,91 +1,44 @@
-import json
 import os
-import glob
 import re
-from datetime import datetime
 from typing import Dict, List, Optional
 
+import armazenamento
+import historico_verificacoes
+import indice_sorteios
+import premios
+import verificacao_incremental
+
 # ===== CONFIGURAÇÃO =====
 FICHEIRO_APOSTAS = "apostas/milhao.json"
 PASTA_DADOS = "dados/"
 FICHEIRO_RESULTADOS = "resultados/milhao_verificacoes.json"
+FICHEIRO_MARCAS = "resultados/milhao_marcas.json"
+VALOR_PREMIO = "€ 1.000.000,00"
 
 def carregar_todos_sorteios() -> dict:
     """
-    Carrega todos os ficheiros de sorteios (milhao_ANO.json)
-    IGNORA milhao_atual.json porque é apenas o último sorteio
+    Carrega todos os ficheiros de sorteios (milhao_ANO.json) através
+    do índice partilhado (IGNORA milhao_atual.json)
     """
-    todos_sorteios = {}
-    
-    padrao = os.path.join(PASTA_DADOS, "milhao_*.json")
-    ficheiros = glob.glob(padrao)
+    indice = indice_sorteios.carregar_indice("milhao", PASTA_DADOS)
     
-    if not ficheiros:
+    if not indice["anos"]:
         print(f"⚠️ Nenhum ficheiro de sorteios encontrado em {PASTA_DADOS}")
         return {}
     
-    for ficheiro in ficheiros:
-        nome = os.path.basename(ficheiro)
-        
-        if nome == "milhao_atual.json":
-            print(f"   ⏭️ Ignorando {nome} (apenas último sorteio)")
-            continue
-        
-        match = re.search(r'milhao_(\d{4})\.json', nome)
-        if not match:
-            print(f"   ⏭️ Ignorando {nome} (formato não reconhecido)")
-            continue
-        
-        ano = match.group(1)
-        
-        try:
-            with open(ficheiro, "r", encoding="utf-8") as f:
-                dados = json.load(f)
-            
-            if ano in dados and isinstance(dados[ano], list):
-                # Criar índice para pesquisa rápida por DATA + CONCURSO
-                sorteios_indexados = {}
-                for sorteio in dados[ano]:
-                    chave = f"{sorteio.get('data')}|{sorteio.get('concurso')}"
-                    sorteios_indexados[chave] = sorteio
-                
-                # Também criar índice por código premiado (para verificar se ganhou)
-                codigos_premiados = {}
-                for sorteio in dados[ano]:
-                    codigo = sorteio.get('codigo', '').replace(' ', '')
-                    if codigo:
-                        # Limpar código (remover espaços)
-                        codigo_limpo = re.sub(r'\s+', '', codigo)
-                        codigos_premiados[codigo_limpo] = {
-                            'sorteio': sorteio,
-                            'concurso': sorteio.get('concurso'),
-                            'data': sorteio.get('data'),
-                            'premio_nome': sorteio.get('premio_nome', '1.º Prémio'),
-                            'vencedores': sorteio.get('vencedores', '1')
-                        }
-                
-                todos_sorteios[ano] = {
-                    "lista": dados[ano],
-                    "index": sorteios_indexados,
-                    "codigos_premiados": codigos_premiados
-                }
-                print(f"   📅 Carregados {len(dados[ano])} sorteios de {ano}")
-            else:
-                print(f"⚠️ Formato inválido em {ficheiro}")
-                
-        except Exception as e:
-            print(f"❌ Erro ao carregar {ficheiro}: {e}")
+    for ano, lista in sorted(indice["anos"].items()):
+        print(f"   📅 Carregados {len(lista)} sorteios de {ano}")
     
-    return todos_sorteios
+    return indice
 
 def carregar_json(ficheiro: str):
     """Carrega um ficheiro JSON de apostas"""
-    if not os.path.exists(ficheiro):
+    dados = armazenamento.ler_json(ficheiro)
+    if dados is None:
         print(f"⚠️ Ficheiro não encontrado: {ficheiro}")
         return []
     
-    with open(ficheiro, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return dados
 
 def converter_data(data_str: str) -> str:
     """Converte data para formato comparável (YYYY-MM-DD)"""
@@ -98,16 +51,6 @@ def converter_data(data_str: str) -> str:
     except:
         return data_str
 
-def normalizar_data_para_busca(data_aposta: str) -> str:
-    """
-    Converte data do formato ISO (YYYY-MM-DD) para o formato do sorteio (DD/MM/YYYY)
-    """
-    try:
-        ano, mes, dia = data_aposta.split('-')
-        return f"{dia}/{mes}/{ano}"
-    except:
-        return data_aposta
-
 def limpar_codigo(codigo: str) -> str:
     """
     Limpa o código (remove espaços, normaliza formato)
@@ -118,30 +61,18 @@ def limpar_codigo(codigo: str) -> str:
         return ""
     return re.sub(r'\s+', '', codigo).upper()
 
-def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
+def verificar_boletins(apostas: list, todos_sorteios: dict, marcas: Optional[dict] = None) -> list:
     resultados = []
     
     for aposta in apostas:
         data_aposta = aposta.get("data_sorteio")
         
-        try:
-            ano_aposta = data_aposta.split('-')[0]
-        except:
+        if not data_aposta:
             print(f"⚠️ Data inválida: {data_aposta}")
             continue
         
-        dados_ano = todos_sorteios.get(ano_aposta)
-        if not dados_ano:
-            print(f"⚠️ Nenhum sorteio encontrado para o ano {ano_aposta}")
-            continue
-        
-        data_sorteio_formatada = normalizar_data_para_busca(data_aposta)
-        
-        sorteio_encontrado = None
-        for sorteio in dados_ano["lista"]:
-            if sorteio.get("data") == data_sorteio_formatada:
-                sorteio_encontrado = sorteio
-                break
+        data_sorteio_formatada = indice_sorteios.normalizar_data_para_busca(data_aposta)
+        sorteio_encontrado = todos_sorteios["por_data"].get(data_sorteio_formatada)
         
         if not sorteio_encontrado:
             print(f"⚠️ Sorteio não encontrado para data {data_aposta}")
@@ -153,6 +84,10 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
             print(f"Aviso: Sorteio {sorteio_encontrado.get('concurso')} sem código premiado. Ignorado.")
             continue
 
+        # Boletim e sorteio iguais aos da última verificação: nada a fazer
+        if marcas is not None and not verificacao_incremental.precisa_verificar(marcas, aposta, sorteio_encontrado):
+            continue
+
         apostas_list = aposta.get("apostas", [])
         
         if not apostas_list and aposta.get("codigo"):
@@ -167,7 +102,7 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
             ganhou = (codigo_aposta == codigo_premiado)
             
             resultado = {
-                "data_verificacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "data_verificacao": verificacao_incremental.data_verificacao(sorteio_encontrado, data_aposta),
                 "boletim": {
                     "referencia": aposta.get("referencia_unica"),
                     "data_sorteio": aposta.get("data_sorteio"),
@@ -193,18 +128,23 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
                 resultado["premio"] = {
                     "categoria": sorteio_encontrado.get('premio_nome', '1.º Prémio'),
                     "descricao": "Código premiado",
-                    "valor": "€ 1.000.000,00",
+                    "valor": VALOR_PREMIO,
+                    "valor_centimos": premios.valor_em_centimos(VALOR_PREMIO),
                     "vencedores": sorteio_encontrado.get('vencedores', '1')
                 }
             else:
                 resultado["premio"] = {
                     "categoria": "Sem prémio",
                     "descricao": "Código não premiado",
-                    "valor": "€ 0,00"
+                    "valor": "€ 0,00",
+                    "valor_centimos": 0
                 }
             
             resultados.append(resultado)
             mostrar_resultado_simples(resultado)
+        
+        if marcas is not None:
+            verificacao_incremental.registar(marcas, aposta, sorteio_encontrado)
     
     return resultados
 
@@ -233,33 +173,16 @@ def guardar_resultados(resultados: list):
     os.makedirs("resultados", exist_ok=True)
     
     # ===== 1. FICHEIRO INCREMENTAL (histórico) =====
-    if os.path.exists(FICHEIRO_RESULTADOS):
-        with open(FICHEIRO_RESULTADOS, "r", encoding="utf-8") as f:
-            historico = json.load(f)
-    else:
-        historico = []
-    
-    # Adicionar apenas os NOVOS ao histórico
-    novos_adicionados = 0
-    for novo in resultados:
-        existe = False
-        for existente in historico:
-            if (existente.get("boletim", {}).get("referencia") == novo["boletim"]["referencia"] and
-                existente.get("aposta", {}).get("indice") == novo["aposta"]["indice"]):
-                existe = True
-                break
-        
-        if not existe:
-            historico.append(novo)
-            novos_adicionados += 1
-    
-    # Guardar histórico completo (INCREMENTAL)
-    with open(FICHEIRO_RESULTADOS, "w", encoding="utf-8") as f:
-        json.dump(historico, f, indent=2, ensure_ascii=False)
+    # Novos são acrescentados; os já existentes (mesma referência/índice)
+    # são substituídos pelo resultado mais recente
+    total, novos_adicionados, substituidos = historico_verificacoes.atualizar_historico(
+        FICHEIRO_RESULTADOS, resultados
+    )
     
     print(f"\n📁 Histórico guardado em: {FICHEIRO_RESULTADOS}")
     print(f"📊 Novas verificações no histórico: {novos_adicionados}")
-    print(f"📊 Total no histórico: {len(historico)}")
+    print(f"📊 Verificações atualizadas no histórico: {substituidos}")
+    print(f"📊 Total no histórico: {total}")
     
     # ===== 2. FICHEIRO DE RESULTADOS RECENTES (SUBSTITUÍDO) =====
     if resultados:
@@ -269,8 +192,7 @@ def guardar_resultados(resultados: list):
         caminho_recentes = os.path.join("resultados", nome_recentes)
         
         # Guardar APENAS os resultados desta execução (SUBSTITUI)
-        with open(caminho_recentes, "w", encoding="utf-8") as f:
-            json.dump(resultados, f, indent=2, ensure_ascii=False)
+        armazenamento.escrever_json(caminho_recentes, resultados)
         
         print(f"📁 Resultados recentes guardados em: {caminho_recentes}")
         print(f"📊 Total de resultados recentes: {len(resultados)}")
@@ -321,18 +243,20 @@ def main():
         print("❌ Nenhum sorteio encontrado")
         return
     
-    total_sorteios = sum(len(d["lista"]) for d in todos_sorteios.values())
+    total_sorteios = indice_sorteios.total_sorteios(todos_sorteios)
     print(f"\n📚 Apostas carregadas: {len(apostas)}")
-    print(f"📚 Sorteios carregados: {total_sorteios} (de {len(todos_sorteios)} anos)")
+    print(f"📚 Sorteios carregados: {total_sorteios} (de {len(todos_sorteios['anos'])} anos)")
     
-    # Verificar boletins
-    resultados = verificar_boletins(apostas, todos_sorteios)
+    # Verificar apenas boletins novos ou cujo sorteio mudou
+    marcas = verificacao_incremental.carregar_marcas(FICHEIRO_MARCAS, FICHEIRO_RESULTADOS)
+    resultados = verificar_boletins(apostas, todos_sorteios, marcas)
     
     if resultados:
         guardar_resultados(resultados)
+        verificacao_incremental.guardar_marcas(FICHEIRO_MARCAS, marcas)
         gerar_relatorio(resultados)
     else:
-        print("\n❌ Nenhum resultado para verificar")
+        print("\n❌ Nenhum resultado para verificar (sem boletins novos ou sorteios alterados)")
 
 if __name__ == "__main__":
     main()
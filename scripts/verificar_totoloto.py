@@ -1,22 +1,25 @@
-import json
 import os
-import glob
-import re
-from datetime import datetime
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+import armazenamento
+import historico_verificacoes
+import indice_sorteios
+import motor_acertos
+import verificacao_incremental
 
 # ===== CONFIGURACAO =====
 FICHEIRO_APOSTAS = "apostas/totoloto.json"
 PASTA_DADOS = "dados/"
-FICHEIRO_SORTEIOS_PADRAO = "totoloto_sc_*.json"
 FICHEIRO_RESULTADOS = "resultados/totoloto_verificacoes.json"
+FICHEIRO_MARCAS = "resultados/totoloto_marcas.json"
 
 # ===== TABELA DE PREMIOS =====
+# numeros acertados (sem Nº da Sorte no 1.º) -> ordem do premio ("2.º Prémio" -> 2)
 PREMIOS_NUMEROS_TOTOLOTO = {
-    5: "2. Premio",
-    4: "3. Premio",
-    3: "4. Premio",
-    2: "5. Premio",
+    5: 2,
+    4: 3,
+    3: 4,
+    2: 5,
 }
 
 # ============================================================
@@ -24,104 +27,46 @@ PREMIOS_NUMEROS_TOTOLOTO = {
 # ============================================================
 
 def carregar_json(ficheiro: str):
-    if not os.path.exists(ficheiro):
+    dados = armazenamento.ler_json(ficheiro)
+    if dados is None:
         print(f"Aviso: Ficheiro nao encontrado: {ficheiro}")
         return []
-    with open(ficheiro, "r", encoding="utf-8") as f:
-        return json.load(f)
+    return dados
 
 def carregar_todos_sorteios() -> dict:
-    todos_sorteios = {}
-    ficheiros = glob.glob(os.path.join(PASTA_DADOS, FICHEIRO_SORTEIOS_PADRAO))
-    for ficheiro in ficheiros:
-        nome = os.path.basename(ficheiro)
-        if nome == "totoloto_sc_atual.json":
-            continue
-        match = re.search(r'totoloto_sc_(\d{4})\.json', nome)
-        if not match:
-            continue
-        ano = match.group(1)
-        try:
-            with open(ficheiro, "r", encoding="utf-8") as f:
-                dados = json.load(f)
-            if ano in dados and isinstance(dados[ano], list):
-                lista_sorteios = dados[ano]
-            elif isinstance(dados, list):
-                lista_sorteios = dados
-            else:
-                continue
-            index = {}
-            for s in lista_sorteios:
-                chave = f"{s.get('data')}|{s.get('concurso')}"
-                index[chave] = s
-            todos_sorteios[ano] = {"lista": lista_sorteios, "index": index}
-        except:
-            continue
-    return todos_sorteios
-
-def normalizar_data_para_busca(data_aposta: str) -> str:
-    try:
-        ano, mes, dia = data_aposta.split('-')
-        return f"{dia}/{mes}/{ano}"
-    except:
-        return data_aposta
+    indice = indice_sorteios.carregar_indice("totoloto", PASTA_DADOS)
+    if not indice["anos"]:
+        return {}
+    return indice
 
 def extrair_numeros_sorteio(sorteio: dict) -> Tuple[List[str], str]:
     numeros = [str(n).zfill(2) for n in sorteio.get("numeros", [])]
     especial = str(sorteio.get("especial", "")).zfill(2)
     return numeros, especial
 
-def calcular_acertos(aposta_numeros: List[str], aposta_especial: str,
-                     sorteio_numeros: List[str], sorteio_especial: str) -> Tuple[int, bool]:
-    acertos_numeros = len(set(aposta_numeros) & set(sorteio_numeros))
-    acertou_especial = aposta_especial == sorteio_especial
-    return acertos_numeros, acertou_especial
+def mascaras_aposta(aposta_ind: dict) -> Tuple[int, int]:
+    return (motor_acertos.mascara(aposta_ind.get("numeros", [])),
+            motor_acertos.mascara(aposta_ind.get("numero_da_sorte", "")))
+
+def mascaras_sorteio(sorteio: dict) -> Tuple[int, int]:
+    numeros, especial = extrair_numeros_sorteio(sorteio)
+    return motor_acertos.mascara(numeros), motor_acertos.mascara(especial)
 
-def encontrar_premios(sorteio: dict, acertos_n: int, acertou_especial: bool) -> List[dict]:
+def encontrar_premios(premios_sorteio: dict, acertos_n: int, acertou_especial: bool) -> List[dict]:
+    """Premios ganhos, a partir dos premios compilados do sorteio ({ordem: premio})"""
     premios_ganhos = []
 
-    def procurar(padrao: str):
-        padrao_clean = re.sub(r'[^\w\s]', '', padrao).lower()
-        for p in sorteio.get("premios", []):
-            nome = p.get("premio", "")
-            nome_clean = re.sub(r'[^\w\s]', '', nome).lower()
-            if padrao_clean in nome_clean:
-                return p
-        return None
-
-    if acertos_n == 5:
-        if acertou_especial:
-            p = procurar("1")
-        else:
-            p = procurar("2")
-        if p:
-            premios_ganhos.append(p)
-    elif acertos_n == 4:
-        p = procurar("3")
-        if p:
-            premios_ganhos.append(p)
-        if acertou_especial:
-            p_sorte = procurar("sorte")
-            if p_sorte:
-                premios_ganhos.append(p_sorte)
-    elif acertos_n == 3:
-        p = procurar("4")
-        if p:
-            premios_ganhos.append(p)
-        if acertou_especial:
-            p_sorte = procurar("sorte")
-            if p_sorte:
-                premios_ganhos.append(p_sorte)
-    elif acertos_n == 2:
-        p = procurar("5")
-        if p:
-            premios_ganhos.append(p)
-        if acertou_especial:
-            p_sorte = procurar("sorte")
-            if p_sorte:
-                premios_ganhos.append(p_sorte)
-    elif acertos_n <= 1 and acertou_especial:
-        p_sorte = procurar("sorte")
+    if acertos_n == 5 and acertou_especial:
+        ordem = 1
+    else:
+        ordem = PREMIOS_NUMEROS_TOTOLOTO.get(acertos_n)
+    p = premios_sorteio.get(ordem)
+    if p:
+        premios_ganhos.append(p)
+
+    # Nº da Sorte acumula com os premios do 3.º ao 5.º (e paga sozinho com 0-1 numeros)
+    if acertou_especial and acertos_n <= 4:
+        p_sorte = premios_sorteio.get("sorte")
         if p_sorte:
             premios_ganhos.append(p_sorte)
 
@@ -131,32 +76,17 @@ def encontrar_premios(sorteio: dict, acertos_n: int, acertou_especial: bool) ->
 # VERIFICACAO
 # ============================================================
 
-def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
+def verificar_boletins(apostas: list, todos_sorteios: dict, marcas: Optional[dict] = None) -> list:
     resultados = []
+    pendentes = []
     for aposta in apostas:
         data_aposta = aposta.get("data_sorteio")
         concurso_aposta = aposta.get("concurso")
-        try:
-            ano_aposta = data_aposta.split('-')[0]
-        except:
-            continue
-        dados_ano = todos_sorteios.get(ano_aposta)
-        if not dados_ano:
+        if not data_aposta:
             continue
-        data_sorteio_formatada = normalizar_data_para_busca(data_aposta)
-        sorteio_encontrado = None
-        metodo_encontrado = ""
-        if concurso_aposta:
-            chave_exata = f"{data_sorteio_formatada}|{concurso_aposta}"
-            sorteio_encontrado = dados_ano["index"].get(chave_exata)
-            if sorteio_encontrado:
-                metodo_encontrado = "data + concurso"
-        if not sorteio_encontrado:
-            for s in dados_ano["lista"]:
-                if s.get("data") == data_sorteio_formatada:
-                    sorteio_encontrado = s
-                    metodo_encontrado = "apenas data"
-                    break
+        sorteio_encontrado, metodo_encontrado = indice_sorteios.procurar_sorteio(
+            todos_sorteios, data_aposta, concurso_aposta
+        )
         if not sorteio_encontrado:
             continue
 
@@ -165,23 +95,47 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
             print(f"Aviso: Sorteio {concurso_aposta} sem lista de prémios completa. Ignorado.")
             continue
 
-        numeros_sorteio, especial_sorteio = extrair_numeros_sorteio(sorteio_encontrado)
-        for aposta_ind in aposta.get("apostas", []):
+        # Boletim e sorteio iguais aos da ultima verificacao: nada a fazer
+        if marcas is not None and not verificacao_incremental.precisa_verificar(marcas, aposta, sorteio_encontrado):
+            continue
+
+        pendentes.append((aposta, sorteio_encontrado, metodo_encontrado))
+
+    # Acertos de todas as linhas, num lote por sorteio
+    acertos_lote = motor_acertos.calcular_acertos_lote(
+        [(a, s) for a, s, _ in pendentes], mascaras_aposta, mascaras_sorteio
+    )
+
+    por_sorteio = {}
+    for (aposta, sorteio_encontrado, metodo_encontrado), acertos_boletim in zip(pendentes, acertos_lote):
+        data_aposta = aposta.get("data_sorteio")
+        concurso_aposta = aposta.get("concurso")
+
+        # Numeros, mascara e tabela de premios calculados uma vez por sorteio
+        if id(sorteio_encontrado) not in por_sorteio:
+            por_sorteio[id(sorteio_encontrado)] = (
+                extrair_numeros_sorteio(sorteio_encontrado),
+                mascaras_sorteio(sorteio_encontrado)[0],
+                motor_acertos.tabela_premios(
+                    indice_sorteios.premios_do_sorteio(todos_sorteios, sorteio_encontrado),
+                    encontrar_premios, 5, (False, True)
+                )
+            )
+        (numeros_sorteio, especial_sorteio), m_numeros, tabela = por_sorteio[id(sorteio_encontrado)]
+
+        for aposta_ind, (acertos_n, acertos_especial) in zip(aposta.get("apostas", []), acertos_boletim):
             numeros_aposta = aposta_ind.get("numeros", [])
             especial_aposta = aposta_ind.get("numero_da_sorte", "")
-            acertos_n, acertou_especial = calcular_acertos(
-                numeros_aposta, especial_aposta,
-                numeros_sorteio, especial_sorteio
-            )
+            acertou_especial = acertos_especial > 0
 
             # Listas exatas para o frontend destacar acertos
-            numeros_acertados = sorted(list(set(numeros_aposta) & set(numeros_sorteio)))
+            numeros_acertados = motor_acertos.decodificar(mascaras_aposta(aposta_ind)[0] & m_numeros)
             especial_acertado = especial_aposta if acertou_especial else None
 
-            premios_ganhos = encontrar_premios(sorteio_encontrado, acertos_n, acertou_especial)
+            premios_ganhos = list(tabela[(acertos_n, acertou_especial)])
 
             resultado = {
-                "data_verificacao": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "data_verificacao": verificacao_incremental.data_verificacao(sorteio_encontrado, data_aposta),
                 "metodo_validacao": metodo_encontrado,
                 "boletim": {
                     "referencia": aposta.get("referencia_unica"),
@@ -217,6 +171,9 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
                 resultado["premios"] = []
 
             resultados.append(resultado)
+
+        if marcas is not None:
+            verificacao_incremental.registar(marcas, aposta, sorteio_encontrado)
     return resultados
 
 # ============================================================
@@ -226,46 +183,16 @@ def verificar_boletins(apostas: list, todos_sorteios: dict) -> list:
 def guardar_resultados(resultados: list):
     os.makedirs("resultados", exist_ok=True)
 
-    # Carregar histórico existente
-    if os.path.exists(FICHEIRO_RESULTADOS):
-        with open(FICHEIRO_RESULTADOS, "r", encoding="utf-8") as f:
-            historico = json.load(f)
-    else:
-        historico = []
-
-    # Converter para dicionário com chave composta
-    historico_dict = {}
-    for entry in historico:
-        chave = (
-            entry["boletim"]["referencia"],
-            entry["aposta"]["indice"],
-            entry["boletim"]["concurso_sorteio"]
-        )
-        historico_dict[chave] = entry
-
-    # Substituir (ou adicionar) os novos resultados
-    for novo in resultados:
-        chave_nova = (
-            novo["boletim"]["referencia"],
-            novo["aposta"]["indice"],
-            novo["boletim"]["concurso_sorteio"]
-        )
-        historico_dict[chave_nova] = novo  # substitui se existir, adiciona se não
-
-    novo_historico = list(historico_dict.values())
-
-    # Guardar histórico atualizado
-    with open(FICHEIRO_RESULTADOS, "w", encoding="utf-8") as f:
-        json.dump(novo_historico, f, indent=2, ensure_ascii=False)
+    # Histórico atualizado: substitui (ou adiciona) por referência/índice/concurso
+    total, _, _ = historico_verificacoes.atualizar_historico(FICHEIRO_RESULTADOS, resultados)
 
     # Ficheiro de resultados recentes (substituído a cada execução)
     nome_base = os.path.basename(FICHEIRO_RESULTADOS)
     nome_recentes = nome_base.replace('_verificacoes', '_recentes')
     caminho_recentes = os.path.join("resultados", nome_recentes)
-    with open(caminho_recentes, "w", encoding="utf-8") as f:
-        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    armazenamento.escrever_json(caminho_recentes, resultados)
 
-    print(f"\nHistorico atualizado (total {len(novo_historico)})")
+    print(f"\nHistorico atualizado (total {total})")
     print(f"Resultados recentes guardados em: {caminho_recentes}")
 
 # ============================================================
@@ -282,11 +209,13 @@ def main():
     if not todos_sorteios:
         print("ERRO: Nenhum sorteio encontrado")
         return
-    resultados = verificar_boletins(apostas, todos_sorteios)
+    marcas = verificacao_incremental.carregar_marcas(FICHEIRO_MARCAS, FICHEIRO_RESULTADOS)
+    resultados = verificar_boletins(apostas, todos_sorteios, marcas)
     if resultados:
         guardar_resultados(resultados)
+        verificacao_incremental.guardar_marcas(FICHEIRO_MARCAS, marcas)
     else:
-        print("\nNenhum resultado para verificar")
+        print("\nNenhum resultado para verificar (sem boletins novos ou sorteios alterados)")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,60 @@
+"""
+Executa toda a verificação num único processo:
+verificadores dos 4 jogos → notificações → estatísticas.
+
+As etapas partilham em memória os JSON de apostas/, dados/ e resultados/
+(cada ficheiro é lido uma vez) e cada ficheiro de saída é escrito uma
+única vez no fim.
+"""
+import traceback
+
+import armazenamento
+import verificar_totoloto
+import verificar_euromilhoes
+import verificar_eurodreams
+import verificar_milhao
+import gerar_notificacoes
+import gerar_estatisticas_completas
+
+# (nome, função, continua se falhar) — igual ao continue-on-error do workflow antigo
+ETAPAS = [
+    ("Verificar Totoloto", verificar_totoloto.main, True),
+    ("Verificar Euromilhões", verificar_euromilhoes.main, True),
+    ("Verificar EuroDreams", verificar_eurodreams.main, True),
+    ("Verificar M1lhão", verificar_milhao.main, True),
+    ("Gerar notificações", gerar_notificacoes.main, False),
+    ("Gerar estatísticas", gerar_estatisticas_completas.main, False),
+]
+
+# Marcas de verificação: gravadas por último, depois dos diários com os
+# resultados que dão como verificados (ver verificacao_incremental.py)
+FICHEIROS_MARCAS = [
+    verificar_totoloto.FICHEIRO_MARCAS,
+    verificar_euromilhoes.FICHEIRO_MARCAS,
+    verificar_eurodreams.FICHEIRO_MARCAS,
+    verificar_milhao.FICHEIRO_MARCAS,
+]
+
+
+def main():
+    print("\n🧮 VERIFICAR TUDO (processo único)")
+    print("=" * 70)
+
+    armazenamento.ativar_escrita_diferida()
+    try:
+        for nome, etapa, tolerar_erro in ETAPAS:
+            print(f"\n▶️ {nome}")
+            try:
+                etapa()
+            except Exception:
+                if not tolerar_erro:
+                    raise
+                print(f"   ❌ Erro em '{nome}' (a continuar):")
+                traceback.print_exc()
+    finally:
+        gravados = armazenamento.descarregar(ultimos=FICHEIROS_MARCAS)
+        print(f"\n💾 {gravados} ficheiro(s) gravado(s)")
+
+
+if __name__ == "__main__":
+    main()
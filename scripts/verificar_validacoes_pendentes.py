@@ -5,6 +5,8 @@ from datetime import datetime
 from typing import Dict, List, Set
 from pywebpush import webpush, WebPushException
 
+import armazenamento
+
 # ===== CONFIGURAÇÃO =====
 PASTA_APOSTAS = "apostas/"
 FICHEIRO_ESTADO = "apostas/estado_validacoes.json"
@@ -95,11 +97,18 @@ def carregar_estado_anterior() -> Set[str]:
 
 
 def guardar_estado_atual(ids_notificados: Set[str]):
-    with open(FICHEIRO_ESTADO, "w", encoding="utf-8") as f:
-        json.dump({
-            "notificados": list(ids_notificados),
-            "ultima_verificacao": datetime.now().isoformat()
-        }, f, indent=2)
+    notificados = sorted(ids_notificados)  # ordem estável entre execuções
+    # Sem IDs novos, mantém a data anterior (ficheiro igual → sem commit)
+    anterior = carregar_json(FICHEIRO_ESTADO)
+    if isinstance(anterior, dict) and anterior.get("ultima_verificacao") and \
+            sorted(anterior.get("notificados", [])) == notificados:
+        ultima_verificacao = anterior["ultima_verificacao"]
+    else:
+        ultima_verificacao = datetime.now().isoformat()
+    armazenamento.escrever_json(FICHEIRO_ESTADO, {
+        "notificados": notificados,
+        "ultima_verificacao": ultima_verificacao
+    }, ensure_ascii=True)
     print(f"   💾 Estado guardado com {len(ids_notificados)} IDs.")
 
 
@@ -172,8 +181,7 @@ def enviar_push_validacao(jogo: str, quantidade: int, imagem: str = None) -> boo
             valid_subs.append(sub)
 
     if len(valid_subs) != len(subscriptions):
-        with open(SUBSCRIPTION_FILE, "w", encoding="utf-8") as f:
-            json.dump(valid_subs, f, indent=2)
+        armazenamento.escrever_json(SUBSCRIPTION_FILE, valid_subs, ensure_ascii=True)
         print(f"   ♻️ subscription.json atualizado (removidas {len(subscriptions) - len(valid_subs)}).")
 
     print(f"   ✅ Push enviada para {sucesso} dispositivo(s).")